@@ -1,7 +1,31 @@
 from django.contrib import admin
 
-from auctions.models import Auction, Bid
+from auctions.models import ArchivedAuction, ArchivedBid, Auction, Bid, Invoice, Notification, ProxyBid, Settlement
+
+
+@admin.register(Bid)
+class BidAdmin(admin.ModelAdmin):
+    """
+    Read-only: bids are placed through ``auctions.bidding``, which also keeps
+    the auction's ``highest_bid``, ``bid_count`` and ``top_bidder`` current.
+    """
+    list_display = ('auction', 'user', 'amount', 'created_at')
+    list_select_related = ('auction', 'user')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 
-# Register your models here.
-admin.site.register(Bid)
 admin.site.register(Auction)
+admin.site.register(ProxyBid)
+admin.site.register(ArchivedAuction)
+admin.site.register(ArchivedBid)
+admin.site.register(Settlement)
+admin.site.register(Invoice)
+admin.site.register(Notification)
@@ -6,4 +6,9 @@ class AuctionsConfig(AppConfig):
     name = 'auctions'
 
     def ready(self):
-        import auctions.tasks
\ No newline at end of file
+        import auctions.tasks
+        import auctions.events
+        import auctions.cache
+        import auctions.routers
+        from auctions.metrics import instrument_serializers
+        instrument_serializers()
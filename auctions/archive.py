@@ -0,0 +1,85 @@
+"""
+Archiving of settled auctions.
+
+Auctions that closed more than ``AUCTION_ARCHIVE_AFTER_DAYS`` ago are moved,
+with their bids, into ``ArchivedAuction`` and ``ArchivedBid`` under their
+original ids. The archived auction keeps the final ``highest_bid``,
+``bid_count``, winner and top bidder, so it is the summary row that stays
+behind; the live tables only hold what can still change.
+
+Every batch is copied and deleted in one transaction, oldest ``ends_at``
+first, so a run can stop (or die) between any two batches and the next run
+picks up where it left off.
+"""
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import ArchivedAuction, ArchivedBid, Auction, Bid, Settlement
+
+BATCH_SIZE = 500
+MAX_BATCHES = 20
+BID_CHUNK_SIZE = 2000
+
+
+def copied_fields(model):
+    return [field.attname for field in model._meta.concrete_fields if field.name != 'archived_at']
+
+
+def archivable(cutoff):
+    """
+    Closed before ``cutoff`` and settled: no bids, or a winner recorded by
+    ``settle``, and the ``Settlement`` written.
+    """
+    return Auction.objects.filter(
+        Q(bid_count=0) | Q(winner__isnull=False), Exists(Settlement.objects.filter(auction_id=OuterRef('pk'))),
+        is_closed=True, ends_at__lte=cutoff,
+    )
+
+
+def archive_batch(cutoff, batch_size=BATCH_SIZE):
+    """Move one batch of auctions and their bids into the archive. Returns ``(auctions, bids)``."""
+    with transaction.atomic():
+        pending = list(
+            archivable(cutoff).order_by('ends_at', 'pk')
+            .select_for_update(skip_locked=True)
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not pending:
+            return 0, 0
+
+        auctions = Auction.objects.filter(pk__in=pending).values(*copied_fields(ArchivedAuction))
+        ArchivedAuction.objects.bulk_create(ArchivedAuction(**row) for row in auctions)
+
+        bids = Bid.objects.filter(auction__in=pending).values(*copied_fields(ArchivedBid))
+        rows = bids.iterator(chunk_size=BID_CHUNK_SIZE)
+        archived_bids = 0
+        while chunk := [ArchivedBid(**row) for row in islice(rows, BID_CHUNK_SIZE)]:
+            ArchivedBid.objects.bulk_create(chunk)
+            archived_bids += len(chunk)
+
+        # Cascades to bids and proxy bids; post_delete bumps each auction's cache version.
+        Auction.objects.filter(pk__in=pending).delete()
+    return len(pending), archived_bids
+
+
+def archive_closed(older_than_days=None, batch_size=BATCH_SIZE, max_batches=MAX_BATCHES, now=None):
+    """
+    Archive auctions closed more than ``older_than_days`` ago, at most
+    ``max_batches`` batches of ``batch_size``. Returns ``(auctions, bids)``.
+    """
+    if older_than_days is None:
+        older_than_days = settings.AUCTION_ARCHIVE_AFTER_DAYS
+    cutoff = (now or timezone.now()) - timedelta(days=older_than_days)
+    auctions = bids = 0
+    for _ in range(max_batches):
+        batch_auctions, batch_bids = archive_batch(cutoff, batch_size)
+        if not batch_auctions:
+            break
+        auctions += batch_auctions
+        bids += batch_bids
+    return auctions, bids
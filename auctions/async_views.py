@@ -0,0 +1,179 @@
+"""
+Async read endpoints for auctions and bids.
+
+Under ASGI, GET and HEAD on the auction and bid list, detail and summary
+routes are served here without holding a worker thread per request. The ORM
+is used through its async API (``aget``, ``async for``) and serializers only
+ever see fully fetched rows, so serialization never queries. Authentication,
+permissions, filters, cursors and error bodies are the DRF viewsets' own.
+Every other method, and the browsable API, falls through to the viewsets.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated, PermissionDenied
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import exception_handler
+
+from . import cache as auction_cache
+from .authentication import aauthenticate
+from .filters import AuctionFilterBackend
+from .models import ArchivedAuction, Auction, Bid
+from .pagination import AuctionCursorPagination, BidCursorPagination
+from .renderers import FastJSONRenderer
+from .routers import use_primary
+from .serializers import AuctionListRowSerializer, AuctionSerializer, AuctionSummarySerializer, BidRowSerializer, \
+    BidSerializer
+from .views import AuctionViewSet, BidViewSet
+
+
+def finalize(response):
+    """What ``APIView.finalize_response`` does, with JSON as the only renderer."""
+    response.accepted_renderer = FastJSONRenderer()
+    response.accepted_media_type = FastJSONRenderer.media_type
+    response.renderer_context = {}
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+
+def render(data, status_code=status.HTTP_200_OK, headers=None):
+    return finalize(Response(data, status=status_code, headers=headers))
+
+
+def wants_browsable_api(request):
+    return request.GET.get('format') == 'api' or 'text/html' in request.headers.get('Accept', '')
+
+
+def async_reads(handler, sync_view):
+    """One route, two views: reads go to ``handler``, everything else to the DRF ``sync_view``."""
+
+    @wraps(handler)
+    async def view(request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD') and not wants_browsable_api(request):
+            return await handler(request, *args, **kwargs)
+        return await sync_to_async(sync_view)(request, *args, **kwargs)
+
+    view.csrf_exempt = True
+    return view
+
+
+def check_object_permissions(request, permission_classes, obj):
+    for permission in permission_classes:
+        if not permission().has_object_permission(request, None, obj):
+            raise PermissionDenied()
+
+
+def api_read(permission_classes):
+    """What ``APIView.dispatch`` does around a handler: authenticate, check permissions, render errors."""
+
+    def decorator(handler):
+        @wraps(handler)
+        async def view(request, *args, **kwargs):
+            request = Request(request)
+            try:
+                request.user, request.auth = await aauthenticate(request._request)
+                for permission in permission_classes:
+                    if not permission().has_permission(request, None):
+                        raise PermissionDenied() if request.user.is_authenticated else NotAuthenticated()
+                return await handler(request, *args, **kwargs)
+            except Exception as exc:
+                if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+                    # As in the viewsets: session authentication comes first and sends no
+                    # WWW-Authenticate header, so these are 403s.
+                    exc.status_code = status.HTTP_403_FORBIDDEN
+                response = exception_handler(exc, {'request': request, 'view': None})
+                if response is None:
+                    raise
+                return finalize(response)
+        return view
+    return decorator
+
+
+async def get_or_404(queryset, pk):
+    try:
+        return await queryset.aget(pk=pk)
+    except queryset.model.DoesNotExist:
+        raise Http404(f"No {queryset.model._meta.object_name} matches the given query.")
+
+
+async def get_auction(queryset, archived_queryset, pk):
+    """As ``AuctionViewSet.get_object``: an auction missing from the live table is looked up in the archive."""
+    try:
+        return await get_or_404(queryset, pk)
+    except Http404:
+        return await get_or_404(archived_queryset, pk)
+
+
+async def cached_auction(request, pk, kind, queryset, archived_queryset, serializer_class):
+    """The async twin of ``AuctionViewSet.cached_response``."""
+    version = await auction_cache.aget_version(pk)
+    entry = await auction_cache.aget_payload(pk, kind, version)
+    if entry is None:
+        with use_primary():
+            instance = await get_auction(queryset, archived_queryset, pk)
+        check_object_permissions(request, AuctionViewSet.permission_classes, instance)
+        entry = {'owner': instance.owner_id, 'data': serializer_class(instance, context={'request': request}).data}
+        await auction_cache.aset_payload(pk, kind, version, entry)
+    else:
+        check_object_permissions(request, AuctionViewSet.permission_classes, Auction(pk=pk, owner_id=entry['owner']))
+
+    etag = auction_cache.etag(pk, kind, version)
+    if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+    if etag in if_none_match or '*' in if_none_match:
+        return render(None, status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+    return render(entry['data'], headers={'ETag': etag})
+
+
+async def paginated(request, paginator, queryset, serializer_class):
+    page = await paginator.apaginate_queryset(queryset, request)
+    data = serializer_class(page, many=True, context={'request': request}).data
+    return finalize(paginator.get_paginated_response(data))
+
+
+@api_read(AuctionViewSet.permission_classes)
+async def auction_list(request):
+    queryset = AuctionFilterBackend().filter_queryset(request, Auction.objects.for_list(), None)
+    return await paginated(request, AuctionCursorPagination(), AuctionListRowSerializer.rows(queryset),
+                           AuctionListRowSerializer)
+
+
+@api_read(AuctionViewSet.permission_classes)
+async def auction_detail(request, pk):
+    return await cached_auction(
+        request, pk, 'detail', Auction.objects.for_detail(), ArchivedAuction.objects.for_detail(), AuctionSerializer)
+
+
+@api_read(AuctionViewSet.permission_classes)
+async def auction_summary(request, pk):
+    return await cached_auction(
+        request, pk, 'summary', Auction.objects.for_summary(), ArchivedAuction.objects.for_summary(),
+        AuctionSummarySerializer)
+
+
+@api_read(AuctionViewSet.permission_classes)
+async def auction_bids(request, pk):
+    auction = await get_auction(Auction.objects.only('pk', 'owner'), ArchivedAuction.objects.only('pk', 'owner'), pk)
+    check_object_permissions(request, AuctionViewSet.permission_classes, auction)
+    return await paginated(request, BidCursorPagination(), BidRowSerializer.rows(auction.bids.all()), BidRowSerializer)
+
+
+@api_read(BidViewSet.permission_classes)
+async def bid_list(request):
+    queryset = Bid.objects.all()
+    if request.query_params.get('mine'):
+        if not request.user.is_authenticated:
+            raise NotAuthenticated()
+        queryset = queryset.filter(user=request.user)
+    return await paginated(request, BidCursorPagination(), BidRowSerializer.rows(queryset), BidRowSerializer)
+
+
+@api_read(BidViewSet.permission_classes)
+async def bid_detail(request, pk):
+    bid = await get_or_404(Bid.objects.select_related('user'), pk)
+    check_object_permissions(request, BidViewSet.permission_classes, bid)
+    return render(BidSerializer(bid, context={'request': request}).data)
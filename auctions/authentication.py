@@ -0,0 +1,116 @@
+"""
+Stateless JWT authentication with a cached revocation check.
+
+Every access token carries the ``jti`` of the refresh token it was minted from
+(the ``sid`` claim), so one login is one refresh token. Logging out
+blacklists that refresh token in the database and marks it revoked in the
+cache; authenticated requests only consult the cache, falling back to the
+blacklist table on a miss.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .routers import apin_if_bid_recently, pin_if_bid_recently
+
+SESSION_CLAIM = 'sid'
+PREFIX = 'auth:revoked:'
+# A "not revoked" answer is only trusted this long, so a logout seen by
+# another process's cache (locmem in development) still takes effect.
+NOT_REVOKED_TIMEOUT = 60
+
+
+def revoked_key(jti):
+    return f'{PREFIX}{jti}'
+
+
+class SessionRefreshToken(RefreshToken):
+    """Refresh token whose access tokens point back at it through ``sid``."""
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        access[SESSION_CLAIM] = self[api_settings.JTI_CLAIM]
+        return access
+
+
+def issue_tokens(user):
+    refresh = SessionRefreshToken.for_user(user)
+    return {'refresh': str(refresh), 'access': str(refresh.access_token)}
+
+
+def revoke(jti):
+    """Blacklist the refresh token ``jti`` and every access token minted from it."""
+    outstanding = OutstandingToken.objects.filter(jti=jti).first()
+    if outstanding is not None:
+        BlacklistedToken.objects.get_or_create(token=outstanding)
+    cache.set(revoked_key(jti), True, timeout=revoked_timeout(True))
+
+
+def revoked_timeout(revoked):
+    return settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME'].total_seconds() if revoked else NOT_REVOKED_TIMEOUT
+
+
+def is_revoked(jti):
+    revoked = cache.get(revoked_key(jti))
+    if revoked is None:
+        revoked = BlacklistedToken.objects.filter(token__jti=jti).exists()
+        cache.set(revoked_key(jti), revoked, timeout=revoked_timeout(revoked))
+    return revoked
+
+
+async def ais_revoked(jti):
+    revoked = await cache.aget(revoked_key(jti))
+    if revoked is None:
+        revoked = await BlacklistedToken.objects.filter(token__jti=jti).aexists()
+        await cache.aset(revoked_key(jti), revoked, timeout=revoked_timeout(revoked))
+    return revoked
+
+
+class CachedBlacklistJWTAuthentication(JWTAuthentication):
+    """``Authorization: Bearer <access>``: no session row, no password hash."""
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            pin_if_bid_recently(result[0].pk)
+        return result
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        sid = token.get(SESSION_CLAIM)
+        if sid is None or is_revoked(sid):
+            raise InvalidToken({'detail': 'Token has been revoked.', 'code': 'token_not_valid'})
+        return token
+
+
+async def aauthenticate(request):
+    """
+    The API's authentication for async views: a Bearer token is checked as by
+    ``CachedBlacklistJWTAuthentication``, otherwise the session user is used.
+    Returns ``(user, token)``.
+    """
+    authenticator = CachedBlacklistJWTAuthentication()
+    header = authenticator.get_header(request)
+    raw_token = authenticator.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        return await request.auser(), None
+
+    token = JWTAuthentication.get_validated_token(authenticator, raw_token)
+    sid = token.get(SESSION_CLAIM)
+    if sid is None or await ais_revoked(sid):
+        raise InvalidToken({'detail': 'Token has been revoked.', 'code': 'token_not_valid'})
+    try:
+        user = await get_user_model().objects.aget(**{api_settings.USER_ID_FIELD: token[api_settings.USER_ID_CLAIM]})
+    except (KeyError, get_user_model().DoesNotExist):
+        raise AuthenticationFailed("User not found.", code='user_not_found')
+    if not api_settings.USER_AUTHENTICATION_RULE(user):
+        raise AuthenticationFailed("User is inactive.", code='user_inactive')
+    await apin_if_bid_recently(user.pk)
+    return user, token
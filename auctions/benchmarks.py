@@ -0,0 +1,1317 @@
+"""
+Benchmarks for the hot paths of the auctions API.
+
+Every benchmark runs against a throwaway test database, so it is safe to run
+next to a development database:
+
+    python -m django benchmark list-latency --settings=django_REST_API_auction_house.settings
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager, nullcontext
+from datetime import timedelta
+from base64 import b64encode
+from decimal import Decimal
+
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.asgi import get_asgi_application
+from django.db import OperationalError, connection, connections
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery
+from django.test import Client, RequestFactory, override_settings
+from django.test.client import MULTIPART_CONTENT
+from django.test.utils import setup_test_environment, teardown_test_environment, CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import urlencode
+from rest_framework.authentication import BasicAuthentication
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+
+from .archive import archive_closed
+from .authentication import issue_tokens
+from .bidding import PROXY_INCREMENT, place_bid
+from .events import auction_group
+from .export import FORMATS
+from .models import ArchivedAuction, Auction, Bid, Notification, ProxyBid, Settlement
+from .pagination import SyncPagination
+from .renderers import FastJSONRenderer, orjson
+from .routers import replicas
+from .settlement import BATCH_SIZE as SETTLEMENT_BATCH_SIZE, deliver_pending, settle_closed
+from .serializers import AuctionListRowSerializer, AuctionListSerializer, AuctionStatsRowSerializer, \
+    AuctionStatsSerializer, BidRowSerializer, BidSerializer
+from .routing import websocket_urlpatterns
+from .views import MyProfileView
+
+BATCH_SIZE = 5000
+
+
+@contextmanager
+def patch_logger(name, level):
+    logger = logging.getLogger(name)
+    old_level = logger.level
+    logger.setLevel(level)
+    try:
+        yield
+    finally:
+        logger.setLevel(old_level)
+
+
+@contextmanager
+def benchmark_database(on_disk=False):
+    """
+    A throwaway test database. ``on_disk`` puts a SQLite one in a file: the
+    default in-memory database locks whole tables and fails at once under
+    concurrent writers instead of waiting.
+    """
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+    if on_disk and connection.vendor == 'sqlite':
+        test_settings['NAME'] = os.path.join(tempfile.gettempdir(), 'auctions-benchmark.sqlite3')
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    # Replicas read the test database too, as under the test runner.
+    mirrors = {alias: connections[alias].settings_dict['NAME'] for alias in connections
+               if connections[alias].settings_dict['TEST'].get('MIRROR') == connection.alias}
+    for alias in mirrors:
+        connections[alias].close()
+        connections[alias].creation.set_as_test_mirror(connection.settings_dict)
+    try:
+        yield
+    finally:
+        for alias, name in mirrors.items():
+            connections[alias].close()
+            connections[alias].settings_dict['NAME'] = name
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = old_test_name
+        teardown_test_environment()
+
+
+def seed_auctions(count, owner, expired_ratio=0.5):
+    """Bulk insert ``count`` auctions, a share of them already past ``ends_at``."""
+    now = timezone.now()
+    expired_every = int(1 / expired_ratio) if expired_ratio else 0
+    batch = []
+    for i in range(count):
+        expired = expired_every and i % expired_every == 0
+        price = Decimal(10 + i % 1000)
+        batch.append(Auction(
+            owner=owner,
+            title=f'Auction {i}',
+            starting_price=price,
+            highest_bid=price,
+            ends_at=now + (timedelta(hours=-1) if expired else timedelta(days=1)),
+        ))
+        if len(batch) >= BATCH_SIZE:
+            Auction.objects.bulk_create(batch)
+            batch = []
+    Auction.objects.bulk_create(batch)
+
+
+def seed_bids(count, auction_ids, users):
+    """Bulk insert ``count`` bids spread round-robin over ``auction_ids``."""
+    batch = []
+    for i in range(count):
+        batch.append(Bid(
+            auction_id=auction_ids[i % len(auction_ids)],
+            user=users[i % len(users)],
+            amount=Decimal(100 + i // len(auction_ids)),
+        ))
+        if len(batch) >= BATCH_SIZE:
+            Bid.objects.bulk_create(batch)
+            batch = []
+    Bid.objects.bulk_create(batch)
+
+
+def refresh_bid_aggregates():
+    """
+    Recompute ``highest_bid``, ``bid_count`` and ``top_bidder`` from the bids
+    table after seeding with ``bulk_create``, which bypasses ``place_bid``.
+    """
+    bids = Bid.objects.filter(auction=OuterRef('pk'))
+    top_bid = bids.order_by('-amount', 'created_at', 'pk')
+    return Auction.objects.filter(Exists(bids)).update(
+        bid_count=Subquery(bids.values('auction').annotate(total=Count('pk')).values('total')),
+        highest_bid=Subquery(top_bid.values('amount')[:1]),
+        top_bidder=Subquery(top_bid.values('user')[:1]),
+    )
+
+
+def timed(func, repeat):
+    """Median wall time of ``func()`` in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+@contextmanager
+def count_queries():
+    """
+    Count queries without keeping them (CaptureQueriesContext stops at 9000),
+    on the primary and the replicas alike.
+    """
+    counter = {'queries': 0}
+
+    def count(execute, sql, params, many, context):
+        counter['queries'] += 1
+        return execute(sql, params, many, context)
+
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(count))
+        yield counter
+
+
+def percentile(timings, fraction):
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def measure(client, url, repeat):
+    """Return (p50 ms, p99 ms, queries per request) for ``repeat`` GETs of ``url``."""
+    timings = []
+    with count_queries() as counter:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200, response.status_code
+    return statistics.median(timings), percentile(timings, 0.99), counter['queries'] / repeat
+
+
+def list_latency(sizes=(1000, 10000, 100000), repeat=20):
+    """
+    Latency of the auction list and detail routes as the catalogue grows.
+
+    Both routes return a bounded amount of data (the list is paginated), so
+    any growth comes from per-row work done outside of the returned page.
+    """
+    results = []
+    with benchmark_database():
+        owner = User.objects.create_user(username='bench-owner', password='bench')
+        client = Client()
+        client.force_login(owner)
+        seeded = 0
+        for size in sizes:
+            seed_auctions(size - seeded, owner)
+            seeded = size
+            probe = Auction.objects.order_by('pk').first()
+            for route, url in (
+                ('list', reverse('auction-list')),
+                ('detail', reverse('auction-detail', args=[probe.pk])),
+            ):
+                p50, p99, queries = measure(client, url, repeat)
+                results.append({'benchmark': 'list-latency', 'route': route, 'auctions': size,
+                                'p50_ms': round(p50, 3), 'p99_ms': round(p99, 3), 'queries': queries})
+    return results
+
+
+def legacy_place_bid(auction_id, user, amount):
+    """The read-check-save chain bids used to go through before ``place_bid``."""
+    auction = Auction.objects.get(pk=auction_id)
+    if auction.ends_at < timezone.now() or Decimal(amount) <= auction.highest_bid:
+        raise ValidationError("The bid must be higher than the current highest bid.")
+    auction.highest_bid = amount
+    auction.bid_count += 1
+    auction.top_bidder = user
+    auction.save(update_fields=['highest_bid', 'bid_count', 'top_bidder'])
+    return Bid.objects.create(auction_id=auction_id, user=user, amount=amount)
+
+
+def run_concurrent_bids(place, auction_id, bidders, bids_per_thread):
+    """
+    Let every bidder race ``bids_per_thread`` rising bids against the others,
+    one thread per bidder. Returns accepted/rejected counts and bids/sec.
+
+    A bid that hits a locked database (SQLite only allows one writer) is
+    retried, the way a client would resubmit it.
+    """
+    stats = {'accepted': 0, 'rejected': 0, 'retries': 0}
+    lock = threading.Lock()
+    start_gate = threading.Barrier(len(bidders))
+
+    def worker(offset, user):
+        accepted = rejected = retries = 0
+        start_gate.wait()
+        try:
+            for step in range(bids_per_thread):
+                amount = Decimal(2 + step * len(bidders) + offset)
+                while True:
+                    try:
+                        place(auction_id, user, amount)
+                        accepted += 1
+                    except ValidationError:
+                        rejected += 1
+                    except OperationalError:
+                        retries += 1
+                        time.sleep(0.001)
+                        continue
+                    break
+        finally:
+            connections.close_all()
+        with lock:
+            stats['accepted'] += accepted
+            stats['rejected'] += rejected
+            stats['retries'] += retries
+
+    threads = [threading.Thread(target=worker, args=(i, user)) for i, user in enumerate(bidders)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stats['bids_per_sec'] = round((stats['accepted'] + stats['rejected']) / elapsed, 1)
+    return stats
+
+
+def bid_throughput(threads=8, bids_per_thread=200):
+    """
+    Concurrent bidding through ``place_bid`` versus the legacy read-check-save
+    path. ``lost_updates`` counts accepted bids whose amount is not reflected in
+    the auction's aggregates.
+    """
+    results = []
+    with benchmark_database():
+        owner = User.objects.create_user(username='bench-owner', password='bench')
+        bidders = [User.objects.create_user(username=f'bench-bidder-{i}', password='bench') for i in range(threads)]
+        for name, place in (('legacy', legacy_place_bid), ('place_bid', place_bid)):
+            auction = Auction.objects.create(owner=owner, title=name, starting_price=1,
+                                             ends_at=timezone.now() + timedelta(days=1))
+            stats = run_concurrent_bids(place, auction.pk, bidders, bids_per_thread)
+            auction.refresh_from_db()
+            top_amount = auction.bids.order_by('-amount').values_list('amount', flat=True).first()
+            results.append({
+                'benchmark': 'bid-throughput', 'path': name, 'threads': threads, **stats,
+                'lost_updates': abs(stats['accepted'] - auction.bid_count) + int(top_amount != auction.highest_bid),
+            })
+    return results
+
+
+def bid_flood(clients=32, seconds=10):
+    """
+    ``clients`` closed-loop clients, one user each, posting rising bids on one
+    auction as fast as they can, with the bid throttles off and at the
+    configured rates. ``reached_view_per_s`` counts the requests that got to
+    ``place_bid``; ``db_queries_per_s`` is everything that reached the database.
+    """
+    results = []
+    with benchmark_database(on_disk=True):
+        owner = User.objects.create_user(username='bench-owner', password='bench')
+        bidders = [User.objects.create_user(username=f'bench-bidder-{i}', password='bench') for i in range(clients)]
+        tokens = [issue_tokens(user)['access'] for user in bidders]
+        url = reverse('bid-list')
+        for mode in ('off', 'on'):
+            cache.clear()
+            auction = Auction.objects.create(owner=owner, title=mode, starting_price=1,
+                                             ends_at=timezone.now() + timedelta(days=1))
+            amounts = iter(range(2, 10 ** 9))
+            totals, lock = Counter(), threading.Lock()
+            gate = threading.Barrier(clients)
+
+            def worker(token):
+                client = Client(headers={'Authorization': f'Bearer {token}'})
+                counts = Counter()
+
+                def count_query(execute, sql, params, many, context):
+                    counts['db_queries'] += 1
+                    return execute(sql, params, many, context)
+
+                gate.wait()
+                deadline = time.perf_counter() + seconds
+                try:
+                    with connection.execute_wrapper(count_query):
+                        while time.perf_counter() < deadline:
+                            try:
+                                code = client.post(url, {'auction': auction.pk, 'amount': next(amounts)}).status_code
+                            except OperationalError:
+                                code = 'locked'
+                            counts[code] += 1
+                finally:
+                    connections.close_all()
+                with lock:
+                    totals.update(counts)
+
+            context = unthrottled() if mode == 'off' else nullcontext()
+            # Rejected bids are logged as "Bad Request" warnings.
+            with context, patch_logger('django.request', logging.ERROR):
+                threads = [threading.Thread(target=worker, args=(token,)) for token in tokens]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+            requests = sum(value for key, value in totals.items() if key != 'db_queries')
+            results.append({
+                'benchmark': 'bid-flood', 'throttles': mode, 'clients': clients, 'requests': requests,
+                'req_per_s': round(requests / seconds), 'accepted': totals[201], 'rejected': totals[400],
+                'throttled': totals[429], 'locked': totals['locked'],
+                'reached_view_per_s': round((totals[201] + totals[400]) / seconds),
+                'db_queries_per_s': round(totals['db_queries'] / seconds),
+                'queries_per_request': round(totals['db_queries'] / requests, 2),
+            })
+    return results
+
+
+@contextmanager
+def replica_aliases(paths):
+    """Serve reads from SQLite files at ``paths`` (and nothing else) as replica1, replica2, ..."""
+    saved = {alias: connections.settings.pop(alias) for alias in replicas()}
+    for alias in saved:
+        connections[alias].close()
+    for number, path in enumerate(paths, 1):
+        connections.settings[f'replica{number}'] = {**connection.settings_dict, 'NAME': path}
+    try:
+        yield
+    finally:
+        for alias in replicas():
+            connections[alias].close()
+            del connections.settings[alias]
+        connections.settings.update(saved)
+
+
+def read_replicas(replica_counts=(0, 1, 2, 4), readers=8, seconds=5, auctions=2000):
+    """
+    ``readers`` closed-loop clients reading the summary list while one writer
+    places bids on the primary, with reads served by the primary alone (0) or
+    by a growing number of replicas. Replicas are snapshot copies of the
+    primary's file, so this measures routing and lock contention, not
+    replication lag. SQLite runs inside this process, so total throughput is
+    bound by its CPU; ``primary_queries_per_s`` and
+    ``busiest_replica_queries_per_s`` are the load each database would carry
+    as a server of its own.
+    """
+    results = []
+    with benchmark_database(on_disk=True):
+        people, hot, _ = seed_marketplace(users=readers + 1, auctions=auctions)
+        writer = next(person for person in people if person.pk != hot.owner_id)
+        tokens = [issue_tokens(person)['access'] for person in people[:readers]]
+        url = reverse('auction-summary-list')
+        connection.ensure_connection()
+        directory = tempfile.mkdtemp()
+        paths = []
+        for number in range(1, max(replica_counts) + 1):
+            paths.append(os.path.join(directory, f'replica{number}.sqlite3'))
+            with sqlite3.connect(paths[-1]) as target:
+                connection.connection.backup(target)
+
+        amounts = iter(range(int(hot.highest_bid) + 1, 10 ** 9))
+        for count in replica_counts:
+            cache.clear()
+            totals, queries, all_timings, lock = Counter(), Counter(), [], threading.Lock()
+            gate = threading.Barrier(readers + 1)
+
+            def read(token):
+                client = Client(headers={'Authorization': f'Bearer {token}'})
+                timings, counts = [], Counter()
+
+                def counter(alias):
+                    def count_query(execute, sql, params, many, context):
+                        counts[alias] += 1
+                        return execute(sql, params, many, context)
+                    return count_query
+
+                gate.wait()
+                deadline = time.perf_counter() + seconds
+                try:
+                    with ExitStack() as stack:
+                        for alias in connections:
+                            stack.enter_context(connections[alias].execute_wrapper(counter(alias)))
+                        while time.perf_counter() < deadline:
+                            start = time.perf_counter()
+                            try:
+                                code = client.get(url).status_code
+                            except OperationalError:
+                                code = 'locked'
+                            timings.append(time.perf_counter() - start)
+                            with lock:
+                                totals[code] += 1
+                finally:
+                    connections.close_all()
+                with lock:
+                    all_timings.extend(timings)
+                    queries.update(counts)
+
+            def write():
+                gate.wait()
+                deadline = time.perf_counter() + seconds
+                try:
+                    while time.perf_counter() < deadline:
+                        try:
+                            place_bid(hot.pk, writer, next(amounts))
+                            totals['bids'] += 1
+                        except OperationalError:
+                            totals['bids_locked'] += 1
+                finally:
+                    connections.close_all()
+
+            with replica_aliases(paths[:count]), unthrottled():
+                threads = [threading.Thread(target=read, args=(token,)) for token in tokens]
+                threads.append(threading.Thread(target=write))
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+            results.append({
+                'benchmark': 'read-replicas', 'replicas': count, 'readers': readers,
+                'reads_per_s': round(totals[200] / seconds),
+                'p50_ms': round(percentile(all_timings, 0.5) * 1000, 2),
+                'p95_ms': round(percentile(all_timings, 0.95) * 1000, 2), 'locked': totals['locked'],
+                'primary_queries_per_s': round(queries.pop('default', 0) / seconds),
+                'busiest_replica_queries_per_s': round(max(queries.values(), default=0) / seconds),
+                'bids_per_s': round(totals['bids'] / seconds), 'bids_locked': totals['bids_locked'],
+            })
+    return results
+
+
+def bulk_bids(total=2000, batch_sizes=(1, 10, 100, 500), auctions=20):
+    """
+    Bids per second through ``POST /api/bids/bulk/`` for growing batch sizes,
+    next to the single-bid endpoint. Bids are spread over ``auctions`` auctions.
+    """
+    results = []
+    with benchmark_database():
+        owner = User.objects.create_user(username='bench-owner', password='bench')
+        bidder = User.objects.create_user(username='bench-bidder', password='bench')
+        client = Client()
+        client.force_login(bidder)
+
+        def run(label, batch_size, send):
+            Auction.objects.all().delete()
+            ids = [Auction.objects.create(owner=owner, title=f'Auction {i}', starting_price=1,
+                                          ends_at=timezone.now() + timedelta(days=1)).pk for i in range(auctions)]
+            amounts = (Decimal(2 + step // auctions) for step in range(total))
+            bids = [{'auction': ids[step % auctions], 'amount': str(next(amounts))} for step in range(total)]
+            with count_queries() as counter:
+                start = time.perf_counter()
+                for offset in range(0, total, batch_size):
+                    send(bids[offset:offset + batch_size])
+                elapsed = time.perf_counter() - start
+            assert Bid.objects.count() == total
+            results.append({
+                'benchmark': 'bulk-bids', 'endpoint': label, 'batch_size': batch_size,
+                'bids_per_sec': round(total / elapsed), 'queries_per_bid': round(counter['queries'] / total, 3),
+            })
+
+        def single(batch):
+            response = client.post(reverse('bid-list'), batch[0])
+            assert response.status_code == 201, response.status_code
+
+        def bulk(batch):
+            response = client.post(reverse('bid-bulk'), {'bids': batch}, content_type='application/json')
+            assert response.status_code == 200 and response.json()['accepted'] == len(batch), response.content
+
+        run('single', 1, single)
+        for batch_size in batch_sizes:
+            run('bulk', batch_size, bulk)
+    return results
+
+
+def proxy_war(sizes=(100, 300, 1000), auctions=20, step=25, seed=0):
+    """
+    ``auctions`` auctions with ``sizes`` competing proxies each (hidden
+    maximums up to ``10 * size``), and a manual bidder raising by ``step``
+    until they lead. Every manual bid is answered by all the proxies inside
+    ``place_bid``. Reports the cost per manual bid and the visible bids per
+    auction, next to the increments the same war needs as manual bids.
+    """
+    results = []
+    with benchmark_database():
+        owner = User.objects.create_user(username='bench-owner', password='bench')
+        manual = User.objects.create_user(username='bench-manual', password='bench')
+        for size in sizes:
+            rng = random.Random(seed)
+            bidders = User.objects.bulk_create([User(username=f'bench-proxy-{size}-{i}') for i in range(size)])
+            timings, visible, increments = [], 0, 0
+            for _ in range(auctions):
+                auction = Auction.objects.create(owner=owner, title=f'War {size}', starting_price=1,
+                                                 ends_at=timezone.now() + timedelta(days=1))
+                ProxyBid.objects.bulk_create([
+                    ProxyBid(auction=auction, user=bidder, max_amount=Decimal(rng.randint(2, 10 * size)))
+                    for bidder in bidders
+                ])
+                amount = Decimal(0)
+                while auction.top_bidder_id != manual.pk:
+                    amount = max(amount, auction.highest_bid) + step
+                    start = time.perf_counter()
+                    place_bid(auction.pk, manual, amount)
+                    timings.append((time.perf_counter() - start) * 1000)
+                    auction.refresh_from_db(fields=['highest_bid', 'top_bidder', 'bid_count'])
+                visible += auction.bid_count
+                increments += int((auction.highest_bid - auction.starting_price) / PROXY_INCREMENT)
+            results.append({
+                'benchmark': 'proxy-war', 'proxies': size, 'manual_bids': len(timings),
+                'p50_ms': round(statistics.median(timings), 3), 'p99_ms': round(percentile(timings, 0.99), 3),
+                'visible_bids_per_auction': round(visible / auctions, 1),
+                'manual_increments_per_auction': round(increments / auctions),
+            })
+    return results
+
+
+async def fan_out(subscribers, events):
+    application = URLRouter(websocket_urlpatterns)
+    channel_layer = get_channel_layer()
+    communicators = [WebsocketCommunicator(application, '/ws/auctions/1/') for _ in range(subscribers)]
+    for communicator in communicators:
+        connected, _ = await communicator.connect()
+        assert connected
+    timings = []
+    for i in range(events):
+        event = {'type': 'bid', 'auction': 1, 'amount': f'{100 + i}.00'}
+        start = time.perf_counter()
+        await channel_layer.group_send(auction_group(1), {'type': 'auction.event', 'event': event})
+        await asyncio.gather(*(communicator.receive_json_from(timeout=30) for communicator in communicators))
+        timings.append((time.perf_counter() - start) * 1000)
+    for communicator in communicators:
+        await communicator.disconnect()
+    return timings
+
+
+def ws_fanout(sizes=(100, 1000, 2000), events=10):
+    """
+    Time from one ``group_send`` until every subscriber of the auction has the
+    delta, on the configured channel layer. The stream never touches the DB.
+
+    Set ``REDIS_URL`` to measure the production layer: the in-memory layer
+    rescans every channel on each receive, so it degrades quadratically.
+    """
+    results = []
+    for subscribers in sizes:
+        with CaptureQueriesContext(connection) as ctx:
+            timings = asyncio.run(fan_out(subscribers, events))
+        results.append({
+            'benchmark': 'ws-fanout', 'subscribers': subscribers,
+            'p50_ms': round(statistics.median(timings), 3), 'max_ms': round(max(timings), 3),
+            'deliveries_per_sec': round(subscribers * events / (sum(timings) / 1000)),
+            'queries': len(ctx.captured_queries),
+        })
+    return results
+
+
+def index_lookups(sizes=(10000, 100000, 1000000), auctions=1000, repeat=200):
+    """
+    Top-bid lookup and an idle close sweep (two index lookups) as the bids
+    table grows. Both stay flat because they are answered from the hot-path
+    indexes.
+    """
+    results = []
+    with benchmark_database():
+        owner = User.objects.create_user(username='bench-owner', password='bench')
+        users = [User.objects.create_user(username=f'bench-bidder-{i}', password='bench') for i in range(10)]
+        seed_auctions(auctions, owner)
+        auction_ids = list(Auction.objects.values_list('pk', flat=True))
+        Auction.objects.settle()
+        seeded = 0
+        for size in sizes:
+            seed_bids(size - seeded, auction_ids, users)
+            seeded = size
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            probe = auction_ids[len(auction_ids) // 2]
+            top_bid = Bid.objects.filter(auction_id=probe).order_by('-amount', 'created_at', 'pk')
+            results.append({
+                'benchmark': 'index-lookups', 'bids': size,
+                'top_bid_ms': round(timed(lambda: top_bid.values_list('user', flat=True).first(), repeat), 4),
+                'close_sweep_ms': round(timed(Auction.objects.settle, repeat), 4),
+            })
+    return results
+
+
+def auction_stats(sizes=(10000, 100000, 1000000), auctions=2000, repeat=20):
+    """
+    Summary list and leaderboard pages as the bids table grows, aggregated
+    from the bids (``source=bids``) or read from the per-auction snapshot
+    columns (``source=snapshot``).
+    """
+    results = []
+    with benchmark_database():
+        owner = User.objects.create_user(username='bench-owner', password='bench')
+        users = [User.objects.create_user(username=f'bench-bidder-{i}', password='bench') for i in range(10)]
+        seed_auctions(auctions, owner)
+        auction_ids = list(Auction.objects.values_list('pk', flat=True))
+        client = Client()
+        seeded = 0
+        for size in sizes:
+            seed_bids(size - seeded, auction_ids, users)
+            seeded = size
+            refresh_bid_aggregates()
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            for source in ('bids', 'snapshot'):
+                with override_settings(AUCTION_STATS_SNAPSHOT=source == 'snapshot'):
+                    for route in ('auction-summary-list', 'auction-leaderboard'):
+                        p50, p99, queries = measure(client, reverse(route), repeat)
+                        results.append({'benchmark': 'auction-stats', 'route': route, 'source': source, 'bids': size,
+                                        'p50_ms': round(p50, 3), 'p99_ms': round(p99, 3), 'queries': queries})
+    return results
+
+
+def feed_sync(history=(1000, 10000), new=(0, 10, 100), auctions=200):
+    """
+    A bidder's full feed download against a ``since`` sync, for a growing
+    bid history and a few sizes of new activity since the last sync.
+    """
+    results = []
+    with benchmark_database():
+        owner = User.objects.create_user(username='bench-owner', password='bench')
+        bidder = User.objects.create_user(username='bench-bidder', password='bench')
+        seed_auctions(auctions, owner, expired_ratio=0)
+        auction_ids = list(Auction.objects.values_list('pk', flat=True))
+        client = Client()
+        client.force_login(bidder)
+        url = reverse('bid-feed')
+
+        def sync(since=None):
+            """Follow ``next`` to the end; returns (requests, bytes, cursor)."""
+            requests, size, params = 0, 0, {'page_size': 200, **({'since': since} if since else {})}
+            while True:
+                response = client.get(url, params)
+                requests, size = requests + 1, size + len(response.content)
+                data = response.json()
+                if not data['next']:
+                    return requests, size, data['cursor']
+                params['since'] = data['cursor']
+
+        seeded = 0
+        for size in history:
+            seed_bids(size - seeded, auction_ids, [bidder])
+            seeded = size
+            start = time.perf_counter()
+            requests, full_bytes, cursor = sync()
+            results.append({'benchmark': 'feed-sync', 'history': size, 'mode': 'full', 'requests': requests,
+                            'bytes': full_bytes, 'ms': round((time.perf_counter() - start) * 1000, 1)})
+            for count in new:
+                seed_bids(count, auction_ids, [bidder])
+                seeded += count
+                start = time.perf_counter()
+                requests, delta_bytes, cursor = sync(cursor)
+                results.append({'benchmark': 'feed-sync', 'history': size, 'mode': f'since+{count}',
+                                'requests': requests, 'bytes': delta_bytes,
+                                'ms': round((time.perf_counter() - start) * 1000, 1)})
+    return results
+
+
+def archive(history=(10000, 100000), live=1000, bids_per_auction=10, repeat=20):
+    """
+    Hot-table size and list latency with ``history`` long-settled auctions
+    next to ``live`` open ones, before and after archiving; ``archive_ms`` is
+    the time to move the history out.
+    """
+    results = []
+    for size in history:
+        with benchmark_database():
+            owner = User.objects.create_user(username='bench-owner', password='bench')
+            users = [User.objects.create_user(username=f'bench-bidder-{i}', password='bench') for i in range(10)]
+            seed_auctions(size, owner, expired_ratio=1)
+            Auction.objects.update(is_closed=True, ends_at=timezone.now() - timedelta(days=60))
+            seed_auctions(live, owner, expired_ratio=0)
+            auction_ids = list(Auction.objects.values_list('pk', flat=True))
+            seed_bids((size + live) * bids_per_auction, auction_ids, users)
+            refresh_bid_aggregates()
+            Auction.objects.filter(is_closed=True).update(winner=F('top_bidder'))
+            client = Client()
+
+            def row(stage, **extra):
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+                row = {'benchmark': 'archive', 'history': size, 'live': live, 'stage': stage,
+                       'auctions': Auction.objects.count(), 'bids': Bid.objects.count(), **extra}
+                for route, params in (('auction-list', '?status=closed'), ('auction-summary-list', '')):
+                    p50, _, _ = measure(client, reverse(route) + params, repeat)
+                    row[f'{route}_p50_ms'] = round(p50, 3)
+                return row
+
+            results.append(row('before'))
+            start = time.perf_counter()
+            archived, archived_bids = archive_closed(older_than_days=30, max_batches=size)
+            elapsed = time.perf_counter() - start
+            assert ArchivedAuction.objects.count() == archived == size
+            results.append(row('after', archive_ms=round(elapsed * 1000), archived_bids=archived_bids,
+                               auctions_per_s=round(archived / elapsed)))
+    return results
+
+
+def settlement(sizes=(10000, 100000), sold_ratio=0.5, batch_size=SETTLEMENT_BATCH_SIZE):
+    """
+    Settling ``size`` closed auctions, ``sold_ratio`` of them with a winner,
+    then delivering their notifications through the in-memory mail backend;
+    ``sweep_ms`` is a settlement run with nothing left to settle.
+    """
+    results = []
+    for size in sizes:
+        with benchmark_database(), override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'):
+            owner = User.objects.create_user(username='bench-owner', password='bench', email='owner@example.com')
+            users = [User.objects.create_user(username=f'bench-bidder-{i}', password='bench', email=f'bidder-{i}@example.com')
+                     for i in range(10)]
+            seed_auctions(size, owner, expired_ratio=1)
+            auction_ids = list(Auction.objects.values_list('pk', flat=True))
+            seed_bids(int(size * sold_ratio), auction_ids[:int(size * sold_ratio)], users)
+            refresh_bid_aggregates()
+            Auction.objects.update(is_closed=True, winner=F('top_bidder'))
+            batches = -(-size // batch_size)
+
+            with count_queries() as counter:
+                start = time.perf_counter()
+                settled = settle_closed(batch_size=batch_size, max_batches=batches)
+                settle_elapsed = time.perf_counter() - start
+            settle_queries = counter['queries']
+            assert settled == Settlement.objects.count() == size
+            start = time.perf_counter()
+            delivered = deliver_pending(batch_size=batch_size, max_batches=batches * 2)
+            deliver_elapsed = time.perf_counter() - start
+            assert delivered == Notification.objects.count()
+            sweep_ms = timed(lambda: settle_closed(batch_size=batch_size), 5)
+            results.append({
+                'benchmark': 'settlement', 'auctions': size, 'sold': Settlement.objects.filter(buyer__isnull=False).count(),
+                'settle_ms': round(settle_elapsed * 1000), 'auctions_per_s': round(settled / settle_elapsed),
+                'queries_per_batch': round(settle_queries / batches, 1),
+                'notifications': delivered, 'deliver_ms': round(deliver_elapsed * 1000),
+                'notifications_per_s': round(delivered / deliver_elapsed), 'sweep_ms': round(sweep_ms, 3),
+            })
+    return results
+
+
+def export_stream(sizes=(10000, 100000, 1000000), auctions=1000):
+    """
+    Full bids export through the endpoint as the table grows: throughput from
+    a plain run, peak Python memory from a second run under tracemalloc.
+    """
+    results = []
+    with benchmark_database():
+        admin = User.objects.create_superuser(username='bench-admin', password='bench')
+        users = [User.objects.create_user(username=f'bench-bidder-{i}', password='bench') for i in range(10)]
+        seed_auctions(auctions, admin)
+        auction_ids = list(Auction.objects.values_list('pk', flat=True))
+        client = Client()
+        client.force_login(admin)
+        url = reverse('export', args=['bids'])
+        seeded = 0
+        for size in sizes:
+            seed_bids(size - seeded, auction_ids, users)
+            seeded = size
+            for fmt in FORMATS:
+                start = time.perf_counter()
+                total = sum(len(chunk) for chunk in client.get(url, {'format': fmt}).streaming_content)
+                elapsed = time.perf_counter() - start
+                tracemalloc.start()
+                for _ in client.get(url, {'format': fmt}).streaming_content:
+                    pass
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                results.append({'benchmark': 'export', 'format': fmt, 'rows': size, 'mib': round(total / 2 ** 20, 1),
+                                'rows_per_s': round(size / elapsed), 'peak_kib': round(peak / 1024)})
+    return results
+
+
+def catalogue_words(size=5000, seed=0):
+    """``size`` made-up words, most frequent first, and their Zipf cumulative weights."""
+    rng = random.Random(seed)
+    syllables = [consonant + vowel for consonant in 'bdfgklmnprstwz' for vowel in 'aeiou']
+    words = []
+    seen = set()
+    while len(words) < size:
+        word = ''.join(rng.choices(syllables, k=rng.randint(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    cum_weights, total = [], 0
+    for rank in range(size):
+        total += 1 / (rank + 1)
+        cum_weights.append(total)
+    return words, cum_weights
+
+
+def seed_catalogue(count, owner, words, cum_weights, seed=0):
+    """Bulk insert ``count`` auctions with Zipf-distributed titles and descriptions."""
+    rng = random.Random(seed)
+    now = timezone.now()
+    batch = []
+    for i in range(count):
+        price = Decimal(rng.randint(1, 2000))
+        batch.append(Auction(
+            owner=owner,
+            title=' '.join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(2, 5))).capitalize(),
+            description=' '.join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(8, 24))),
+            starting_price=price,
+            highest_bid=price,
+            ends_at=now + timedelta(hours=rng.randint(-48, 48)),
+        ))
+        if len(batch) >= BATCH_SIZE:
+            Auction.objects.bulk_create(batch)
+            batch = []
+    Auction.objects.bulk_create(batch)
+
+
+def full_text_search(sizes=(10000, 100000, 1000000), repeat=20, scan_repeat=3):
+    """
+    ``/api/auctions/search/`` as the catalogue grows, for a common word, a rare
+    one, two words and a prefix: ranked page plus facets through the full-text
+    index, against a substring scan of titles and descriptions (``scan_ms``,
+    count and first page only). ``insert_rows_per_s`` is the seeding rate with
+    the index triggers in place.
+    """
+    words, cum_weights = catalogue_words()
+    queries = {
+        'common': words[10],
+        'rare': words[3000],
+        'two-words': f'{words[10]} {words[50]}',
+        'prefix': words[100][:3],
+    }
+    results = []
+    with benchmark_database():
+        owner = User.objects.create_user(username='bench-owner', password='bench')
+        client = Client()
+        seeded = 0
+        for size in sizes:
+            start = time.perf_counter()
+            seed_catalogue(size - seeded, owner, words, cum_weights, seed=size)
+            insert_rate = (size - seeded) / (time.perf_counter() - start)
+            seeded = size
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            for name, text in queries.items():
+                url = f"{reverse('auction-search')}?{urlencode({'q': text})}"
+                matches = client.get(url).json()['count']
+                p50, p99, per_request = measure(client, url, repeat)
+                scan = Auction.objects.filter(Q(title__icontains=text) | Q(description__icontains=text))
+                scan_ms = timed(lambda: (scan.count(), list(scan.order_by('id')[:20])), scan_repeat)
+                results.append({'benchmark': 'search', 'auctions': size, 'query': name, 'matches': matches,
+                                'p50_ms': round(p50, 2), 'p99_ms': round(p99, 2), 'queries': per_request,
+                                'scan_ms': round(scan_ms, 2), 'insert_rows_per_s': round(insert_rate)})
+    return results
+
+
+BENCH_PASSWORD = 'bench-password'
+
+
+def serializer_speed(objects=200, repeat=50):
+    """
+    Microseconds per object to fetch a page of ``objects``, serialize it and
+    render it as JSON, with the ModelSerializers on instances and with the
+    row serializers on ``.values()`` rows; then rendering alone with DRF's
+    ``JSONRenderer`` (which is also ``FastJSONRenderer``'s fallback) and with
+    orjson, when it is installed.
+    """
+    results = []
+    with benchmark_database():
+        seed_marketplace(users=50, auctions=objects * 2, bids_per_auction=2)
+        cases = (
+            ('auction-list', Auction.objects.for_list(), AuctionListSerializer, AuctionListRowSerializer),
+            ('auction-stats', Auction.objects.for_stats(), AuctionStatsSerializer, AuctionStatsRowSerializer),
+            ('bid-list', Bid.objects.select_related('user'), BidSerializer, BidRowSerializer),
+        )
+        renderer = FastJSONRenderer()
+
+        def per_object(ms):
+            return round(ms * 1000 / objects, 2)
+
+        for name, queryset, model_serializer, row_serializer in cases:
+            queryset = queryset.order_by('pk')[:objects]
+            for kind, serializer, page in (('model', model_serializer, queryset),
+                                           ('rows', row_serializer, row_serializer.rows(queryset))):
+                fetched = list(page.all())
+                results.append({
+                    'benchmark': 'serializers', 'page': name, 'serializer': kind, 'objects': objects,
+                    'fetch_us': per_object(timed(lambda: list(page.all()), repeat)),
+                    'serialize_us': per_object(timed(lambda: serializer(fetched, many=True).data, repeat)),
+                    'total_us': per_object(timed(lambda: renderer.render(serializer(list(page.all()), many=True).data),
+                                                 repeat)),
+                })
+
+            data = model_serializer(list(queryset), many=True).data
+            renderings = {'drf': timed(lambda: JSONRenderer().render(data), repeat)}
+            if orjson is not None:
+                renderings['orjson'] = timed(lambda: renderer.render(data), repeat)
+            for kind, ms in renderings.items():
+                results.append({'benchmark': 'serializers', 'page': name, 'renderer': kind, 'objects': objects,
+                                'render_us': per_object(ms)})
+    return results
+
+
+def seed_marketplace(users=50, auctions=500, bids_per_auction=10, skew=1.2, seed=0):
+    """
+    Seed ``users`` users, ``auctions`` open auctions and on average
+    ``bids_per_auction`` bids per auction. Bids follow a Zipf-like popularity
+    curve (``skew``), so a few hot auctions collect most of them, as in real
+    traffic. Returns the users, the hottest auction and one of its bids.
+    """
+    rng = random.Random(seed)
+    people = [User.objects.create_user(username='bench-owner', password=BENCH_PASSWORD)]
+    User.objects.bulk_create([User(username=f'bench-user-{i}') for i in range(users - 1)])
+    people += list(User.objects.filter(username__startswith='bench-user-').order_by('pk'))
+
+    now = timezone.now()
+    Auction.objects.bulk_create([
+        Auction(owner=rng.choice(people), title=f'Auction {i}', description='Seeded by the benchmark harness.',
+                starting_price=Decimal(10), highest_bid=Decimal(10), ends_at=now + timedelta(days=1, minutes=i))
+        for i in range(auctions)
+    ], batch_size=BATCH_SIZE)
+    auction_rows = list(Auction.objects.values_list('pk', 'owner_id').order_by('pk'))
+    weights = [1 / (rank + 1) ** skew for rank in range(len(auction_rows))]
+
+    prices = {}
+    bids = []
+    for auction_id, owner_id in rng.choices(auction_rows, weights=weights, k=auctions * bids_per_auction):
+        bidder = rng.choice(people)
+        if bidder.pk == owner_id:
+            continue
+        prices[auction_id] = prices.get(auction_id, 10) + rng.randint(1, 20)
+        bids.append(Bid(auction_id=auction_id, user=bidder, amount=Decimal(prices[auction_id])))
+    Bid.objects.bulk_create(bids, batch_size=BATCH_SIZE)
+    refresh_bid_aggregates()
+
+    hot = Auction.objects.get(pk=auction_rows[0][0])
+    hot_bid = hot.bids.select_related('user').first()
+    return people, hot, hot_bid
+
+
+def route_specs(people, hot, hot_bid):
+    """
+    One entry per route in ``auctions/urls.py``: how to call it, as whom
+    (``user=None`` for anonymous), and the status it should answer with.
+    """
+    owner, bidder = hot.owner, hot_bid.user
+    admin = User.objects.create_superuser(username='bench-admin', password=BENCH_PASSWORD)
+    counter = iter(range(10 ** 9))
+    refresh = issue_tokens(owner)['refresh']
+    return [
+        {'name': 'api-root', 'url': reverse('api-root'), 'user': bidder},
+        {'name': 'auction-list', 'url': reverse('auction-list'), 'user': bidder},
+        {'name': 'auction-list-filtered', 'url': reverse('auction-list') + '?status=open&min_price=20', 'user': bidder},
+        {'name': 'auction-detail', 'url': reverse('auction-detail', args=[hot.pk]), 'user': owner},
+        {'name': 'auction-summary', 'url': reverse('auction-summary', args=[hot.pk]), 'user': owner},
+        {'name': 'auction-bids', 'url': reverse('auction-bids', args=[hot.pk]), 'user': owner},
+        {'name': 'auction-my-auctions', 'url': reverse('auction-my-auctions'), 'user': owner},
+        {'name': 'auction-summary-list', 'url': reverse('auction-summary-list'), 'user': bidder},
+        {'name': 'auction-leaderboard', 'url': reverse('auction-leaderboard'), 'user': bidder},
+        {'name': 'auction-search', 'url': reverse('auction-search') + '?q=auction&status=open', 'user': bidder},
+        {'name': 'auction-create', 'method': 'post', 'url': reverse('auction-list'), 'user': owner, 'status': 201,
+         'data': lambda: {'title': 'Fresh', 'starting_price': '10.00',
+                          'ends_at': (timezone.now() + timedelta(days=2)).isoformat()}},
+        {'name': 'bid-list', 'url': reverse('bid-list'), 'user': bidder},
+        {'name': 'bid-detail', 'url': reverse('bid-detail', args=[hot_bid.pk]), 'user': bidder},
+        {'name': 'bid-my-bids', 'url': reverse('bid-my-bids'), 'user': bidder},
+        {'name': 'bid-feed', 'url': reverse('bid-feed'), 'user': bidder},
+        {'name': 'bid-feed-since', 'url': f"{reverse('bid-feed')}?since={SyncPagination.encode_cursor(hot_bid)}",
+         'user': bidder},
+        {'name': 'bid-create', 'method': 'post', 'url': reverse('bid-list'), 'user': bidder, 'status': 201,
+         'data': lambda: {'auction': hot.pk, 'amount': str(10 ** 6 + next(counter))}},
+        {'name': 'bid-bulk', 'method': 'post', 'url': reverse('bid-bulk'), 'user': bidder,
+         'content_type': 'application/json',
+         'data': lambda: {'bids': [{'auction': hot.pk, 'amount': str(10 ** 6 + next(counter))} for _ in range(50)]}},
+        {'name': 'proxy-bid-list', 'url': reverse('proxy-bid-list'), 'user': bidder},
+        {'name': 'proxy-bid-create', 'method': 'post', 'url': reverse('proxy-bid-list'), 'user': bidder, 'status': 201,
+         'data': lambda: {'auction': hot.pk, 'max_amount': str(10 ** 7 + next(counter))}},
+        {'name': 'my-profile', 'url': reverse('my-profile'), 'user': bidder},
+        {'name': 'cache-stats', 'url': reverse('cache-stats'), 'user': admin},
+        {'name': 'export', 'user': admin, 'url': reverse('export', args=['auctions']) + '?' + urlencode(
+            {'format': 'csv', 'since': hot.ends_at.isoformat(), 'until': (hot.ends_at + timedelta(hours=1)).isoformat()})},
+        {'name': 'register', 'method': 'post', 'url': reverse('register'), 'user': None, 'status': 201, 'repeat': 3,
+         'data': lambda: {'username': f'bench-new-{next(counter)}', 'password': BENCH_PASSWORD}},
+        {'name': 'login', 'method': 'post', 'url': reverse('login'), 'user': None, 'fresh': True, 'repeat': 3,
+         'data': lambda: {'username': people[0].username, 'password': BENCH_PASSWORD}},
+        {'name': 'token-refresh', 'method': 'post', 'url': reverse('token-refresh'), 'user': None,
+         'data': lambda: {'refresh': refresh}},
+        {'name': 'logout', 'method': 'post', 'url': reverse('logout'), 'user': bidder, 'fresh': True},
+        {'name': 'api-auth-login', 'url': reverse('rest_framework:login'), 'user': None},
+    ]
+
+
+def run_route(spec, repeat):
+    """Drive one route through the test client; returns latency, query and size figures."""
+    client = Client()
+    method = getattr(client, spec.get('method', 'get'))
+    expected = spec.get('status', 200)
+    repeat = min(repeat, spec.get('repeat', repeat))
+    timings, sizes, queries = [], [], 0
+    for _ in range(repeat):
+        if spec.get('fresh'):
+            client.logout()
+        if spec.get('user') and (spec.get('fresh') or not timings):
+            client.force_login(spec['user'])
+        data = spec['data']() if 'data' in spec else None
+        with count_queries() as counter:
+            start = time.perf_counter()
+            if data is None:
+                response = method(spec['url'])
+            else:
+                response = method(spec['url'], data, content_type=spec.get('content_type', MULTIPART_CONTENT))
+            content = b''.join(response.streaming_content) if response.streaming else response.content
+            timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == expected, (spec['name'], response.status_code, getattr(response, 'data', None))
+        sizes.append(len(content))
+        queries += counter['queries']
+    return {
+        'benchmark': 'api-routes', 'route': spec['name'], 'requests': repeat,
+        'p50_ms': round(statistics.median(timings), 3), 'p99_ms': round(percentile(timings, 0.99), 3),
+        'queries': round(queries / repeat, 2), 'bytes': round(statistics.mean(sizes)),
+    }
+
+
+def unthrottled():
+    """Bid throttles that still run, at rates the harness never reaches."""
+    rates = {scope: '1000000/s' for scope in settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']}
+    return override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates})
+
+
+def run_api_routes(users=50, auctions=500, bids_per_auction=10, repeat=20):
+    """Seed a marketplace in the current database and measure every route."""
+    specs = route_specs(*seed_marketplace(users, auctions, bids_per_auction))
+    with unthrottled():
+        return [run_route(spec, repeat) for spec in specs]
+
+
+# Per-route ceilings; check_budgets() fails a run that goes over any of them.
+# Query counts include the session and user lookups; bytes are for one page.
+DEFAULT_BUDGET = {'queries': 8, 'bytes': 64 * 1024, 'p99_ms': 500}
+ROUTE_BUDGETS = {
+    # Password hashing dominates these two.
+    'register': {'p99_ms': 2000},
+    'login': {'p99_ms': 2000},
+}
+
+
+def check_budgets(results):
+    """Return a message for every route that exceeded its budget."""
+    violations = []
+    for row in results:
+        budget = {**DEFAULT_BUDGET, **ROUTE_BUDGETS.get(row['route'], {})}
+        for metric, limit in budget.items():
+            if row[metric] > limit:
+                violations.append(f"{row['route']}: {metric}={row[metric]} exceeds {limit}")
+    return violations
+
+
+def api_routes(users=200, auctions=10000, bids_per_auction=20, repeat=50):
+    """Every route in ``auctions/urls.py`` against a skewed, seeded marketplace."""
+    with benchmark_database():
+        return run_api_routes(users, auctions, bids_per_auction, repeat)
+
+
+def auth_row(mode, get, requests):
+    with count_queries() as counter:
+        start = time.perf_counter()
+        for _ in range(requests):
+            response = get()
+            assert response.status_code == 200, (mode, response.status_code)
+        elapsed = time.perf_counter() - start
+    return {
+        'benchmark': 'auth-throughput', 'mode': mode, 'requests': requests,
+        'req_per_sec': round(requests / elapsed, 1), 'queries': round(counter['queries'] / requests, 2),
+    }
+
+
+def auth_throughput(requests=500, basic_requests=10):
+    """
+    Authenticated GETs per second for each way of authenticating.
+    ``session-save-every-request`` is the old session configuration. ``basic``
+    calls the view directly, without middleware; the password hash dominates it.
+    """
+    with benchmark_database():
+        user = User.objects.create_user(username='bench-reader', password=BENCH_PASSWORD)
+        url = reverse('my-profile')
+
+        session = Client()
+        session.force_login(user)
+        with override_settings(SESSION_SAVE_EVERY_REQUEST=True):
+            rows = [auth_row('session-save-every-request', lambda: session.get(url), requests)]
+        rows.append(auth_row('session', lambda: session.get(url), requests))
+
+        jwt = Client(HTTP_AUTHORIZATION=f"Bearer {issue_tokens(user)['access']}")
+        rows.append(auth_row('jwt', lambda: jwt.get(url), requests))
+
+        view = MyProfileView.as_view(authentication_classes=[BasicAuthentication])
+        credentials = b64encode(f'{user.username}:{BENCH_PASSWORD}'.encode()).decode()
+        factory = RequestFactory()
+        rows.append(auth_row('basic', lambda: view(factory.get(url, HTTP_AUTHORIZATION=f'Basic {credentials}')),
+                             basic_requests))
+        return rows
+
+
+async def asgi_get(app, url, headers, hold):
+    """One GET through the ASGI app from a client that takes ``hold`` seconds to send its request."""
+    received = False
+
+    async def receive():
+        nonlocal received
+        if received:
+            await asyncio.Event().wait()  # connected until the response is out
+        received = True
+        await asyncio.sleep(hold)
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    statuses = []
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+
+    path, _, query = url.partition('?')
+    await app({
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', b'testserver'), *headers], 'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+    }, receive, send)
+    return statuses[0]
+
+
+def wsgi_get(url, authorization, hold):
+    time.sleep(hold)  # a sync worker is blocked while the client sends
+    return Client(HTTP_AUTHORIZATION=authorization).get(url).status_code
+
+
+def load_row(server, workers, clients, hold, run, work):
+    """Time ``run(work)``, then trace one round of ``clients`` requests for the memory peak."""
+    start = time.perf_counter()
+    timings = run(work)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    run(work[:clients])
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'benchmark': 'async-load', 'server': server, 'workers': workers, 'clients': clients,
+        'hold_ms': round(hold * 1000), 'requests': len(timings), 'req_per_s': round(len(timings) / elapsed, 1),
+        'p50_ms': round(percentile(timings, 0.5) * 1000, 1), 'p99_ms': round(percentile(timings, 0.99) * 1000, 1),
+        'threads': workers, 'peak_kib': round(peak / 1024),
+    }
+
+
+def async_load(clients=200, requests_per_client=5, hold_ms=200, workers=(8, 64)):
+    """
+    Read throughput with many slow clients: the ASGI app on one event loop
+    against the WSGI app on a fixed pool of worker threads. Every request
+    waits ``hold_ms`` for its client before it reaches Django. ``threads``
+    (each with its own stack) and ``peak_kib`` (traced Python allocations
+    during one round of ``clients`` concurrent requests) are the memory side.
+    """
+    with benchmark_database():
+        people, hot, _ = seed_marketplace(users=50, auctions=2000, bids_per_auction=5)
+        authorization = f"Bearer {issue_tokens(hot.owner)['access']}"
+        urls = [reverse('auction-list'), reverse('bid-list'), reverse('auction-summary', args=[hot.pk]),
+                f"{reverse('auction-list')}?status=open"]
+        work = [urls[i % len(urls)] for i in range(clients * requests_per_client)]
+        hold = hold_ms / 1000
+
+        app = get_asgi_application()
+        headers = [(b'authorization', authorization.encode())]
+
+        def clients_run(get):
+            """``clients`` concurrent clients, each sending its share of ``work`` one request at a time."""
+            def run(work):
+                timings = []
+
+                async def client(requests):
+                    for url in requests:
+                        start = time.perf_counter()
+                        if await get(url) != 200:
+                            raise RuntimeError(f"GET {url} failed")
+                        timings.append(time.perf_counter() - start)
+
+                async def main():
+                    await asyncio.gather(*(client(work[i::clients]) for i in range(clients)))
+
+                asyncio.run(main())
+                return timings
+            return run
+
+        # The event loop plus Django's one thread for sync and ORM work.
+        rows = [load_row('asgi', 2, clients, hold, clients_run(lambda url: asgi_get(app, url, headers, hold)), work)]
+        for size in workers:
+            with ThreadPoolExecutor(size) as pool:
+                def get(url):
+                    return asyncio.get_running_loop().run_in_executor(pool, wsgi_get, url, authorization, hold)
+                rows.append(load_row('wsgi', size, clients, hold, clients_run(get), work))
+        return rows
+
+
+# What a process of each role imports before it can serve: its server
+# entrypoint, then the URLconf (loaded on the first request) or the tasks.
+ROLE_ENTRYPOINTS = {
+    'all': 'from django_REST_API_auction_house.asgi import application\n'
+           'from django.urls import get_resolver; get_resolver().url_patterns',
+    'api': 'from django_REST_API_auction_house.wsgi import application\n'
+           'from django.urls import get_resolver; get_resolver().url_patterns',
+    'websocket': 'from django_REST_API_auction_house.asgi import application\n'
+                 'from django.urls import get_resolver; get_resolver().url_patterns',
+    'worker': 'import django; django.setup()\n'
+              'from django_REST_API_auction_house.celery import app; app.loader.import_default_modules()',
+    'docs': 'from django_REST_API_auction_house.wsgi import application\n'
+            'from django.urls import get_resolver; get_resolver().url_patterns',
+}
+# Peak RSS of the process itself: ru_maxrss survives exec on Linux, so the
+# child would report the benchmark's own footprint.
+STARTUP_REPORT = 'import json, sys\n' \
+                 'hwm = [line for line in open("/proc/self/status") if line.startswith("VmHWM")]\n' \
+                 'print(json.dumps({"modules": len(sys.modules), "rss_kib": int(hwm[0].split()[1])}))'
+
+
+def start_process(role, *flags):
+    env = {**os.environ, 'DJANGO_ROLE': role, 'DJANGO_SETTINGS_MODULE': 'django_REST_API_auction_house.settings'}
+    code = ROLE_ENTRYPOINTS[role] + '\n' + STARTUP_REPORT
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, *flags, '-c', code], env=env, capture_output=True, text=True,
+                             check=True, cwd=settings.BASE_DIR)
+    return (time.perf_counter() - start) * 1000, process
+
+
+def startup(repeat=7):
+    """
+    Cold start of each process role (``DJANGO_ROLE``) in a fresh interpreter:
+    wall time to ready (median), modules loaded, peak RSS, and the import
+    time ``-X importtime`` attributes to everything imported.
+    """
+    results = []
+    for role in ROLE_ENTRYPOINTS:
+        timings = [start_process(role)[0] for _ in range(repeat)]
+        _, process = start_process(role, '-X', 'importtime')
+        report = json.loads(process.stdout.strip().splitlines()[-1])
+        import_us = sum(int(line.split('|')[0].split(':')[1]) for line in process.stderr.splitlines()
+                        if line.startswith('import time:') and 'self [us]' not in line)
+        results.append({'benchmark': 'startup', 'role': role, 'startup_ms': round(statistics.median(timings)),
+                        'import_ms': round(import_us / 1000), 'modules': report['modules'],
+                        'rss_mib': round(report['rss_kib'] / 1024, 1)})
+    return results
+
+
+BENCHMARKS = {
+    'list-latency': list_latency,
+    'bid-throughput': bid_throughput,
+    'bid-flood': bid_flood,
+    'read-replicas': read_replicas,
+    'ws-fanout': ws_fanout,
+    'index-lookups': index_lookups,
+    'api-routes': api_routes,
+    'auth-throughput': auth_throughput,
+    'bulk-bids': bulk_bids,
+    'proxy-war': proxy_war,
+    'async-load': async_load,
+    'auction-stats': auction_stats,
+    'feed-sync': feed_sync,
+    'archive': archive,
+    'settlement': settlement,
+    'export': export_stream,
+    'serializers': serializer_speed,
+    'search': full_text_search,
+    'startup': startup,
+}
@@ -0,0 +1,271 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Case, F, Q, Value, When, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound, ValidationError
+from rest_framework.settings import api_settings
+
+from .models import Auction, Bid, ProxyBid
+from .signals import auctions_extended, bid_placed
+
+CENT = Decimal('0.01')
+MAX_BULK_BIDS = 500
+# How far a proxy bids above the competition.
+PROXY_INCREMENT = Decimal('1.00')
+
+
+class AuctionConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "The auction changed while the bids were applied. Retry."
+    default_code = 'auction_conflict'
+
+
+def place_bid(auction_id, user, amount, now=None):
+    """
+    Validate and record a bid in one transaction.
+
+    The auction row is advanced with a single conditional UPDATE, so two
+    concurrent bids can never both win and ``highest_bid`` can never move
+    backwards. The auction is only read when the bid is rejected, to explain why.
+    Proxies on the auction answer the bid in the same transaction.
+    """
+    now = now or timezone.now()
+    amount = Decimal(amount).quantize(CENT)
+    if amount <= 0:
+        raise ValidationError("Bid amount must be greater than zero.")
+
+    with transaction.atomic():
+        advanced = Auction.objects.filter(
+            pk=auction_id,
+            is_closed=False,
+            ends_at__gt=now,
+            highest_bid__lt=amount,
+        ).exclude(owner=user).update(
+            highest_bid=amount,
+            top_bidder=user,
+            bid_count=F('bid_count') + 1,
+        )
+        if not advanced:
+            raise rejection(auction_id, user, amount, now)
+        bid = Bid.objects.create(auction_id=auction_id, user=user, amount=amount)
+        bids = [bid] + run_proxies(auction_id, amount, user.pk)
+        soft_close([auction_id], now)
+        transaction.on_commit(lambda: bid_placed.send(sender=Bid, bids=bids))
+    return bid
+
+
+def soft_close(auction_ids, now):
+    """
+    Anti-sniping, when ``AUCTION_SOFT_CLOSE_SECONDS`` is set: the auctions
+    in ``auction_ids`` that end within that many seconds of ``now`` are
+    extended to end that long after it. One guarded UPDATE, so ``ends_at``
+    only ever moves later; ``auctions_extended`` lets the close scheduler
+    requeue once the transaction commits.
+    """
+    window = settings.AUCTION_SOFT_CLOSE_SECONDS
+    if not window:
+        return 0
+    ends_at = now + timedelta(seconds=window)
+    extended = Auction.objects.filter(pk__in=auction_ids, ends_at__lt=ends_at).update(ends_at=ends_at)
+    if extended:
+        transaction.on_commit(lambda: auctions_extended.send(sender=Auction, auction_ids=auction_ids, ends_at=ends_at))
+    return extended
+
+
+def refusal(auction, user, amount, now):
+    """Why ``user`` may not bid ``amount`` on ``auction``, or None if they may."""
+    if auction.owner_id == user.pk:
+        return "You cannot bid on your own auction."
+    if auction.is_closed or auction.ends_at <= now:
+        return "Bidding is no longer allowed. The auction has ended."
+    if amount <= auction.highest_bid:
+        return f"The bid must be higher than the current highest bid of {auction.highest_bid}"
+    return None
+
+
+def rejection(auction_id, user, amount, now):
+    """Build the error for a bid that did not pass the conditional UPDATE."""
+    auction = Auction.objects.filter(pk=auction_id).only('owner', 'ends_at', 'is_closed', 'highest_bid').first()
+    if auction is None:
+        return NotFound("Auction not found.")
+    return ValidationError(refusal(auction, user, amount, now) or "The auction changed while the bid was placed.")
+
+
+def place_bids(user, items, now=None):
+    """
+    Apply a batch of ``(index, auction_id, amount)`` bids by ``user``.
+
+    All auctions are locked and read in one query, their proxies in another.
+    Bids on the same auction are checked in submission order against the
+    running highest bid, and proxies answer each one, so a batch behaves
+    exactly like the same bids sent one by one. Accepted bids are written with
+    one UPDATE and one bulk INSERT. Returns one result per item.
+    """
+    now = now or timezone.now()
+    items = [(index, auction_id, Decimal(amount).quantize(CENT)) for index, auction_id, amount in items]
+    results = []
+    with transaction.atomic():
+        auctions = Auction.objects.select_for_update().only(
+            'owner', 'ends_at', 'is_closed', 'highest_bid', 'top_bidder',
+        ).in_bulk({auction_id for _, auction_id, _ in items})
+        original = {pk: auction.highest_bid for pk, auction in auctions.items()}
+        # Later bids only raise the bar, so the strongest proxies above the
+        # starting prices stay the strongest for the whole batch.
+        proxies = top_proxies(original)
+
+        accepted, bids = [], []
+        for index, auction_id, amount in items:
+            auction = auctions.get(auction_id)
+            if auction is None:
+                errors = {'auction': ["Auction not found."]}
+            else:
+                reason = refusal(auction, user, amount, now)
+                errors = reason and {api_settings.NON_FIELD_ERRORS_KEY: [reason]}
+            if errors:
+                # Shaped like a serializer's errors, as items rejected before reaching here are.
+                results.append({'index': index, 'auction': auction_id, 'amount': amount,
+                                'status': 'rejected', 'errors': errors})
+                continue
+            bid = Bid(auction_id=auction_id, user=user, amount=amount)
+            accepted.append((index, bid))
+            responses = resolve_proxies(amount, user.pk, proxies[auction_id])
+            bids += [bid] + [Bid(auction_id=auction_id, user_id=user_id, amount=bid_amount)
+                             for user_id, bid_amount in responses]
+            auction.highest_bid, auction.top_bidder_id = bids[-1].amount, bids[-1].user_id
+
+        if bids:
+            apply_batch(auctions, original, bids)
+            Bid.objects.bulk_create(bids)
+            soft_close(list({bid.auction_id for bid in bids}), now)
+            transaction.on_commit(lambda: bid_placed.send(sender=Bid, bids=bids))
+        for index, bid in accepted:
+            results.append({'index': index, 'auction': bid.auction_id, 'amount': bid.amount,
+                            'status': 'accepted', 'bid': bid.pk})
+    results.sort(key=lambda result: result['index'])
+    return results
+
+
+def apply_batch(auctions, original, bids):
+    """
+    Advance every touched auction to its in-memory state with a single UPDATE.
+    The filter repeats the highest bid each auction was read with, so a write
+    that slipped past the row lock (SQLite has none) fails the batch instead
+    of being overwritten.
+    """
+    counts = {}
+    for bid in bids:
+        counts[bid.auction_id] = counts.get(bid.auction_id, 0) + 1
+    guard = None
+    for pk in counts:
+        condition = Q(pk=pk, highest_bid=original[pk])
+        guard = condition if guard is None else guard | condition
+    updated = Auction.objects.filter(guard).update(
+        highest_bid=Case(*[When(pk=pk, then=Value(auctions[pk].highest_bid)) for pk in counts],
+                         output_field=Auction._meta.get_field('highest_bid')),
+        top_bidder=Case(*[When(pk=pk, then=Value(auctions[pk].top_bidder_id)) for pk in counts],
+                        output_field=models.IntegerField()),
+        bid_count=F('bid_count') + Case(*[When(pk=pk, then=Value(count)) for pk, count in counts.items()],
+                                        output_field=Auction._meta.get_field('bid_count')),
+    )
+    if updated != len(counts):
+        raise AuctionConflict()
+
+
+def top_proxies(levels):
+    """
+    The two strongest proxies above each auction's highest bid, strongest
+    first, for ``levels`` mapping auction ids to highest bids. One query.
+    """
+    proxies = defaultdict(list)
+    if not levels:
+        return proxies
+    above = Q()
+    for auction_id, highest_bid in levels.items():
+        above |= Q(auction_id=auction_id, max_amount__gt=highest_bid)
+    ranked = ProxyBid.objects.filter(above).annotate(rank=Window(
+        RowNumber(),
+        partition_by=F('auction_id'),
+        order_by=[F('max_amount').desc(), F('placed_at').asc(), F('pk').asc()],
+    )).filter(rank__lte=2).order_by('auction_id', 'rank')
+    for proxy in ranked:
+        proxies[proxy.auction_id].append(proxy)
+    return proxies
+
+
+def resolve_proxies(highest_bid, top_bidder_id, proxies):
+    """
+    Settle a proxy war in one pass, without touching the database.
+
+    ``proxies`` are the auction's strongest proxies, strongest first. Returns
+    the visible bids as ``(user_id, amount)`` pairs: the runner-up at its
+    maximum when that still moves the price, then the leader one increment
+    above the competition but never above its own maximum. Everything a long
+    war of increments would have recorded in between is skipped.
+    """
+    live = [proxy for proxy in proxies if proxy.max_amount > highest_bid]
+    if not live:
+        return []
+    leader, runner_up = live[0], (live[1] if len(live) > 1 else None)
+    if runner_up is None and leader.user_id == top_bidder_id:
+        return []
+    competition = max(highest_bid, runner_up.max_amount) if runner_up else highest_bid
+    price = min(leader.max_amount, competition + PROXY_INCREMENT)
+    bids = []
+    if runner_up is not None and runner_up.max_amount < price:
+        bids.append((runner_up.user_id, runner_up.max_amount))
+    bids.append((leader.user_id, price))
+    return bids
+
+
+def run_proxies(auction_id, highest_bid, top_bidder_id):
+    """Let the auction's proxies answer its current highest bid; records and returns their bids."""
+    responses = resolve_proxies(highest_bid, top_bidder_id, top_proxies({auction_id: highest_bid})[auction_id])
+    if not responses:
+        return []
+    bids = [Bid(auction_id=auction_id, user_id=user_id, amount=amount) for user_id, amount in responses]
+    updated = Auction.objects.filter(pk=auction_id, highest_bid=highest_bid).update(
+        highest_bid=bids[-1].amount,
+        top_bidder=bids[-1].user_id,
+        bid_count=F('bid_count') + len(bids),
+    )
+    if not updated:
+        raise AuctionConflict()
+    return Bid.objects.bulk_create(bids)
+
+
+def set_proxy_bid(auction_id, user, max_amount, now=None):
+    """
+    Store ``user``'s hidden maximum for the auction and let every proxy on it
+    respond at once. The maximum must beat the current highest bid, under
+    the same rules as a manual bid. Returns the proxy, the visible bids and
+    the id of the user now leading the auction.
+    """
+    now = now or timezone.now()
+    max_amount = Decimal(max_amount).quantize(CENT)
+    with transaction.atomic():
+        auction = Auction.objects.select_for_update().only(
+            'owner', 'ends_at', 'is_closed', 'highest_bid', 'top_bidder',
+        ).filter(pk=auction_id).first()
+        if auction is None:
+            raise NotFound("Auction not found.")
+        reason = refusal(auction, user, max_amount, now)
+        if reason:
+            raise ValidationError(reason)
+        # The auction row lock serializes this read-then-write per auction.
+        proxy = ProxyBid.objects.filter(auction_id=auction_id, user=user).first()
+        if proxy is None:
+            proxy = ProxyBid.objects.create(auction_id=auction_id, user=user, max_amount=max_amount, placed_at=now)
+        else:
+            proxy.max_amount, proxy.placed_at = max_amount, now
+            proxy.save(update_fields=['max_amount', 'placed_at'])
+        bids = run_proxies(auction_id, auction.highest_bid, auction.top_bidder_id)
+        if bids:
+            soft_close([auction_id], now)
+            transaction.on_commit(lambda: bid_placed.send(sender=Bid, bids=bids))
+    return proxy, bids, bids[-1].user_id if bids else auction.top_bidder_id
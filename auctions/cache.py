@@ -0,0 +1,124 @@
+"""
+Versioned read-through cache of serialized auction payloads.
+
+Every auction has a version counter in the cache; payloads are stored under
+the current version and a write only has to bump the counter. The version also
+doubles as the ETag, so unchanged auctions can be answered with a 304.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Auction
+from .signals import auctions_closed, bid_placed
+
+PREFIX = 'auctions:'
+STATS = ('hits', 'misses')
+
+
+def version_key(auction_id):
+    return f'{PREFIX}{auction_id}:version'
+
+
+def payload_key(auction_id, kind, version):
+    return f'{PREFIX}{auction_id}:{kind}:{version}'
+
+
+def get_version(auction_id):
+    key = version_key(auction_id)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock, never from 1, so an evicted counter cannot
+        # bring an old payload back to life.
+        version = time.time_ns()
+        if not cache.add(key, version, timeout=settings.AUCTION_CACHE_TIMEOUT):
+            version = cache.get(key)
+    return version
+
+
+async def aget_version(auction_id):
+    key = version_key(auction_id)
+    version = await cache.aget(key)
+    if version is None:
+        version = time.time_ns()
+        if not await cache.aadd(key, version, timeout=settings.AUCTION_CACHE_TIMEOUT):
+            version = await cache.aget(key)
+    return version
+
+
+def bump(auction_id):
+    try:
+        cache.incr(version_key(auction_id))
+    except ValueError:
+        # No version yet; the next reader starts a fresh one.
+        pass
+
+
+def etag(auction_id, kind, version):
+    return f'"{auction_id}-{kind}-{version}"'
+
+
+def get_payload(auction_id, kind, version):
+    payload = cache.get(payload_key(auction_id, kind, version))
+    count('misses' if payload is None else 'hits')
+    return payload
+
+
+async def aget_payload(auction_id, kind, version):
+    payload = await cache.aget(payload_key(auction_id, kind, version))
+    await acount('misses' if payload is None else 'hits')
+    return payload
+
+
+def set_payload(auction_id, kind, version, payload):
+    cache.set(payload_key(auction_id, kind, version), payload, timeout=settings.AUCTION_CACHE_TIMEOUT)
+
+
+async def aset_payload(auction_id, kind, version, payload):
+    await cache.aset(payload_key(auction_id, kind, version), payload, timeout=settings.AUCTION_CACHE_TIMEOUT)
+
+
+def count(stat):
+    key = f'{PREFIX}stats:{stat}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+async def acount(stat):
+    key = f'{PREFIX}stats:{stat}'
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aset(key, 1, timeout=None)
+
+
+def stats():
+    values = cache.get_many([f'{PREFIX}stats:{stat}' for stat in STATS])
+    hits, misses = (values.get(f'{PREFIX}stats:{stat}', 0) for stat in STATS)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_ratio': round(hits / total, 4) if total else None}
+
+
+@receiver(bid_placed)
+def bump_on_bid(sender, bids, **kwargs):
+    for auction_id in {bid.auction_id for bid in bids}:
+        bump(auction_id)
+
+
+@receiver(auctions_closed)
+def bump_on_close(sender, auction_ids, **kwargs):
+    for auction_id in auction_ids:
+        bump(auction_id)
+
+
+@receiver(post_save, sender=Auction)
+@receiver(post_delete, sender=Auction)
+def bump_on_write(sender, instance, **kwargs):
+    auction_id = instance.pk
+    transaction.on_commit(lambda: bump(auction_id))
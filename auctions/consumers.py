@@ -0,0 +1,25 @@
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .events import auction_group
+
+
+class AuctionConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Read-only stream of a single auction: every accepted bid and the close
+    event are pushed as small deltas, so clients never poll the detail route.
+    """
+
+    async def connect(self):
+        self.group_name = auction_group(self.scope['url_route']['kwargs']['auction_id'])
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        # Bids go through the REST API; the socket only streams.
+        pass
+
+    async def auction_event(self, message):
+        await self.send_json(message['event'])
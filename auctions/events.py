@@ -0,0 +1,75 @@
+import logging
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.dispatch import receiver
+
+from .models import Auction, Bid
+from .signals import auctions_closed, auctions_extended, bid_placed
+
+logger = logging.getLogger(__name__)
+
+
+def auction_group(auction_id):
+    return f'auction_{auction_id}'
+
+
+def publish(events):
+    """
+    Fan ``(auction_id, event)`` pairs out to everyone watching each auction, in
+    order and in one trip into the event loop. Best effort: never fails the caller.
+    """
+    if not events:
+        return
+    # Imported here so that only processes which actually publish load channels.
+    from channels.layers import get_channel_layer
+
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+
+    async def send_all():
+        for auction_id, event in events:
+            await channel_layer.group_send(auction_group(auction_id), {'type': 'auction.event', 'event': event})
+
+    try:
+        async_to_sync(send_all)()
+    except Exception:
+        logger.exception("Could not publish %d auction events", len(events))
+
+
+@receiver(bid_placed)
+def publish_bids(sender, bids, **kwargs):
+    # Bulk and proxy bids are built from user ids, so missing names are fetched in one query.
+    usernames = {bid.user_id: bid.user.username for bid in bids if Bid.user.is_cached(bid)}
+    missing = {bid.user_id for bid in bids} - usernames.keys()
+    if missing:
+        usernames.update(User.objects.filter(pk__in=missing).values_list('id', 'username'))
+    publish([(bid.auction_id, {
+        'type': 'bid',
+        'auction': bid.auction_id,
+        'user': usernames[bid.user_id],
+        'amount': str(bid.amount),
+        'created_at': bid.created_at.isoformat(),
+    }) for bid in bids])
+
+
+@receiver(auctions_closed)
+def publish_close(sender, auction_ids, **kwargs):
+    closed = Auction.objects.filter(pk__in=auction_ids).values('pk', 'highest_bid', 'winner__username')
+    publish([(auction['pk'], {
+        'type': 'closed',
+        'auction': auction['pk'],
+        'winner': auction['winner__username'],
+        'highest_bid': str(auction['highest_bid']),
+    }) for auction in closed])
+
+
+@receiver(auctions_extended)
+def publish_extension(sender, auction_ids, ends_at, **kwargs):
+    extended = Auction.objects.filter(pk__in=auction_ids, ends_at=ends_at).values_list('pk', flat=True)
+    publish([(auction_id, {
+        'type': 'extended',
+        'auction': auction_id,
+        'ends_at': ends_at.isoformat(),
+    }) for auction_id in extended])
@@ -0,0 +1,166 @@
+"""
+Streaming exports of auctions and bids as NDJSON or CSV.
+
+Rows are read as plain ``.values()`` dicts through ``.iterator(chunk_size)``
+(a server-side cursor on PostgreSQL), in the order of the index that also
+serves the date filter, and are encoded one at a time, so memory does not
+depend on how many rows are exported. Used by ``ExportView`` and the
+``export`` management command.
+
+Under ASGI rows are read with ``aiterator()`` instead: Django consumes a
+synchronous iterator in full before streaming it to an ASGI server.
+"""
+import csv
+from datetime import datetime, time
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Value
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+
+from .models import CLOSED, OPEN, STATUSES, ArchivedAuction, ArchivedBid, Auction, Bid
+
+CHUNK_SIZE = 2000
+# Rows per write to the client.
+LINES_PER_WRITE = 500
+FORMATS = ('ndjson', 'csv')
+AUCTION_COLUMNS = ('id', 'title', 'owner_id', 'starting_price', 'highest_bid', 'bid_count', 'top_bidder_id',
+                   'winner_id', 'created_at', 'ends_at')
+BID_COLUMNS = ('id', 'auction_id', 'user_id', 'amount', 'created_at')
+# Text starting with one of these is taken for a formula by spreadsheets.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def in_range(queryset, field, since, until):
+    """``since <= field < until``, ordered by ``(field, id)`` as the matching index is."""
+    if since:
+        queryset = queryset.filter(**{f'{field}__gte': since})
+    if until:
+        queryset = queryset.filter(**{f'{field}__lt': until})
+    return queryset.order_by(field, 'id')
+
+
+def auctions(status=None, since=None, until=None):
+    """Auctions by ``ends_at``."""
+    queryset = Auction.objects.annotate_status()
+    if status:
+        queryset = queryset.with_status(status)
+    return in_range(queryset, 'ends_at', since, until).values(*AUCTION_COLUMNS, status=F('current_status'))
+
+
+def bids(status=None, since=None, until=None):
+    """Bids by ``created_at``; ``status`` is the auction's."""
+    queryset = Bid.objects.all()
+    if status:
+        queryset = queryset.filter(auction__in=Auction.objects.with_status(status).values('pk'))
+    return in_range(queryset, 'created_at', since, until).values(*BID_COLUMNS)
+
+
+def archived_auctions(status=None, since=None, until=None):
+    """Archived auctions by ``ends_at``; they are all closed."""
+    queryset = ArchivedAuction.objects.none() if status == OPEN else ArchivedAuction.objects.all()
+    return in_range(queryset, 'ends_at', since, until).values(*AUCTION_COLUMNS, status=Value(CLOSED))
+
+
+def archived_bids(status=None, since=None, until=None):
+    """Bids of archived auctions by ``created_at``."""
+    queryset = ArchivedBid.objects.none() if status == OPEN else ArchivedBid.objects.all()
+    return in_range(queryset, 'created_at', since, until).values(*BID_COLUMNS)
+
+
+# name -> (rows, columns)
+DATASETS = {
+    'auctions': (auctions, AUCTION_COLUMNS + ('status',)),
+    'bids': (bids, BID_COLUMNS),
+    'archived-auctions': (archived_auctions, AUCTION_COLUMNS + ('status',)),
+    'archived-bids': (archived_bids, BID_COLUMNS),
+}
+
+
+def parse_bound(params, name):
+    """An ISO date or datetime from ``params``; a bare date is midnight in the current time zone."""
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None and (day := parse_date(value)) is not None:
+            parsed = datetime.combine(day, time.min)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: "Must be an ISO 8601 date or datetime."})
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+
+def export_rows(dataset, params):
+    """
+    The values queryset and columns for ``dataset`` filtered by ``status``,
+    ``since`` and ``until`` in ``params``.
+    """
+    if dataset not in DATASETS:
+        raise ValidationError({'dataset': f"Must be one of: {', '.join(DATASETS)}."})
+    status = params.get('status') or None
+    if status and status not in STATUSES:
+        raise ValidationError({'status': f"Must be one of: {', '.join(STATUSES)}."})
+    rows, columns = DATASETS[dataset]
+    return rows(status, parse_bound(params, 'since'), parse_bound(params, 'until')), columns
+
+
+class NDJSONRenderer(JSONRenderer):
+    """Selects NDJSON (``?format=ndjson``); exports stream their own rows, so only error bodies are rendered here."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+class CSVRenderer(JSONRenderer):
+    """Selects CSV (``?format=csv``); error bodies are still JSON."""
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class Line:
+    """File-like target for ``csv.writer`` that hands back the line just written."""
+
+    def write(self, value):
+        return value
+
+
+def csv_cell(value):
+    """``value``, with user text that a spreadsheet would evaluate as a formula quoted by a leading ``'``."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def encoder(fmt, columns):
+    """Returns ``(header, encode)``: the first line of the export and a row-to-line function."""
+    if fmt == 'csv':
+        writer = csv.writer(Line())
+        return writer.writerow(columns), lambda row: writer.writerow([csv_cell(row[column]) for column in columns])
+    dumps = DjangoJSONEncoder(separators=(',', ':')).encode
+    return '', lambda row: dumps(row) + '\n'
+
+
+def stream(queryset, columns, fmt, chunk_size=CHUNK_SIZE):
+    header, encode = encoder(fmt, columns)
+    lines = [header]
+    for row in queryset.iterator(chunk_size=chunk_size):
+        lines.append(encode(row))
+        if len(lines) >= LINES_PER_WRITE:
+            yield ''.join(lines)
+            lines = []
+    yield ''.join(lines)
+
+
+async def astream(queryset, columns, fmt, chunk_size=CHUNK_SIZE):
+    header, encode = encoder(fmt, columns)
+    lines = [header]
+    async for row in queryset.aiterator(chunk_size=chunk_size):
+        lines.append(encode(row))
+        if len(lines) >= LINES_PER_WRITE:
+            yield ''.join(lines)
+            lines = []
+    yield ''.join(lines)
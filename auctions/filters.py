@@ -0,0 +1,72 @@
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .models import STATUSES, OPEN
+
+
+class AuctionFilterBackend(BaseFilterBackend):
+    """
+    Query-string filters for auctions. Each one maps onto an index:
+
+    - ``status=open`` -- partial index on open ``ends_at``
+    - ``status=closed`` -- none of its own: ``is_closed OR ends_at <= now`` cannot use the
+      partial index, so it is checked row by row along the ``(ends_at, id)`` cursor order
+    - ``mine=true`` / ``owner=<id>`` -- ``(owner, ends_at, id)``
+    - ``min_price`` / ``max_price`` -- ``highest_bid``
+    - ``ending_within=<minutes>`` -- open auctions ending soon, partial index on ``ends_at``
+    - ``search=<text>`` -- full-text index of titles and descriptions, see ``auctions.search``
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        now = timezone.now()
+
+        if params.get('mine') == 'true' and request.user.is_authenticated:
+            queryset = queryset.filter(owner=request.user)
+        if 'owner' in params:
+            queryset = queryset.filter(owner_id=self.parse_int(params, 'owner'))
+
+        status = params.get('status')
+        if status:
+            if status not in STATUSES:
+                raise ValidationError({'status': f"Must be one of: {', '.join(STATUSES)}."})
+            queryset = queryset.with_status(status, now)
+
+        if 'min_price' in params:
+            queryset = queryset.filter(highest_bid__gte=self.parse_decimal(params, 'min_price'))
+        if 'max_price' in params:
+            queryset = queryset.filter(highest_bid__lte=self.parse_decimal(params, 'max_price'))
+
+        if 'ending_within' in params:
+            window = timedelta(minutes=self.parse_int(params, 'ending_within'))
+            queryset = queryset.with_status(OPEN, now).filter(ends_at__lte=now + window)
+
+        search = params.get('search', '').strip()
+        if search:
+            queryset = queryset.search(search)
+
+        return queryset
+
+    @staticmethod
+    def parse_int(params, name):
+        try:
+            value = int(params[name])
+        except ValueError:
+            raise ValidationError({name: "Must be an integer."})
+        if value < 0:
+            raise ValidationError({name: "Must not be negative."})
+        return value
+
+    @staticmethod
+    def parse_decimal(params, name):
+        try:
+            value = Decimal(params[name])
+        except InvalidOperation:
+            value = None
+        if value is None or not value.is_finite():
+            raise ValidationError({name: "Must be a number."})
+        return value
@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from auctions.archive import BATCH_SIZE, archive_batch
+
+
+class Command(BaseCommand):
+    help = "Move settled auctions and their bids into the archive tables, one batch per transaction."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.AUCTION_ARCHIVE_AFTER_DAYS,
+                            help="Archive auctions that closed more than this many days ago.")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--max-batches', type=int, help="Stop after this many batches; rerun to resume.")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        auctions = bids = batches = 0
+        while options['max_batches'] is None or batches < options['max_batches']:
+            batch_auctions, batch_bids = archive_batch(cutoff, options['batch_size'])
+            if not batch_auctions:
+                break
+            batches += 1
+            auctions += batch_auctions
+            bids += batch_bids
+            self.stdout.write(f"batch {batches}: {batch_auctions} auctions, {batch_bids} bids")
+        self.stdout.write(self.style.SUCCESS(f"Archived {auctions} auctions with {bids} bids."))
@@ -0,0 +1,35 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from auctions.benchmarks import BENCHMARKS, check_budgets
+
+
+class Command(BaseCommand):
+    help = "Run the auctions benchmarks against a throwaway test database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help=f"Benchmarks to run: {', '.join(BENCHMARKS)}")
+        parser.add_argument('--json', dest='json_path', help="Also write the results to this JSON file.")
+        parser.add_argument('--check', action='store_true', help="Fail if a route exceeds its budget.")
+
+    def handle(self, *args, **options):
+        names = options['names'] or list(BENCHMARKS)
+        unknown = set(names) - set(BENCHMARKS)
+        if unknown:
+            raise CommandError(f"Unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+        results = []
+        for name in names:
+            for row in BENCHMARKS[name]():
+                results.append(row)
+                self.stdout.write('  '.join(f'{key}={value}' for key, value in row.items()))
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+
+        if options['check']:
+            violations = check_budgets([row for row in results if row['benchmark'] == 'api-routes'])
+            if violations:
+                raise CommandError("Budget exceeded:\n" + '\n'.join(violations))
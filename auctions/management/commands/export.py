@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from auctions.export import CHUNK_SIZE, DATASETS, FORMATS, export_rows, stream
+
+
+class Command(BaseCommand):
+    help = "Stream auctions or bids as NDJSON or CSV, with constant memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=list(DATASETS))
+        parser.add_argument('--format', choices=FORMATS, default='ndjson')
+        parser.add_argument('--status', help="open or closed (for bids: the auction's status).")
+        parser.add_argument('--since', help="ISO date or datetime, inclusive.")
+        parser.add_argument('--until', help="ISO date or datetime, exclusive.")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Rows fetched per round trip.")
+        parser.add_argument('--output', help="Write to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        try:
+            queryset, columns = export_rows(options['dataset'], options)
+        except ValidationError as exc:
+            raise CommandError(exc.detail)
+
+        blocks = stream(queryset, columns, options['format'], options['chunk_size'])
+        if not options['output']:
+            for block in blocks:
+                self.stdout.write(block, ending='')
+            return
+        with open(options['output'], 'w', newline='', encoding='utf-8') as out:
+            out.writelines(blocks)
@@ -0,0 +1,281 @@
+"""
+Hot-path metrics in the Prometheus text format, served on ``/metrics``.
+
+Request metrics live in the memory of the process that served the request,
+so scrape every web process. Per request, ``MetricsMiddleware`` records the
+latency, the number and total time of SQL queries (an ``execute_wrapper`` on
+every connection) and the time spent producing serializer ``.data``. Celery
+tasks run in worker processes without an endpoint of their own; their
+durations are kept in the shared cache, as are the auction cache hit/miss
+counters, so any web process can report them.
+
+Set ``SLOW_REQUEST_PROFILE_MS`` to profile sync requests with cProfile and
+keep a ``.prof`` dump in ``SLOW_REQUEST_PROFILE_DIR`` for each one slower than
+the threshold. Only one profiler can be active per process (on Python 3.12+
+a second one fails to start), so a request arriving while another is being
+profiled runs unprofiled.
+"""
+import cProfile
+import contextvars
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from celery import current_app
+from celery.signals import task_postrun, task_prerun
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+from . import cache as auction_cache
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+TASK_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300)
+PREFIX = 'metrics:'
+
+# The stats dict of the request being served; asgiref carries it across sync_to_async and async_to_sync.
+request_stats = contextvars.ContextVar('request_stats', default=None)
+# Held by the one request being profiled.
+profiling = threading.Lock()
+
+
+def format_labels(names, values, **extra):
+    pairs = list(zip(names, values)) + list(extra.items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in pairs) + '}'
+
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per combination of label values."""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self.lock:
+            counts = self.series.setdefault(labels, [[0] * (len(self.buckets) + 1), 0.0])
+            counts[0][bisect_left(self.buckets, value)] += 1
+            counts[1] += value
+
+    def samples(self):
+        with self.lock:
+            series = {labels: (list(buckets), total) for labels, (buckets, total) in self.series.items()}
+        for labels, (buckets, total) in sorted(series.items()):
+            yield labels, buckets, total
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for labels, buckets, total in self.samples():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), buckets):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{format_labels(self.labelnames, labels, le=bound)} {cumulative}')
+            lines.append(f'{self.name}_sum{format_labels(self.labelnames, labels)} {total}')
+            lines.append(f'{self.name}_count{format_labels(self.labelnames, labels)} {cumulative}')
+        return lines
+
+
+class SharedHistogram(Histogram):
+    """
+    A histogram kept in the shared cache, for observations made in other
+    processes. One label, whose values have to be listed by ``label_values``.
+    """
+
+    def __init__(self, *args, label_values, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.label_values = label_values
+
+    def key(self, label, field):
+        return f'{PREFIX}{self.name}:{label}:{field}'
+
+    def observe(self, value, label):
+        for field, amount in ((bisect_left(self.buckets, value), 1), ('sum_us', round(value * 1e6))):
+            key = self.key(label, field)
+            if not cache.add(key, amount, timeout=None):
+                cache.incr(key, amount)
+
+    def samples(self):
+        labels = sorted(self.label_values())
+        fields = list(range(len(self.buckets) + 1)) + ['sum_us']
+        values = cache.get_many([self.key(label, field) for label in labels for field in fields])
+        for label in labels:
+            counts = [values.get(self.key(label, field), 0) for field in fields]
+            if any(counts):
+                yield (label,), counts[:-1], counts[-1] / 1e6
+
+
+def auction_task_names():
+    return [name for name in current_app.tasks if name.startswith('auctions.')]
+
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Request latency by route.', ('route', 'method', 'status'))
+REQUEST_QUERIES = Histogram(
+    'http_request_db_queries', 'SQL queries per request.', ('route',), buckets=QUERY_BUCKETS)
+REQUEST_SQL_TIME = Histogram(
+    'http_request_db_seconds', 'Time spent in SQL per request.', ('route',))
+SERIALIZER_TIME = Histogram(
+    'serializer_seconds', 'Time spent producing serializer data.', ('serializer',))
+TASK_DURATION = SharedHistogram(
+    'celery_task_duration_seconds', 'Celery task run time.', ('task',), buckets=TASK_BUCKETS,
+    label_values=auction_task_names)
+HISTOGRAMS = (REQUEST_LATENCY, REQUEST_QUERIES, REQUEST_SQL_TIME, SERIALIZER_TIME, TASK_DURATION)
+
+
+def render():
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines += histogram.render()
+    lines += ['# HELP auction_cache_requests_total Auction payload cache lookups.',
+              '# TYPE auction_cache_requests_total counter']
+    stats = auction_cache.stats()
+    lines += [f'auction_cache_requests_total{{result="{result}"}} {stats[result]}' for result in auction_cache.STATS]
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def record_query(execute, sql, params, many, context):
+    stats = request_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats['queries'] += 1
+        stats['sql_seconds'] += time.perf_counter() - start
+
+
+def instrument(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(connection_created)
+def instrument_new_connection(sender, connection, **kwargs):
+    instrument(connection)
+
+
+def serializer_name(serializer):
+    return type(serializer.child if isinstance(serializer, ListSerializer) else serializer).__name__
+
+
+def instrument_serializers():
+    """Time the top-level ``.data`` of every serializer; nested serializers never go through ``.data``."""
+    data = BaseSerializer.data
+
+    def timed_data(self):
+        stats = request_stats.get()
+        if stats is None or stats['serializing']:
+            return data.fget(self)
+        stats['serializing'] = True
+        start = time.perf_counter()
+        try:
+            return data.fget(self)
+        finally:
+            stats['serializing'] = False
+            SERIALIZER_TIME.observe(time.perf_counter() - start, serializer_name(self))
+
+    BaseSerializer.data = property(timed_data)
+
+
+class MetricsMiddleware:
+    """Outermost middleware: times the request and its SQL, and profiles slow sync requests on demand."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        for connection in connections.all(initialized_only=True):
+            instrument(connection)
+        threshold = getattr(settings, 'SLOW_REQUEST_PROFILE_MS', None)
+        profiler = None
+        if threshold is not None and profiling.acquire(blocking=False):
+            profiler = cProfile.Profile()
+        stats, token, start = self.start()
+        try:
+            if profiler is None:
+                response = self.get_response(request)
+            else:
+                response = profiler.runcall(self.get_response, request)
+        finally:
+            request_stats.reset(token)
+            if profiler is not None:
+                profiling.release()
+        elapsed = self.finish(request, response, stats, start)
+        if profiler is not None and elapsed * 1000 >= threshold:
+            self.dump(profiler, request, elapsed)
+        return response
+
+    async def __acall__(self, request):
+        stats, token, start = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_stats.reset(token)
+        self.finish(request, response, stats, start)
+        return response
+
+    @staticmethod
+    def start():
+        stats = {'queries': 0, 'sql_seconds': 0.0, 'serializing': False}
+        return stats, request_stats.set(stats), time.perf_counter()
+
+    @staticmethod
+    def finish(request, response, stats, start):
+        elapsed = time.perf_counter() - start
+        match = request.resolver_match
+        route = match.view_name if match else 'unmatched'
+        REQUEST_LATENCY.observe(elapsed, route, request.method, response.status_code)
+        REQUEST_QUERIES.observe(stats['queries'], route)
+        REQUEST_SQL_TIME.observe(stats['sql_seconds'], route)
+        return elapsed
+
+    @staticmethod
+    def dump(profiler, request, elapsed):
+        directory = getattr(settings, 'SLOW_REQUEST_PROFILE_DIR', None) or settings.BASE_DIR / 'profiles'
+        os.makedirs(directory, exist_ok=True)
+        route = (request.resolver_match.view_name if request.resolver_match else 'unmatched').replace('/', '_')
+        name = f'{time.strftime("%Y%m%dT%H%M%S")}-{request.method}-{route}-{round(elapsed * 1000)}ms.prof'
+        profiler.dump_stats(os.path.join(directory, name))
+
+
+task_started = {}
+
+
+@task_prerun.connect
+def start_task_timer(task_id=None, **kwargs):
+    task_started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def record_task_duration(task_id=None, task=None, **kwargs):
+    start = task_started.pop(task_id, None)
+    if start is not None and task.name.startswith('auctions.'):
+        TASK_DURATION.observe(time.perf_counter() - start, task.name)
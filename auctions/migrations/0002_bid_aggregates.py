@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Exists, OuterRef, Subquery
+
+
+def backfill_bid_aggregates(apps, schema_editor):
+    Auction = apps.get_model('auctions', 'Auction')
+    Bid = apps.get_model('auctions', 'Bid')
+    bids = Bid.objects.filter(auction=OuterRef('pk'))
+    top_bid = bids.order_by('-amount', 'created_at', 'pk')
+    Auction.objects.filter(Exists(bids)).update(
+        bid_count=Subquery(bids.values('auction').annotate(total=Count('pk')).values('total')),
+        highest_bid=Subquery(top_bid.values('amount')[:1]),
+        top_bidder=Subquery(top_bid.values('user')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auction',
+            name='bid_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='top_bidder',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='leading_auctions', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_bid_aggregates, migrations.RunPython.noop),
+    ]
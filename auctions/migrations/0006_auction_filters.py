@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def add_title_search_index(apps, schema_editor):
+    # GIN over the title's tsvector exists only on PostgreSQL; other backends fall back to a substring match.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+
+    Auction = apps.get_model('auctions', 'Auction')
+    schema_editor.add_index(Auction, GinIndex(SearchVector('title', config='simple'), name='auction_title_search_idx'))
+
+
+def remove_title_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS auction_title_search_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0005_hot_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['highest_bid'], name='auction_highest_bid_idx'),
+        ),
+        migrations.RunPython(add_title_search_index, remove_title_search_index),
+    ]
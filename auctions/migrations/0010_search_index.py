@@ -0,0 +1,146 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:26
+
+import auctions.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+# An FTS5 table reading its text from auctions_auction (external content), kept in step by triggers.
+SQLITE_CREATE = [
+    """
+    CREATE VIRTUAL TABLE auctions_auction_fts USING fts5(
+        title, description, content='auctions_auction', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER auctions_auction_fts_insert AFTER INSERT ON auctions_auction BEGIN
+        INSERT INTO auctions_auction_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER auctions_auction_fts_update AFTER UPDATE OF title, description ON auctions_auction
+    WHEN old.title IS NOT new.title OR old.description IS NOT new.description BEGIN
+        INSERT INTO auctions_auction_fts (auctions_auction_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO auctions_auction_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER auctions_auction_fts_delete AFTER DELETE ON auctions_auction BEGIN
+        INSERT INTO auctions_auction_fts (auctions_auction_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    "INSERT INTO auctions_auction_fts (auctions_auction_fts) VALUES ('rebuild')",
+]
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS auctions_auction_fts_insert',
+    'DROP TRIGGER IF EXISTS auctions_auction_fts_update',
+    'DROP TRIGGER IF EXISTS auctions_auction_fts_delete',
+    'DROP TABLE IF EXISTS auctions_auction_fts',
+]
+
+# A weighted tsvector per auction under a GIN index. It replaces the title-only auction_title_search_idx.
+# Row triggers keep it in step; TRUNCATE (Django's test flush) empties it too.
+POSTGRESQL_DOCUMENT = (
+    "setweight(to_tsvector('simple', new.title), 'A') || setweight(to_tsvector('simple', new.description), 'B')"
+)
+POSTGRESQL_CREATE = [
+    'CREATE TABLE auctions_auction_fts (rowid bigint PRIMARY KEY, document tsvector NOT NULL)',
+    'CREATE INDEX auctions_auction_fts_document_idx ON auctions_auction_fts USING GIN (document)',
+    f"""
+    CREATE FUNCTION auctions_auction_fts_upsert() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO auctions_auction_fts (rowid, document) VALUES (new.id, {POSTGRESQL_DOCUMENT})
+        ON CONFLICT (rowid) DO UPDATE SET document = excluded.document;
+        RETURN NULL;
+    END $$
+    """,
+    """
+    CREATE FUNCTION auctions_auction_fts_delete() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        DELETE FROM auctions_auction_fts WHERE rowid = old.id;
+        RETURN NULL;
+    END $$
+    """,
+    """
+    CREATE FUNCTION auctions_auction_fts_truncate() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        TRUNCATE auctions_auction_fts;
+        RETURN NULL;
+    END $$
+    """,
+    """
+    CREATE TRIGGER auctions_auction_fts_insert AFTER INSERT ON auctions_auction
+    FOR EACH ROW EXECUTE FUNCTION auctions_auction_fts_upsert()
+    """,
+    """
+    CREATE TRIGGER auctions_auction_fts_update AFTER UPDATE OF title, description ON auctions_auction
+    FOR EACH ROW WHEN (old.title IS DISTINCT FROM new.title OR old.description IS DISTINCT FROM new.description)
+    EXECUTE FUNCTION auctions_auction_fts_upsert()
+    """,
+    """
+    CREATE TRIGGER auctions_auction_fts_delete AFTER DELETE ON auctions_auction
+    FOR EACH ROW EXECUTE FUNCTION auctions_auction_fts_delete()
+    """,
+    """
+    CREATE TRIGGER auctions_auction_fts_truncate AFTER TRUNCATE ON auctions_auction
+    FOR EACH STATEMENT EXECUTE FUNCTION auctions_auction_fts_truncate()
+    """,
+    f"""
+    INSERT INTO auctions_auction_fts (rowid, document)
+    SELECT id, {POSTGRESQL_DOCUMENT.replace('new.', '')} FROM auctions_auction
+    """,
+    'DROP INDEX IF EXISTS auction_title_search_idx',
+]
+POSTGRESQL_DROP = [
+    'DROP TABLE IF EXISTS auctions_auction_fts',
+    'DROP TRIGGER IF EXISTS auctions_auction_fts_insert ON auctions_auction',
+    'DROP TRIGGER IF EXISTS auctions_auction_fts_update ON auctions_auction',
+    'DROP TRIGGER IF EXISTS auctions_auction_fts_delete ON auctions_auction',
+    'DROP TRIGGER IF EXISTS auctions_auction_fts_truncate ON auctions_auction',
+    'DROP FUNCTION IF EXISTS auctions_auction_fts_upsert()',
+    'DROP FUNCTION IF EXISTS auctions_auction_fts_delete()',
+    'DROP FUNCTION IF EXISTS auctions_auction_fts_truncate()',
+    "CREATE INDEX auction_title_search_idx ON auctions_auction "
+    "USING GIN (to_tsvector('simple'::regconfig, COALESCE(title, '')))",
+]
+
+STATEMENTS = {
+    'sqlite': (SQLITE_CREATE, SQLITE_DROP),
+    'postgresql': (POSTGRESQL_CREATE, POSTGRESQL_DROP),
+}
+
+
+def create_search_index(apps, schema_editor):
+    # Other backends have no index; AuctionQuerySet.search() falls back to a substring match there.
+    create, drop = STATEMENTS.get(schema_editor.connection.vendor, ((), ()))
+    for statement in create:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    create, drop = STATEMENTS.get(schema_editor.connection.vendor, ((), ()))
+    for statement in drop:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0009_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuctionSearchEntry',
+            fields=[
+                ('auction', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='auctions.auction')),
+                ('document', auctions.models.SearchDocumentField()),
+            ],
+            options={
+                'db_table': 'auctions_auction_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
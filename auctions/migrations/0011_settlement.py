@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:45
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0010_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Settlement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('auction_id', models.BigIntegerField(unique=True)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('commission', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('payout', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('settled_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('paid_out_at', models.DateTimeField(blank=True, null=True)),
+                ('buyer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='purchases', to=settings.AUTH_USER_MODEL)),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='settlements', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Invoice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.CharField(max_length=32, unique=True)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('issued_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('paid_at', models.DateTimeField(blank=True, null=True)),
+                ('settlement', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='invoice', to='auctions.settlement', to_field='auction_id')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('auction_id', models.BigIntegerField()),
+                ('kind', models.CharField(choices=[('won', 'Won'), ('sold', 'Sold'), ('unsold', 'Unsold')], max_length=16)),
+                ('payload', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('sent_at__isnull', True)), fields=['id'], name='notification_unsent_idx')],
+                'constraints': [models.UniqueConstraint(fields=('auction_id', 'user', 'kind'), name='notification_auction_user_kind_uniq')],
+            },
+        ),
+    ]
@@ -1,13 +1,164 @@
 
 
-from django.core.exceptions import ValidationError
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Case, Count, Exists, ExpressionWrapper, F, Max, OuterRef, Prefetch, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+from .signals import auctions_closed
+
+OPEN = 'open'
+CLOSED = 'closed'
+STATUSES = (OPEN, CLOSED)
+# Most auctions AuctionQuerySet.settle closes per transaction and per list of ids.
+SETTLE_BATCH_SIZE = 500
+
+
+def leading(user, top_bidder='auction__top_bidder'):
+    """``True`` where ``user`` holds the highest bid, from the auction's snapshot column."""
+    return ExpressionWrapper(Q(**{top_bidder: user}), output_field=models.BooleanField())
+
+
+class AuctionQuerySet(models.QuerySet):
+    @staticmethod
+    def status_q(status, now=None):
+        """
+        The single definition of an auction's status. Open auctions are served
+        by the partial index on ``ends_at``; ``Auction.status`` reads the
+        ``current_status`` annotation built from the same condition.
+        """
+        now = now or timezone.now()
+        if status == OPEN:
+            return Q(is_closed=False, ends_at__gt=now)
+        if status == CLOSED:
+            return Q(is_closed=True) | Q(ends_at__lte=now)
+        raise ValueError(f"Unknown auction status: {status!r}")
+
+    def with_status(self, status, now=None):
+        return self.filter(self.status_q(status, now))
+
+    def annotate_status(self, now=None):
+        return self.annotate(current_status=Case(
+            When(self.status_q(OPEN, now), then=Value(OPEN)),
+            default=Value(CLOSED),
+            output_field=models.CharField(),
+        ))
+
+    def search(self, text):
+        """Auctions whose title or description has every word of ``text``, from the full-text index."""
+        from .search import match
+
+        return match(self, text)
+
+    def ranked_search(self, text):
+        """``search(text)`` annotated with its ``rank``, best matches first."""
+        from .search import ranked
+
+        return ranked(self, text)
+
+    def for_list(self):
+        return self.select_related('owner', 'winner').annotate_status()
+
+    def for_summary(self):
+        return self.select_related('top_bidder').annotate_status()
+
+    def for_detail(self):
+        return self.select_related('owner', 'winner').annotate_status().prefetch_related(
+            Prefetch('bids', queryset=Bid.objects.select_related('user'))
+        )
+
+    def with_bid_stats(self):
+        """
+        ``total_bids``, ``top_amount`` and ``leader`` (the top bidder's username)
+        aggregated from the bids table: one grouped query for the whole page.
+        """
+        top_bid = Bid.objects.filter(auction=OuterRef('pk')).order_by('-amount', 'created_at', 'pk')
+        return self.annotate(
+            total_bids=Count('bids'),
+            top_amount=Coalesce(Max('bids__amount'), F('starting_price')),
+            leader=Subquery(top_bid.values('user__username')[:1]),
+        )
+
+    def with_bid_snapshot(self):
+        """The same three values from the columns ``place_bid`` keeps current; the bids table is not read."""
+        return self.annotate(total_bids=F('bid_count'), top_amount=F('highest_bid'), leader=F('top_bidder__username'))
+
+    def for_stats(self):
+        stats = self.with_bid_snapshot() if settings.AUCTION_STATS_SNAPSHOT else self.with_bid_stats()
+        return stats.annotate_status()
+
+    def bid_on_since(self, user, since):
+        """Auctions ``user`` has bid on that took any bid after ``since``, with ``winning`` for that user."""
+        return self.filter(
+            Exists(Bid.objects.filter(auction=OuterRef('pk'), created_at__gt=since)),
+            pk__in=Bid.objects.filter(user=user).values('auction'),
+            ends_at__gt=since,
+        ).annotate(winning=leading(user, 'top_bidder')).annotate_status()
+
+    def expired(self, now=None):
+        """Auctions past ``ends_at``: the time half of ``status_q(CLOSED)``, as the sweep needs it."""
+        return self.filter(ends_at__lte=now or timezone.now())
+
+    def settle(self, now=None, limit=None):
+        """
+        Close every expired auction in the queryset and record its winner.
+
+        Works set-wise in batches of at most ``SETTLE_BATCH_SIZE`` auctions:
+        the number of queries grows with the number of batches, not of
+        auctions, and no statement carries more than one batch of ids.
+        ``limit`` settles a single batch of that size instead, oldest first.
+        Returns a ``(closed, awarded)`` tuple and sends ``auctions_closed``
+        for each batch once its transaction commits.
+        """
+        expired = self.expired(now)
+        # Two narrow lookups rather than one OR, so each can use its partial index.
+        lookups = (
+            expired.filter(is_closed=False),
+            expired.filter(is_closed=True, winner__isnull=True, bid_count__gt=0),
+        )
+        if limit:
+            pending = []
+            for candidates in lookups:
+                pending += candidates.order_by('ends_at').values_list('pk', flat=True)[:limit - len(pending)]
+                if len(pending) >= limit:
+                    break
+            return settle_batch(pending)
+
+        closed = awarded = 0
+        for candidates in lookups:
+            # Keyset on pk, so an auction whose winner cannot be found is not picked up again.
+            after = 0
+            while True:
+                pending = list(candidates.filter(pk__gt=after).order_by('pk')
+                               .values_list('pk', flat=True)[:SETTLE_BATCH_SIZE])
+                batch_closed, batch_awarded = settle_batch(pending)
+                closed += batch_closed
+                awarded += batch_awarded
+                if len(pending) < SETTLE_BATCH_SIZE:
+                    break
+                after = pending[-1]
+        return closed, awarded
+
+
+def settle_batch(pending):
+    """Close the auctions with pks ``pending`` and pick their winners, in one transaction."""
+    if not pending:
+        return 0, 0
+    batch = Auction.objects.filter(pk__in=pending)
+    top_bidder = Bid.objects.filter(auction=OuterRef('pk')).order_by('-amount', 'created_at', 'pk')
+    with transaction.atomic():
+        closed = batch.filter(is_closed=False).update(is_closed=True)
+        awarded = batch.filter(bid_count__gt=0, winner__isnull=True).update(
+            winner=Subquery(top_bidder.values('user')[:1]), is_closed=True,
+        )
+        transaction.on_commit(lambda: auctions_closed.send(sender=Auction, auction_ids=pending))
+    return closed, awarded
+
 
 class Auction(models.Model):
-    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='auctions')
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='auctions', db_index=False)
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
     starting_price = models.DecimalField(max_digits=10, decimal_places=2)
@@ -16,58 +167,266 @@ class Auction(models.Model):
     highest_bid = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
     winner = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='won_auctions')
     is_closed = models.BooleanField(default=False)
+    # Maintained by place_bid so reads never have to aggregate the bids table.
+    bid_count = models.PositiveIntegerField(default=0)
+    top_bidder = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='leading_auctions')
+    # The ends_at value a close task is queued for; see auctions.tasks.schedule_close.
+    close_scheduled_for = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = AuctionQuerySet.as_manager()
+
+    BID_AGGREGATE_FIELDS = ('highest_bid', 'bid_count', 'top_bidder')
+    # Columns only ever written by set-based UPDATEs elsewhere: bids, the close scheduler and settle().
+    MANAGED_FIELDS = BID_AGGREGATE_FIELDS + ('close_scheduled_for', 'winner', 'is_closed')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['ends_at', 'id'], name='auction_ends_at_id_idx'),
+            # mine=true / my-auctions, in cursor order; also serves as the owner FK index.
+            models.Index(fields=['owner', 'ends_at', 'id'], name='auction_owner_ends_at_idx'),
+            # Close scheduler and settlement sweep: only live rows are indexed.
+            models.Index(fields=['ends_at'], condition=Q(is_closed=False), name='auction_open_ends_at_idx'),
+            # Led by winner so it outranks the plain winner FK index for "winner IS NULL".
+            models.Index(
+                fields=['winner', 'ends_at'],
+                condition=Q(is_closed=True, winner__isnull=True, bid_count__gt=0),
+                name='auction_unawarded_idx',
+            ),
+            # min_price / max_price filters.
+            models.Index(fields=['highest_bid'], name='auction_highest_bid_idx'),
+            # Leaderboard read from the bid_count snapshot, most bids first.
+            models.Index(fields=['bid_count', 'id'], name='auction_bid_count_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
     @property
     def status(self):
+        if 'current_status' in self.__dict__:
+            return self.current_status
         if self.is_closed or timezone.now() >= self.ends_at:
-            return 'closed'
-        return 'open'
+            return CLOSED
+        return OPEN
 
     @property
     def is_closed_check(self):
         return timezone.now() >= self.ends_at
 
-    def close_if_expired(self):
-        if self.ends_at <= timezone.now() and self.winner is None:
-            highest_bid = self.bids.order_by('-amount').first()
-            if highest_bid:
-                self.winner = highest_bid.user
-                self.save()
-
     def save(self, *args, **kwargs):
         if not self.id:
             self.highest_bid = self.starting_price
         if self.ends_at and timezone.now() >= self.ends_at:
             self.is_closed = True
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # Managed columns are advanced by place_bid(), the close scheduler and settle(); never write back a stale copy.
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.MANAGED_FIELDS
+            ]
         super().save(*args, **kwargs)
 
+class SearchDocumentField(models.TextField):
+    """An auction's indexed text; ``auctions.search`` registers its ``matches`` lookup."""
+
+
+class AuctionSearchEntry(models.Model):
+    """
+    A row of the full-text index, ``auctions_auction_fts``. The table and the
+    triggers that keep it in step with ``auctions_auction`` are created by
+    migration 0010; only queries join it, through ``Auction.search_entry``.
+    """
+    auction = models.OneToOneField(Auction, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid',
+                                   related_name='search_entry')
+    # The tsvector on PostgreSQL; SQLite's FTS5 table is matched as a whole.
+    document = SearchDocumentField()
+
+    class Meta:
+        managed = False
+        db_table = 'auctions_auction_fts'
+
+
+class BidQuerySet(models.QuerySet):
+    def for_feed(self, user):
+        """``user``'s bids with their auction and a ``winning`` flag, in one query."""
+        return self.filter(user=user).select_related('auction').annotate(winning=leading(user))
+
+
 class Bid(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bids')
-    auction = models.ForeignKey(Auction, on_delete=models.CASCADE, related_name='bids')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bids', db_index=False)
+    auction = models.ForeignKey(Auction, on_delete=models.CASCADE, related_name='bids', db_index=False)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = BidQuerySet.as_manager()
+
     class Meta:
         ordering = ['-amount']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='bid_created_at_id_idx'),
+            # Top bid per auction (ordering, winner subquery); also serves as the auction FK index.
+            models.Index(fields=['auction', '-amount', 'created_at'], name='bid_auction_amount_idx'),
+            # Per-auction bid history in cursor order.
+            models.Index(fields=['auction', 'created_at', 'id'], name='bid_auction_created_at_idx'),
+            # my-bids / mine=true in cursor order; also serves as the user FK index.
+            models.Index(fields=['user', 'created_at', 'id'], name='bid_user_created_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.amount}"
 
-    def clean(self):
-        if self.auction.ends_at < timezone.now():
-            raise ValidationError("Bidding is no longer allowed. The auction has ended.")
-        if self.amount <= self.auction.highest_bid:
-            raise ValidationError(f"The bid must be higher than the current highest bid of {self.auction.highest_bid}")
+
+class ProxyBid(models.Model):
+    """
+    A hidden maximum: ``auctions.bidding`` bids on the user's behalf, one
+    increment at a time, up to ``max_amount``. Only the resulting ``Bid`` rows
+    are visible to other users.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='proxy_bids', db_index=False)
+    auction = models.ForeignKey(Auction, on_delete=models.CASCADE, related_name='proxy_bids', db_index=False)
+    max_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    # When the current maximum was set; the earlier of two equal maximums wins.
+    placed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            # One maximum per user and auction; raising it replaces the old one.
+            models.UniqueConstraint(fields=['auction', 'user'], name='proxy_bid_auction_user_uniq'),
+        ]
+        indexes = [
+            # The two strongest proxies per auction, earliest first on ties.
+            models.Index(fields=['auction', '-max_amount', 'placed_at'], name='proxy_bid_auction_max_idx'),
+            models.Index(fields=['user', 'placed_at'], name='proxy_bid_user_placed_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - up to {self.max_amount}"
+
+
+class ArchivedAuctionQuerySet(models.QuerySet):
+    def for_summary(self):
+        return self.select_related('top_bidder')
+
+    def for_detail(self):
+        return self.select_related('owner', 'winner').prefetch_related(
+            Prefetch('bids', queryset=ArchivedBid.objects.select_related('user'))
+        )
+
+
+class ArchivedAuction(models.Model):
+    """
+    A settled auction moved out of the live table by ``auctions.archive``,
+    under its original id and with its final aggregates, so listing the
+    archive never reads the archived bids. Attribute names match ``Auction``,
+    so the auction serializers render archived auctions unchanged.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_auctions', db_index=False)
+    title = models.CharField(max_length=255)
+    description = models.TextField(blank=True)
+    starting_price = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField()
+    ends_at = models.DateTimeField()
+    highest_bid = models.DecimalField(max_digits=10, decimal_places=2)
+    winner = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    bid_count = models.PositiveIntegerField()
+    top_bidder = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    objects = ArchivedAuctionQuerySet.as_manager()
+
+    is_closed = True
+    status = CLOSED
+
+    class Meta:
+        indexes = [
+            # Archived periods are ranges of ends_at: export or drop them oldest first.
+            models.Index(fields=['ends_at', 'id'], name='archived_auction_ends_at_idx'),
+            models.Index(fields=['owner', 'ends_at', 'id'], name='archived_auction_owner_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class ArchivedBid(models.Model):
+    """A bid of an ``ArchivedAuction``, under its original id."""
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_bids', db_index=False)
+    auction = models.ForeignKey(ArchivedAuction, on_delete=models.CASCADE, related_name='bids', db_index=False)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-amount']
+        indexes = [
+            models.Index(fields=['auction', 'created_at', 'id'], name='archived_bid_auction_idx'),
+            models.Index(fields=['user', 'created_at', 'id'], name='archived_bid_user_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.amount}"
 
-    def save(self, *args, **kwargs):
-        self.clean()
 
+class Settlement(models.Model):
+    """
+    The outcome of a closed auction, written once by ``auctions.settlement``:
+    the owner's payout for a sale, or a record that nothing sold (no buyer,
+    price 0). Keyed by the auction's id rather than a foreign key, so it
+    outlives the auction being archived.
+    """
+    auction_id = models.BigIntegerField(unique=True)
+    seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='settlements')
+    buyer = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='purchases')
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    commission = models.DecimalField(max_digits=10, decimal_places=2)
+    payout = models.DecimalField(max_digits=10, decimal_places=2)
+    settled_at = models.DateTimeField(default=timezone.now)
+    paid_out_at = models.DateTimeField(null=True, blank=True)
 
-        if self.amount > self.auction.highest_bid:
-            self.auction.highest_bid = self.amount
-            self.auction.save()
+    def __str__(self):
+        return f"Auction {self.auction_id}: {self.price} to {self.seller.username}"
 
-        super().save(*args, **kwargs)
+
+class Invoice(models.Model):
+    """The buyer's bill for a sold auction, one per ``Settlement``."""
+    settlement = models.OneToOneField(Settlement, on_delete=models.CASCADE, to_field='auction_id',
+                                      related_name='invoice')
+    number = models.CharField(max_length=32, unique=True)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    issued_at = models.DateTimeField(default=timezone.now)
+    paid_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.number
+
+
+class Notification(models.Model):
+    """
+    A message to a user about a settled auction. Written in the settlement's
+    transaction and sent by ``deliver_notifications`` after it commits, so
+    every settled auction is announced, and announced once per user and kind.
+    """
+    WON = 'won'
+    SOLD = 'sold'
+    UNSOLD = 'unsold'
+    KINDS = [(WON, 'Won'), (SOLD, 'Sold'), (UNSOLD, 'Unsold')]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    auction_id = models.BigIntegerField()
+    kind = models.CharField(max_length=16, choices=KINDS)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['auction_id', 'user', 'kind'], name='notification_auction_user_kind_uniq'),
+        ]
+        indexes = [
+            # The delivery queue: only unsent rows are indexed.
+            models.Index(fields=['id'], condition=Q(sent_at__isnull=True), name='notification_unsent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} for {self.user.username} (auction {self.auction_id})"
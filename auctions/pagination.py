@@ -0,0 +1,200 @@
+from base64 import b64decode, b64encode
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination, _positive_int, _reverse_ordering
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class AsyncCursorPaginationMixin:
+    """
+    ``apaginate_queryset`` for async views: the same cursors, links and page
+    size rules as ``CursorPagination.paginate_queryset``, with the page
+    fetched through ``async for``.
+    """
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, current_position = self.cursor or (0, False, None)
+
+        queryset = queryset.order_by(*(_reverse_ordering(self.ordering) if reverse else self.ordering))
+        if current_position is not None:
+            order = self.ordering[0]
+            lookup = 'lt' if self.cursor.reverse != order.startswith('-') else 'gt'
+            queryset = queryset.filter(**{f"{order.lstrip('-')}__{lookup}": current_position})
+
+        results = [obj async for obj in queryset[offset:offset + self.page_size + 1]]
+        self.page = results[:self.page_size]
+        has_following_position = len(results) > len(self.page)
+        following_position = (
+            self._get_position_from_instance(results[-1], self.ordering) if has_following_position else None
+        )
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None or offset > 0
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+
+class AuctionCursorPagination(AsyncCursorPaginationMixin, CursorPagination):
+    """
+    Keyset pagination over ``(ends_at, id)``.
+
+    Bids only touch the aggregate columns of an auction, except with a soft
+    close (``AUCTION_SOFT_CLOSE_SECONDS``): a late bid then moves ``ends_at``
+    later, so a client paging forward may see that auction again on a later
+    page, and one paging backward may miss it. Only auctions in their final
+    seconds move.
+    """
+    ordering = ('ends_at', 'id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class LeaderboardCursorPagination(AuctionCursorPagination):
+    """Most bid-on auctions first; auctions with equal counts are paged by offset."""
+    ordering = ('-total_bids', '-id')
+
+
+class BidCursorPagination(AsyncCursorPaginationMixin, CursorPagination):
+    """Keyset pagination over ``(created_at, id)``, newest bids first."""
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class QueryPageSizeMixin:
+    def get_page_size(self, request):
+        try:
+            return _positive_int(request.query_params[self.page_size_query_param], strict=True,
+                                 cutoff=self.max_page_size)
+        except (KeyError, ValueError):
+            return self.page_size
+
+
+class SyncPagination(QueryPageSizeMixin, BasePagination):
+    """
+    Keyset pagination over ``(created_at, id)``, oldest first, for clients
+    that keep a local copy.
+
+    Every page, the last one included, returns a ``cursor``. Sending it back
+    as ``since`` returns only the rows created after it, so a client that is
+    up to date downloads nothing but new activity. ``next`` is only set while
+    there are more rows right now.
+    """
+    cursor_query_param = 'since'
+    invalid_cursor_message = 'Invalid cursor'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.since = self.decode_cursor(request)
+        page_size = self.get_page_size(request)
+        if self.since is not None:
+            created_at, pk = self.since
+            queryset = queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk))
+
+        results = list(queryset.order_by('created_at', 'pk')[:page_size + 1])
+        self.page = results[:page_size]
+        self.has_next = len(results) > page_size
+        if self.page:
+            self.cursor = self.encode_cursor(self.page[-1])
+        else:
+            self.cursor = request.query_params.get(self.cursor_query_param)
+        return self.page
+
+    @staticmethod
+    def encode_cursor(instance):
+        return b64encode(f'{instance.created_at.isoformat()} {instance.pk}'.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            created_at, pk = b64decode(encoded.encode(), validate=True).decode().split(' ')
+            return datetime.fromisoformat(created_at), int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.cursor)
+
+    def get_paginated_response(self, data, **extra):
+        return Response({'cursor': self.cursor, 'next': self.get_next_link(), **extra, 'results': data})
+
+
+class SearchPagination(QueryPageSizeMixin, BasePagination):
+    """
+    Page numbers over ranked search results, which have no column to keyset
+    on. The caller passes the total it already has from the facets, so there
+    is no COUNT query; every page is an OFFSET into the ranking, so only the
+    first ``max_page`` pages are served.
+    """
+    page_query_param = 'page'
+    invalid_page_message = 'Invalid page.'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    max_page = 50
+
+    def paginate_queryset(self, queryset, request, view=None, count=0):
+        self.request = request
+        self.count = count
+        page_size = self.get_page_size(request)
+        try:
+            self.number = _positive_int(request.query_params.get(self.page_query_param, 1), strict=True)
+        except ValueError:
+            raise NotFound(self.invalid_page_message)
+        offset = (self.number - 1) * page_size
+        if self.number > self.max_page or (offset and offset >= count):
+            raise NotFound(self.invalid_page_message)
+        self.has_next = offset + page_size < count and self.number < self.max_page
+        return list(queryset[offset:offset + page_size])
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.page_query_param, self.number + 1)
+
+    def get_previous_link(self):
+        url = self.request.build_absolute_uri()
+        if self.number == 1:
+            return None
+        if self.number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.number - 1)
+
+    def get_paginated_response(self, data, **extra):
+        return Response({'count': self.count, 'next': self.get_next_link(), 'previous': self.get_previous_link(),
+                         **extra, 'results': data})
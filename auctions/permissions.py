@@ -6,7 +6,7 @@ class AuctionOwnerPermission(permissions.BasePermission):
     """
     def has_object_permission(self, request, view, obj):
         # Check if the request user is the owner of the auction
-        return obj.owner == request.user
+        return obj.owner_id == request.user.id
 
 class BidOwnerPermission(permissions.BasePermission):
     """
@@ -14,4 +14,4 @@ class BidOwnerPermission(permissions.BasePermission):
     """
     def has_object_permission(self, request, view, obj):
         # Check if the request user is the owner of the bid
-        return obj.user == request.user
+        return obj.user_id == request.user.id
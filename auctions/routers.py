@@ -0,0 +1,193 @@
+"""
+Read replicas.
+
+Every alias in ``DATABASES`` other than ``default`` is a read replica of it.
+``ReplicaRouter`` sends reads to a replica and everything else to the
+primary, except where a replica could give a stale answer that matters:
+
+* inside a transaction on the primary, which may hold uncommitted writes
+  (this also keeps everything in ``TestCase`` on the primary);
+* for the rest of a request once it has written anything (writes made
+  outside a request, e.g. in the shell or a management command, pin
+  nothing, since no one would ever unpin that context);
+* for ``DATABASE_REPLICA_LAG`` seconds after a user placed a bid, in all of
+  that user's requests (read-your-writes), see ``pin_bidders``;
+* in Celery tasks and around auction cache fills, see ``use_primary``;
+* for users, sessions and revoked tokens, so a new account can log in and
+  a logout takes effect at once.
+
+A replica that cannot be connected to is skipped for
+``REPLICA_RETRY_SECONDS``; with none left, reads go to the primary.
+"""
+import asyncio
+import contextvars
+import random
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from celery.signals import task_postrun, task_prerun
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.dispatch import receiver
+
+from .signals import bid_placed
+
+PREFIX = 'db:pinned:'
+REPLICA_RETRY_SECONDS = 30
+PRIMARY_APPS = {'auth', 'sessions', 'token_blacklist'}
+
+# Whether reads in this context must see the primary; reset per request by ReplicaPinningMiddleware.
+pinned = contextvars.ContextVar('pinned', default=False)
+# Whether a write may pin the context: only inside a request, whose middleware resets the pin.
+in_request = contextvars.ContextVar('in_request', default=False)
+# alias -> monotonic time before which it is not tried again
+unavailable = {}
+
+
+def replicas():
+    return [alias for alias in connections if alias != DEFAULT_DB_ALIAS]
+
+
+def available(alias):
+    retry_at = unavailable.get(alias)
+    if retry_at is not None:
+        if time.monotonic() < retry_at:
+            return False
+        del unavailable[alias]
+    connection = connections[alias]
+    if connection.connection is not None or in_event_loop():
+        # Open connections are health-checked by Django (CONN_HEALTH_CHECKS) at the
+        # start of each request; async code queries from another thread's connection.
+        return True
+    try:
+        connection.ensure_connection()
+    except DatabaseError:
+        unavailable[alias] = time.monotonic() + REPLICA_RETRY_SECONDS
+        return False
+    return True
+
+
+def in_event_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def reads_from_primary():
+    return pinned.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block
+
+
+@contextmanager
+def use_primary():
+    token = pinned.set(True)
+    try:
+        yield
+    finally:
+        pinned.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            # Related objects come from where the instance did.
+            return instance._state.db
+        if reads_from_primary() or model._meta.app_label in PRIMARY_APPS:
+            return DEFAULT_DB_ALIAS
+        candidates = replicas()
+        random.shuffle(candidates)
+        return next((alias for alias in candidates if available(alias)), DEFAULT_DB_ALIAS)
+
+    def db_for_write(self, model, **hints):
+        if in_request.get():
+            pinned.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary.
+        return db == DEFAULT_DB_ALIAS
+
+
+def pinned_key(user_id):
+    return f'{PREFIX}{user_id}'
+
+
+@receiver(bid_placed)
+def pin_bidders(sender, bids, **kwargs):
+    """Read the bidders' next requests from the primary until the replicas have caught up."""
+    lag = settings.DATABASE_REPLICA_LAG
+    if lag and replicas():
+        cache.set_many({pinned_key(bid.user_id): True for bid in bids}, timeout=lag)
+
+
+def pin_if_bid_recently(user_id):
+    if user_id is not None and replicas() and cache.get(pinned_key(user_id)):
+        pinned.set(True)
+
+
+async def apin_if_bid_recently(user_id):
+    if user_id is not None and replicas() and await cache.aget(pinned_key(user_id)):
+        pinned.set(True)
+
+
+class ReplicaPinningMiddleware:
+    """
+    Starts every request on the replicas, unless it is made from inside a
+    transaction (a test), and pins session users who bid recently; token
+    users are pinned by their authentication class.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = pinned.set(connections[DEFAULT_DB_ALIAS].in_atomic_block)
+        scope = in_request.set(True)
+        try:
+            if settings.SESSION_COOKIE_NAME in request.COOKIES:
+                pin_if_bid_recently(request.session.get(SESSION_KEY))
+            return self.get_response(request)
+        finally:
+            in_request.reset(scope)
+            pinned.reset(token)
+
+    async def __acall__(self, request):
+        token = pinned.set(connections[DEFAULT_DB_ALIAS].in_atomic_block)
+        scope = in_request.set(True)
+        try:
+            if settings.SESSION_COOKIE_NAME in request.COOKIES:
+                await apin_if_bid_recently(await request.session.aget(SESSION_KEY))
+            return await self.get_response(request)
+        finally:
+            in_request.reset(scope)
+            pinned.reset(token)
+
+
+tasks_pinned = {}
+
+
+@receiver(task_prerun)
+def pin_task(task_id, **kwargs):
+    # Tasks close and settle auctions; they act on what the primary says.
+    tasks_pinned[task_id] = pinned.set(True)
+
+
+@receiver(task_postrun)
+def unpin_task(task_id, **kwargs):
+    token = tasks_pinned.pop(task_id, None)
+    if token is not None:
+        pinned.reset(token)
@@ -0,0 +1,174 @@
+"""
+Full-text search over auction titles and descriptions.
+
+The index, ``auctions_auction_fts``, is kept by the database: triggers from
+migration 0010 update it on every insert, change of title or description and
+delete of an auction, so it follows ``Auction.save`` as well as bulk inserts,
+set-based updates and the archive's deletes.
+
+- SQLite: an FTS5 table over the auction rows themselves (external content),
+  ranked by bm25;
+- PostgreSQL: a weighted tsvector per auction under a GIN index, ranked by
+  ``ts_rank_cd``.
+
+Title matches rank above description matches on both. Other backends fall
+back to an unranked substring match on the title.
+
+Text is reduced to its words; every word has to match and the last one may be
+the start of a word, so results follow what is being typed.
+"""
+import re
+from decimal import Decimal
+
+from django.db import connections
+from django.db.models import Count, F, FloatField, Func, Lookup, Q, Value
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .filters import AuctionFilterBackend
+from .models import STATUSES, Auction, SearchDocumentField
+
+VENDORS = ('sqlite', 'postgresql')
+MAX_WORDS = 8
+WORD = re.compile(r'[^\W_]+')
+# bm25 weights of the title and description columns (SQLite).
+BM25_WEIGHTS = (10.0, 1.0)
+# ts_rank_cd weights of the labels D, C, B (description) and A (title) (PostgreSQL).
+TS_RANK_WEIGHTS = '{0, 0, 0.1, 1.0}'
+# Lower bounds of the price facet's ranges, over the current price; the last range is open-ended.
+PRICE_BUCKETS = (Decimal(0), Decimal(10), Decimal(50), Decimal(100), Decimal(500), Decimal(1000))
+
+
+def words(text):
+    return tuple(WORD.findall(text.lower())[:MAX_WORDS])
+
+
+def fts5_query(words):
+    *whole, last = words
+    return ' '.join([*(f'"{word}"' for word in whole), f'"{last}"*'])
+
+
+def tsquery(words):
+    *whole, last = words
+    return ' & '.join([*whole, f'{last}:*'])
+
+
+@SearchDocumentField.register_lookup
+class Matches(Lookup):
+    """``search_entry__document__matches=words``: the entry has every one of ``words``."""
+    lookup_name = 'matches'
+    prepare_rhs = False
+
+    def as_sqlite(self, compiler, connection):
+        return f'{compiler.quote_name_unless_alias(self.lhs.alias)} MATCH %s', [fts5_query(self.rhs)]
+
+    def as_postgresql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        return f"{lhs} @@ to_tsquery('simple', %s)", [*lhs_params, tsquery(self.rhs)]
+
+
+class Rank(Func):
+    """How well the entry joined by ``Matches`` matches ``words``; higher is better."""
+    output_field = FloatField()
+
+    def __init__(self, words):
+        super().__init__(F('search_entry__document'))
+        self.words = words
+
+    def as_sqlite(self, compiler, connection):
+        document, = self.get_source_expressions()
+        weights = ', '.join(map(str, BM25_WEIGHTS))
+        # bm25() is lower for better matches.
+        return f'-bm25({compiler.quote_name_unless_alias(document.alias)}, {weights})', []
+
+    def as_postgresql(self, compiler, connection):
+        sql, params = compiler.compile(self.get_source_expressions()[0])
+        return f"ts_rank_cd('{TS_RANK_WEIGHTS}', {sql}, to_tsquery('simple', %s))", [*params, tsquery(self.words)]
+
+
+def indexed(queryset):
+    return connections[queryset.db].vendor in VENDORS
+
+
+def match(queryset, text):
+    found = words(text)
+    if not found:
+        return queryset.none()
+    if not indexed(queryset):
+        return queryset.filter(title__icontains=text)
+    return queryset.filter(search_entry__document__matches=found)
+
+
+def ranked(queryset, text):
+    queryset = match(queryset, text)
+    found = words(text)
+    rank = Rank(found) if found and indexed(queryset) else Value(0.0)
+    return queryset.annotate(rank=rank).order_by('-rank', 'id')
+
+
+def price_q(min_price=None, max_price=None):
+    """``min_price <= highest_bid <= max_price``, as the list filters have it."""
+    q = Q()
+    if min_price is not None:
+        q &= Q(highest_bid__gte=min_price)
+    if max_price is not None:
+        q &= Q(highest_bid__lte=max_price)
+    return q
+
+
+def price_ranges():
+    """``(low, high)`` pairs of the price facet; ``low <= highest_bid < high``."""
+    return zip(PRICE_BUCKETS, PRICE_BUCKETS[1:] + (None,))
+
+
+def price_range_q(low, high):
+    return Q(highest_bid__gte=low) if high is None else Q(highest_bid__gte=low, highest_bid__lt=high)
+
+
+def facets(queryset, status=None, min_price=None, max_price=None, now=None):
+    """
+    ``(count, facets)`` of the matches in ``queryset``, in one aggregate
+    query: how many pass every filter, and how many there are per status and
+    per price range. A facet leaves out its own filter, so its counts are what
+    choosing another value of it would return.
+    """
+    now = now or timezone.now()
+    status_filter = queryset.status_q(status, now) if status else Q()
+    price_filter = price_q(min_price, max_price)
+    ranges = list(price_ranges())
+    counts = queryset.aggregate(
+        count=Count('pk', filter=status_filter & price_filter),
+        **{name: Count('pk', filter=queryset.status_q(name, now) & price_filter) for name in STATUSES},
+        **{f'price_{index}': Count('pk', filter=price_range_q(low, high) & status_filter)
+           for index, (low, high) in enumerate(ranges)},
+    )
+    return counts['count'], {
+        'status': {name: counts[name] for name in STATUSES},
+        'price': [
+            {'from': str(low), 'to': None if high is None else str(high), 'count': counts[f'price_{index}']}
+            for index, (low, high) in enumerate(ranges)
+        ],
+    }
+
+
+def search_auctions(params, now=None):
+    """
+    ``(results, count, facets)`` for ``q``, ``status``, ``min_price`` and
+    ``max_price`` in ``params``: the ``for_list()`` rows that match, best
+    first, and the ``facets()`` of every match.
+    """
+    text = params.get('q', '').strip()
+    if not text:
+        raise ValidationError({'q': "This parameter is required."})
+    status = params.get('status') or None
+    if status and status not in STATUSES:
+        raise ValidationError({'status': f"Must be one of: {', '.join(STATUSES)}."})
+    min_price = AuctionFilterBackend.parse_decimal(params, 'min_price') if 'min_price' in params else None
+    max_price = AuctionFilterBackend.parse_decimal(params, 'max_price') if 'max_price' in params else None
+
+    now = now or timezone.now()
+    count, summary = facets(Auction.objects.search(text), status, min_price, max_price, now)
+    results = Auction.objects.for_list().ranked_search(text).filter(price_q(min_price, max_price))
+    if status:
+        results = results.with_status(status, now)
+    return results, count, summary
@@ -1,10 +1,14 @@
 from datetime import timedelta
+from decimal import Decimal
+from functools import cached_property
 from django.contrib.auth import get_user_model
-from rest_framework.exceptions import ValidationError
 from django.utils import timezone
 from rest_framework import serializers
 from rest_framework.serializers import ModelSerializer
-from .models import Auction, Bid
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer as BaseTokenRefreshSerializer
+from .authentication import SessionRefreshToken
+from .bidding import MAX_BULK_BIDS
+from .models import Auction, Bid, ProxyBid, CLOSED
 
 
 class BidSerializer(serializers.ModelSerializer):
@@ -14,54 +18,73 @@ class BidSerializer(serializers.ModelSerializer):
         model = Bid
         fields = '__all__'
 
-    def validate(self, attrs):
-        auction = attrs['auction']
-        user = self.context['request'].user
-        amount = attrs['amount']
+    def validate_amount(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Bid amount must be greater than zero.")
+        return value
 
-        # Nie możesz licytować własnej aukcji
-        if auction.owner == user:
-            raise ValidationError("You cannot bid on your own auction.")
 
-        # Kwota musi być większa od aktualnej najwyższej
-        if amount <= auction.highest_bid:
-            raise ValidationError("The bid must be higher than the current highest bid.")
+class BidFeedSerializer(serializers.ModelSerializer):
+    """A row of the bidder's own feed; ``winning`` comes from the ``for_feed`` annotation."""
+    auction_title = serializers.ReadOnlyField(source='auction.title')
+    winning = serializers.BooleanField(read_only=True)
 
-        # Aukcja nie może być zamknięta
-        if auction.is_closed:
-            raise ValidationError("This auction is closed. You can't place a bid.")
+    class Meta:
+        model = Bid
+        fields = ['id', 'auction', 'auction_title', 'amount', 'created_at', 'winning']
+        read_only_fields = fields
 
-        return attrs
+
+class BidPlacementSerializer(serializers.Serializer):
+    """
+    Input for placing a bid. The auction is taken by id and never loaded here;
+    every business rule is checked by ``auctions.bidding.place_bid``.
+    """
+    auction = serializers.IntegerField()
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2)
 
     def validate_amount(self, value):
         if value <= 0:
             raise serializers.ValidationError("Bid amount must be greater than zero.")
         return value
 
-    def create(self, validated_data):
-        validated_data['user'] = self.context['request'].user
-        return super().create(validated_data)
+
+class BulkBidSerializer(serializers.Serializer):
+    """
+    A batch of bids. Only the shape is checked here; each item is validated
+    on its own so one bad item does not reject the batch.
+    """
+    bids = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=MAX_BULK_BIDS)
+
+
+class ProxyBidSerializer(serializers.ModelSerializer):
+    """A user's hidden maximum. Only ever shown to its owner."""
+    auction = serializers.IntegerField(source='auction_id')
+
+    class Meta:
+        model = ProxyBid
+        fields = ['id', 'auction', 'max_amount', 'placed_at']
+        read_only_fields = ['placed_at']
+
+    def validate_max_amount(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Maximum bid must be greater than zero.")
+        return value
 
 
 class AuctionSerializer(serializers.ModelSerializer):
     winner = serializers.StringRelatedField()
     owner = serializers.ReadOnlyField(source='owner.username')
-    highest_bid = serializers.SerializerMethodField()
+    highest_bid = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    status = serializers.CharField(read_only=True)
     bids = BidSerializer(many=True, read_only=True)  # Historia ofert
     ends_at = serializers.DateTimeField(format="%Y-%m-%dT%H:%M:%S")
 
     class Meta:
         model = Auction
-        fields = '__all__'
+        exclude = ["close_scheduled_for"]
         exeption = ["highest_bid"]
-        read_only_fields = ["is_closed"]
-
-    def get_status(self, obj):
-        return "closed" if obj.end_date < timezone.now() else "open"
-
-    def get_highest_bid(self, obj):
-        highest = obj.bids.order_by('-amount').first()
-        return highest.amount if highest else obj.starting_price
+        read_only_fields = ["is_closed", "bid_count", "top_bidder"]
 
     def validate(self, data):
         end_date = data.get('ends_at')
@@ -79,29 +102,155 @@ class AuctionSerializer(serializers.ModelSerializer):
         return value
 
 
+class AuctionListSerializer(serializers.ModelSerializer):
+    """Compact auction representation for list routes, without the bid history."""
+    winner = serializers.StringRelatedField()
+    owner = serializers.ReadOnlyField(source='owner.username')
+    status = serializers.CharField(read_only=True)
+    ends_at = serializers.DateTimeField(format="%Y-%m-%dT%H:%M:%S")
+
+    class Meta:
+        model = Auction
+        fields = ['id', 'title', 'owner', 'starting_price', 'highest_bid', 'bid_count', 'created_at', 'ends_at',
+                  'is_closed', 'status', 'winner']
+        read_only_fields = fields
+
+
 class AuctionSummarySerializer(serializers.ModelSerializer):
-    highest_bid = serializers.SerializerMethodField()
-    total_bids = serializers.SerializerMethodField()
+    highest_bid = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    total_bids = serializers.IntegerField(source='bid_count', read_only=True)
     winner = serializers.SerializerMethodField()
 
     class Meta:
         model = Auction
         fields = ['id', 'title', 'starting_price', 'highest_bid', 'total_bids', 'winner']
 
-    def get_highest_bid(self, obj):
-        highest_bid = obj.bids.order_by('-amount').first()
-        return highest_bid.amount if highest_bid else obj.starting_price
+    def get_winner(self, obj):
+        if obj.status == CLOSED and obj.top_bidder:
+            return obj.top_bidder.username
+        return None
+
 
-    def get_total_bids(self, obj):
-        return obj.bids.count()
+class AuctionStatsSerializer(serializers.ModelSerializer):
+    """A row of the summary list and the leaderboard; reads only the ``for_stats`` annotations."""
+    highest_bid = serializers.DecimalField(source='top_amount', max_digits=10, decimal_places=2, read_only=True)
+    total_bids = serializers.IntegerField(read_only=True)
+    status = serializers.CharField(read_only=True)
+    winner = serializers.SerializerMethodField()
+    ends_at = serializers.DateTimeField(format="%Y-%m-%dT%H:%M:%S", read_only=True)
 
+    class Meta:
+        model = Auction
+        fields = ['id', 'title', 'starting_price', 'highest_bid', 'total_bids', 'ends_at', 'status', 'winner']
+        read_only_fields = fields
 
     def get_winner(self, obj):
-        if obj.status == "closed":
-            highest_bid = obj.bids.order_by('-amount').first()
-            return highest_bid.user.username if highest_bid else None
-        return None
+        return obj.leader if obj.status == CLOSED else None
+
+
+class FeedAuctionSerializer(serializers.ModelSerializer):
+    """Current state of an auction in a bidder's feed, from ``bid_on_since``."""
+    status = serializers.CharField(read_only=True)
+    winning = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = Auction
+        fields = ['id', 'title', 'highest_bid', 'bid_count', 'ends_at', 'status', 'winning']
+        read_only_fields = fields
+
+
+ENDS_AT_FORMAT = "%Y-%m-%dT%H:%M:%S"
+CENTS = Decimal('0.01')
+
+
+def decimal_string(value):
+    """As ``DecimalField(decimal_places=2)`` renders it."""
+    return None if value is None else f'{value.quantize(CENTS):f}'
+
+
+def iso_datetime(value, tz):
+    """As ``DateTimeField`` renders it in the default ISO 8601 format."""
+    value = value.astimezone(tz).isoformat()
+    return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+
+class RowSerializer(serializers.BaseSerializer):
+    """
+    Read-only serializer for list pages. It renders the plain dicts of
+    ``rows(queryset)``, a ``.values()`` of ``columns``, exactly as the
+    ``ModelSerializer`` it stands in for, without binding and running a DRF
+    field per value of every object. That serializer still describes the
+    route in the API docs.
+    """
+    columns = ()
 
+    @classmethod
+    def rows(cls, queryset):
+        return queryset.values(*cls.columns)
+
+    @cached_property
+    def tz(self):
+        return timezone.get_current_timezone()
+
+
+class BidRowSerializer(RowSerializer):
+    """``BidSerializer`` for bid lists."""
+    columns = ('id', 'user__username', 'amount', 'created_at', 'auction_id')
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'user': row['user__username'],
+            'amount': decimal_string(row['amount']),
+            'created_at': iso_datetime(row['created_at'], self.tz),
+            'auction': row['auction_id'],
+        }
+
+
+class AuctionListRowSerializer(RowSerializer):
+    """``AuctionListSerializer`` for ``for_list()`` querysets."""
+    columns = ('id', 'title', 'owner__username', 'starting_price', 'highest_bid', 'bid_count', 'created_at',
+               'ends_at', 'is_closed', 'current_status', 'winner__username')
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'title': row['title'],
+            'owner': row['owner__username'],
+            'starting_price': decimal_string(row['starting_price']),
+            'highest_bid': decimal_string(row['highest_bid']),
+            'bid_count': row['bid_count'],
+            'created_at': iso_datetime(row['created_at'], self.tz),
+            'ends_at': row['ends_at'].astimezone(self.tz).strftime(ENDS_AT_FORMAT),
+            'is_closed': row['is_closed'],
+            'status': row['current_status'],
+            'winner': row['winner__username'],
+        }
+
+
+class AuctionSearchRowSerializer(AuctionListRowSerializer):
+    """``AuctionListRowSerializer`` plus the ``rank`` of a ``ranked_search()``."""
+    columns = AuctionListRowSerializer.columns + ('rank',)
+
+    def to_representation(self, row):
+        return {**super().to_representation(row), 'rank': row['rank']}
+
+
+class AuctionStatsRowSerializer(RowSerializer):
+    """``AuctionStatsSerializer`` for ``for_stats()`` querysets."""
+    columns = ('id', 'title', 'starting_price', 'top_amount', 'total_bids', 'ends_at', 'current_status', 'leader')
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'title': row['title'],
+            'starting_price': decimal_string(row['starting_price']),
+            'highest_bid': decimal_string(row['top_amount']),
+            'total_bids': row['total_bids'],
+            'ends_at': row['ends_at'].astimezone(self.tz).strftime(ENDS_AT_FORMAT),
+            'status': row['current_status'],
+            'winner': row['leader'] if row['current_status'] == CLOSED else None,
+        }
 
 
 class LoginSerializer(serializers.Serializer):
@@ -111,6 +260,10 @@ class LoginSerializer(serializers.Serializer):
     class Meta:
         fields = '__all__'
 
+
+class TokenRefreshSerializer(BaseTokenRefreshSerializer):
+    token_class = SessionRefreshToken
+
 User = get_user_model()
 
 
@@ -0,0 +1,167 @@
+"""
+Settlement of closed auctions.
+
+Closing (``AuctionQuerySet.settle``) marks an auction closed and records the
+top bidder as its winner. Settlement then writes, once per auction:
+
+- a ``Settlement``: the sale price, the commission
+  (``AUCTION_COMMISSION_RATE``) and the owner's payout, or a record that the
+  auction ended without bids;
+- an ``Invoice`` to the winner for the sale price;
+- ``Notification`` rows for the winner and the owner, sent afterwards by
+  ``deliver_batch``.
+
+Both run in Celery tasks (``auctions.tasks``), never in a request. A batch is
+written in one transaction, and every record is unique per auction (per
+user and kind for notifications), so a retried, redelivered or concurrent
+task cannot settle or announce an auction twice.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import Auction, Invoice, Notification, Settlement
+
+BATCH_SIZE = 500
+MAX_BATCHES = 20
+CENTS = Decimal('0.01')
+
+# kind -> (subject, body), formatted with the notification's payload.
+MESSAGES = {
+    Notification.WON: (
+        'You won "{title}"',
+        'Your bid of {price} won "{title}". Invoice {invoice} is ready.',
+    ),
+    Notification.SOLD: (
+        '"{title}" sold',
+        '"{title}" sold for {price}. After the {commission} commission your payout is {payout}.',
+    ),
+    Notification.UNSOLD: (
+        '"{title}" ended without bids',
+        '"{title}" ended without any bids.',
+    ),
+}
+
+
+def settleable():
+    """Closed auctions with their outcome decided (no bids, or a winner) and no ``Settlement`` yet."""
+    return Auction.objects.filter(Q(bid_count=0) | Q(winner__isnull=False), is_closed=True).exclude(
+        Exists(Settlement.objects.filter(auction_id=OuterRef('pk'))),
+    )
+
+
+def invoice_number(auction_id):
+    return f'INV-{auction_id:010d}'
+
+
+def settlement_records(auction, rate, now):
+    """``(settlement, invoice or None, notifications)`` for one ``settleable()`` row."""
+    sold = auction['winner_id'] is not None
+    price = auction['highest_bid'] if sold else Decimal('0.00')
+    commission = (price * rate).quantize(CENTS)
+    settlement = Settlement(auction_id=auction['pk'], seller_id=auction['owner_id'], buyer_id=auction['winner_id'],
+                            price=price, commission=commission, payout=price - commission, settled_at=now)
+    payload = {'title': auction['title'], 'price': str(price), 'commission': str(commission),
+               'payout': str(settlement.payout)}
+    if not sold:
+        return settlement, None, [
+            Notification(user_id=auction['owner_id'], auction_id=auction['pk'], kind=Notification.UNSOLD,
+                         payload=payload, created_at=now),
+        ]
+    invoice = Invoice(settlement_id=auction['pk'], number=invoice_number(auction['pk']), amount=price, issued_at=now)
+    return settlement, invoice, [
+        Notification(user_id=auction['winner_id'], auction_id=auction['pk'], kind=Notification.WON,
+                     payload={**payload, 'invoice': invoice.number}, created_at=now),
+        Notification(user_id=auction['owner_id'], auction_id=auction['pk'], kind=Notification.SOLD,
+                     payload=payload, created_at=now),
+    ]
+
+
+def settle_batch(auction_ids=None, batch_size=BATCH_SIZE):
+    """
+    Settle one batch of ``settleable()`` auctions, of ``auction_ids`` if
+    given, oldest ``ends_at`` first. Returns the ids settled.
+    """
+    now = timezone.now()
+    rate = settings.AUCTION_COMMISSION_RATE
+    with transaction.atomic():
+        pending = settleable()
+        if auction_ids is not None:
+            pending = pending.filter(pk__in=auction_ids)
+        auctions = list(
+            pending.order_by('ends_at', 'pk')
+            .select_for_update(skip_locked=True)
+            .values('pk', 'owner_id', 'winner_id', 'highest_bid', 'title')[:batch_size]
+        )
+        if not auctions:
+            return []
+
+        settlements, invoices, notifications = [], [], []
+        for auction in auctions:
+            settlement, invoice, messages = settlement_records(auction, rate, now)
+            settlements.append(settlement)
+            if invoice is not None:
+                invoices.append(invoice)
+            notifications += messages
+        # The row locks keep concurrent batches apart; the unique keys make any overlap a no-op.
+        Settlement.objects.bulk_create(settlements, ignore_conflicts=True)
+        Invoice.objects.bulk_create(invoices, ignore_conflicts=True)
+        Notification.objects.bulk_create(notifications, ignore_conflicts=True)
+    return [auction['pk'] for auction in auctions]
+
+
+def settle_closed(auction_ids=None, batch_size=BATCH_SIZE, max_batches=MAX_BATCHES):
+    """Settle at most ``max_batches`` batches. Returns how many auctions were settled."""
+    settled = 0
+    for _ in range(max_batches):
+        batch = settle_batch(auction_ids, batch_size)
+        if not batch:
+            break
+        settled += len(batch)
+    return settled
+
+
+def email(notification):
+    subject, body = MESSAGES[notification.kind]
+    return EmailMessage(subject.format(**notification.payload), body.format(**notification.payload),
+                        to=[notification.user.email])
+
+
+def deliver_batch(batch_size=BATCH_SIZE):
+    """
+    E-mail one batch of unsent notifications and mark them sent. Users
+    without an address are marked sent too; there is nowhere to deliver.
+
+    If sending fails the transaction rolls back and the whole batch stays
+    queued for the retry, so delivery is at least once: messages that went
+    out before the failure are sent again.
+    """
+    with transaction.atomic():
+        pending = list(
+            Notification.objects.filter(sent_at__isnull=True).select_related('user').order_by('pk')
+            .select_for_update(skip_locked=True, of=('self',))[:batch_size]
+        )
+        if not pending:
+            return 0
+        messages = [email(notification) for notification in pending if notification.user.email]
+        if messages:
+            get_connection().send_messages(messages)
+        Notification.objects.filter(pk__in=[notification.pk for notification in pending]).update(
+            sent_at=timezone.now(),
+        )
+    return len(pending)
+
+
+def deliver_pending(batch_size=BATCH_SIZE, max_batches=MAX_BATCHES):
+    """Deliver at most ``max_batches`` batches. Returns how many notifications were handled."""
+    delivered = 0
+    for _ in range(max_batches):
+        batch = deliver_batch(batch_size)
+        if not batch:
+            break
+        delivered += batch
+    return delivered
@@ -0,0 +1,10 @@
+from django.dispatch import Signal
+
+# Sent once the transaction that accepted the bids has committed. Args: ``bids``.
+bid_placed = Signal()
+
+# Sent once a settlement batch has committed. Args: ``auction_ids``.
+auctions_closed = Signal()
+
+# Sent once a bid that extended auctions (soft close) has committed. Args: ``auction_ids``, ``ends_at``.
+auctions_extended = Signal()
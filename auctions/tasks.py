@@ -1,10 +1,142 @@
+import logging
+from datetime import datetime, timedelta
+
 from celery import shared_task
+from django.db import DatabaseError, transaction
+from django.db.models import F, Q
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 from django.utils import timezone
+
+from .archive import archive_closed
 from .models import Auction
+from .settlement import deliver_pending, settle_closed
+from .signals import auctions_extended
+
+logger = logging.getLogger(__name__)
+
+# Close tasks are only queued for auctions ending within this window. Longer
+# ETAs would outlive the Redis broker's visibility timeout and get redelivered.
+SCHEDULE_HORIZON = timedelta(minutes=30)
+SWEEP_CHUNK_SIZE = 500
+SWEEP_MAX_CHUNKS = 20
+# Settlement and delivery are idempotent, so a failed or lost run is simply run again.
+RETRY_OPTIONS = {'acks_late': True, 'autoretry_for': (DatabaseError,), 'retry_backoff': True, 'max_retries': 5}
+
+
+def schedule_close(auction):
+    """
+    Queue a close task for ``auction`` at its ``ends_at``.
+
+    Rescheduling and cancellation need no revoke: the task carries the
+    ``ends_at`` it was queued for and does nothing if the auction has since
+    moved or been deleted.
+
+    Best effort: this runs after a request's commit, so a broker that is
+    down is logged rather than raised. The auction stays unscheduled and
+    ``schedule_upcoming_closes`` queues it on a later run.
+    """
+    if auction.is_closed or auction.ends_at > timezone.now() + SCHEDULE_HORIZON:
+        return False
+    if auction.close_scheduled_for == auction.ends_at:
+        return False
+    try:
+        close_auction.apply_async((auction.pk, auction.ends_at.isoformat()), eta=auction.ends_at)
+    except Exception:
+        logger.exception("Could not queue the close of auction %s", auction.pk)
+        return False
+    Auction.objects.filter(pk=auction.pk, ends_at=auction.ends_at).update(close_scheduled_for=auction.ends_at)
+    auction.close_scheduled_for = auction.ends_at
+    return True
+
+
+@receiver(post_save, sender=Auction)
+def schedule_close_on_save(sender, instance, **kwargs):
+    transaction.on_commit(lambda: schedule_close(instance))
+
+
+@receiver(auctions_extended)
+def schedule_close_on_extend(sender, auction_ids, ends_at, **kwargs):
+    """A soft close moved ``ends_at``: the queued task no longer matches, so queue one for the new end."""
+    extended = Auction.objects.filter(pk__in=auction_ids, ends_at=ends_at).only(
+        'pk', 'ends_at', 'is_closed', 'close_scheduled_for',
+    )
+    for auction in extended:
+        schedule_close(auction)
+
+
+def queue_settlement(auction_ids=None):
+    transaction.on_commit(lambda: settle_auctions.delay(auction_ids))
+
+
+@shared_task(bind=True, **RETRY_OPTIONS)
+def close_auction(self, auction_id, ends_at):
+    """Close one auction and pick its winner, then hand it to ``settle_auctions``."""
+    ends_at = datetime.fromisoformat(ends_at)
+    if ends_at > timezone.now():
+        # Delivered early (clock skew between beat, broker and worker).
+        if not self.request.is_eager:
+            raise self.retry(eta=ends_at, max_retries=None)
+        return "Auction has not ended yet."
+    closed, awarded = Auction.objects.filter(pk=auction_id, ends_at=ends_at).settle()
+    if closed or awarded:
+        queue_settlement([auction_id])
+    return f"Closed {closed} expired auctions, awarded {awarded} winners."
+
 
 @shared_task
-def close_expired_auctions():
+def schedule_upcoming_closes(chunk_size=SWEEP_CHUNK_SIZE):
+    """Queue close tasks for auctions that entered the scheduling horizon."""
+    upcoming = Auction.objects.filter(
+        Q(close_scheduled_for__isnull=True) | ~Q(close_scheduled_for=F('ends_at')),
+        is_closed=False,
+        ends_at__lte=timezone.now() + SCHEDULE_HORIZON,
+    ).only('pk', 'ends_at', 'is_closed', 'close_scheduled_for').order_by('ends_at')[:chunk_size]
+    scheduled = sum(schedule_close(auction) for auction in upcoming)
+    return f"Scheduled {scheduled} auction closes."
+
+
+@shared_task
+def close_expired_auctions(chunk_size=SWEEP_CHUNK_SIZE, max_chunks=SWEEP_MAX_CHUNKS):
+    """
+    Catch-up sweep for auctions whose close task never ran. Works in bounded
+    chunks and stops after ``max_chunks``; the next run picks up the rest.
+    """
     now = timezone.now()
-    expired_auctions = Auction.objects.filter(is_closed=False, ends_at__lte=now)
-    updated_count = expired_auctions.update(is_closed=True)
-    return f"Closed {updated_count} expired auctions."
\ No newline at end of file
+    closed = awarded = 0
+    for _ in range(max_chunks):
+        chunk_closed, chunk_awarded = Auction.objects.settle(now=now, limit=chunk_size)
+        if not chunk_closed and not chunk_awarded:
+            break
+        closed += chunk_closed
+        awarded += chunk_awarded
+    if closed or awarded:
+        queue_settlement()
+    return f"Closed {closed} expired auctions, awarded {awarded} winners."
+
+
+@shared_task(**RETRY_OPTIONS)
+def settle_auctions(auction_ids=None, batch_size=SWEEP_CHUNK_SIZE, max_batches=SWEEP_MAX_CHUNKS):
+    """
+    Write the settlement, invoice and notifications of closed auctions
+    (``auction_ids``, or any still unsettled) in batches, then queue the
+    notifications' delivery. Also the catch-up sweep for lost runs.
+    """
+    settled = settle_closed(auction_ids, batch_size, max_batches)
+    if settled:
+        transaction.on_commit(deliver_notifications.delay)
+    return f"Settled {settled} auctions."
+
+
+@shared_task(**{**RETRY_OPTIONS, 'autoretry_for': (DatabaseError, OSError)})
+def deliver_notifications(batch_size=SWEEP_CHUNK_SIZE, max_batches=SWEEP_MAX_CHUNKS):
+    """Send queued notifications; a mail server error retries the batch."""
+    delivered = deliver_pending(batch_size, max_batches)
+    return f"Delivered {delivered} notifications."
+
+
+@shared_task
+def archive_closed_auctions():
+    """Move auctions settled more than ``AUCTION_ARCHIVE_AFTER_DAYS`` ago into the archive tables."""
+    auctions, bids = archive_closed()
+    return f"Archived {auctions} auctions with {bids} bids."
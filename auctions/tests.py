@@ -1,12 +1,55 @@
-from django.test import TestCase, Client
-from django.urls import reverse
+import asyncio
+import csv
+import io
+import json
+import os
+import pstats
+import subprocess
+import sys
+import tempfile
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.test import AsyncClient, TestCase, TransactionTestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from kombu.exceptions import OperationalError as BrokerError
+from django.urls import resolve, reverse
 from django.contrib.auth.models import User
 from rest_framework import status
-from rest_framework.test import APITestCase
-from .models import Auction, Bid
+from rest_framework.exceptions import ValidationError as DRFValidationError
+from rest_framework.test import APIClient, APIRequestFactory, APITestCase, force_authenticate
+from . import cache as auction_cache
+from .authentication import issue_tokens
+from .benchmarks import check_budgets, refresh_bid_aggregates, run_api_routes, run_concurrent_bids
+from .bidding import apply_batch, place_bid, place_bids, resolve_proxies, set_proxy_bid
+from .events import auction_group, publish_bids
+from .archive import archive_closed
+from .metrics import profiling
+from .models import ArchivedAuction, ArchivedBid, Auction, Bid, Invoice, Notification, ProxyBid, Settlement
+from . import renderers
+from .serializers import AuctionListRowSerializer, AuctionListSerializer, AuctionSerializer, AuctionStatsRowSerializer, \
+    AuctionStatsSerializer, AuctionSummarySerializer, BidRowSerializer, BidSerializer
+from .routing import websocket_urlpatterns
+from .settlement import deliver_pending, settle_closed
+from .routers import ReplicaRouter, pinned, unavailable
+from .throttling import TokenBucketThrottle
+from .urls import router_views
+from .tasks import close_auction, close_expired_auctions, deliver_notifications, schedule_upcoming_closes, \
+    settle_auctions
 from django.utils import timezone
 from datetime import timedelta
-from django.core.exceptions import ValidationError
+from decimal import Decimal
+from drf_yasg.generators import OpenAPISchemaGenerator
+from django_REST_API_auction_house.celery import app as celery_app
+from django_REST_API_auction_house.docs import CachedSchemaGenerator
 
 
 class AuctionViewSetTests(APITestCase):
@@ -58,7 +101,7 @@ class AuctionViewSetTests(APITestCase):
         self.client.force_login(self.user)
         response = self.client.get(f"{reverse('auction-list')}?mine=true")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
 
 
 class BidViewSetTests(APITestCase):
@@ -133,7 +176,1537 @@ class CurrentUserViewTests(APITestCase):
         response = self.client.get(reverse('current-user'))
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['username'], 'testuser')
-        
 
-        
 
+class AuctionSettlementTests(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='ownerpass')
+        self.bidder = User.objects.create_user(username='bidder', password='bidderpass')
+        self.rival = User.objects.create_user(username='rival', password='rivalpass')
+        self.auctions = [
+            Auction.objects.create(
+                owner=self.owner,
+                title=f'Auction {i}',
+                starting_price=100.00,
+                ends_at=timezone.now() + timedelta(days=1),
+            )
+            for i in range(3)
+        ]
+        for auction in self.auctions[:2]:
+            place_bid(auction.pk, self.rival, 150)
+            place_bid(auction.pk, self.bidder, 200)
+        Auction.objects.update(ends_at=timezone.now() - timedelta(minutes=1))
+
+    def test_settle_closes_and_awards_in_constant_queries(self):
+        with self.assertNumQueries(6):  # two SELECTs of pending ids, two UPDATEs inside a savepoint pair
+            closed, awarded = Auction.objects.settle()
+        self.assertEqual((closed, awarded), (3, 2))
+        for auction in self.auctions:
+            auction.refresh_from_db()
+            self.assertTrue(auction.is_closed)
+        self.assertEqual(self.auctions[0].winner, self.bidder)
+        self.assertIsNone(self.auctions[2].winner)
+
+    def test_settle_works_through_the_backlog_in_batches(self):
+        with mock.patch('auctions.models.SETTLE_BATCH_SIZE', 2), self.assertNumQueries(11):
+            # Batches of 2 and 1 unclosed auctions (a SELECT and 4 queries each), then no unawarded ones.
+            closed, awarded = Auction.objects.settle()
+        self.assertEqual((closed, awarded), (3, 2))
+        self.assertFalse(Auction.objects.filter(is_closed=False).exists())
+
+    def test_settle_is_idempotent(self):
+        Auction.objects.settle()
+        self.assertEqual(Auction.objects.settle(), (0, 0))
+
+    def test_settle_single_auction(self):
+        Auction.objects.filter(pk=self.auctions[0].pk).settle()
+        self.auctions[0].refresh_from_db()
+        self.assertEqual(self.auctions[0].winner, self.bidder)
+        self.auctions[1].refresh_from_db()
+        self.assertIsNone(self.auctions[1].winner)
+
+    def test_list_does_not_settle(self):
+        self.client.get(reverse('auction-list'))
+        self.assertFalse(Auction.objects.filter(winner__isnull=False).exists())
+
+    def test_close_expired_auctions_task(self):
+        self.assertEqual(close_expired_auctions(), "Closed 3 expired auctions, awarded 2 winners.")
+
+
+class SettlementPipelineTests(APITestCase):
+    def setUp(self):
+        # As with CELERY_TASK_ALWAYS_EAGER=1: delay() runs the task in place.
+        for option in ('CELERY_TASK_ALWAYS_EAGER', 'CELERY_TASK_EAGER_PROPAGATES'):
+            self.addCleanup(setattr, celery_app.conf, option, getattr(celery_app.conf, option))
+            setattr(celery_app.conf, option, True)
+        self.owner = User.objects.create_user(username='owner', password='ownerpass', email='owner@example.com')
+        self.bidder = User.objects.create_user(username='bidder', password='bidderpass', email='bidder@example.com')
+        self.rival = User.objects.create_user(username='rival', password='rivalpass')
+        ends_at = timezone.now() + timedelta(days=1)
+        self.sold, self.unsold = (
+            Auction.objects.create(owner=self.owner, title=title, starting_price=100, ends_at=ends_at)
+            for title in ('Sold', 'Unsold')
+        )
+        place_bid(self.sold.pk, self.rival, 150)
+        place_bid(self.sold.pk, self.bidder, 200)
+        self.ends_at = timezone.now() - timedelta(minutes=1)
+        Auction.objects.update(ends_at=self.ends_at)
+
+    def test_close_task_settles_and_notifies(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            close_auction.delay(self.sold.pk, self.ends_at.isoformat())
+
+        settlement = Settlement.objects.get()
+        self.assertEqual((settlement.auction_id, settlement.seller, settlement.buyer), (self.sold.pk, self.owner, self.bidder))
+        self.assertEqual((settlement.price, settlement.commission, settlement.payout),
+                         (Decimal('200.00'), Decimal('10.00'), Decimal('190.00')))
+        self.assertEqual((settlement.invoice.number, settlement.invoice.amount), (f'INV-{self.sold.pk:010d}', Decimal('200.00')))
+        self.assertEqual(set(Notification.objects.values_list('user__username', 'kind')),
+                         {('bidder', Notification.WON), ('owner', Notification.SOLD)})
+        self.assertFalse(Notification.objects.filter(sent_at__isnull=True).exists())
+        self.assertEqual(sorted(message.subject for message in mail.outbox), ['"Sold" sold', 'You won "Sold"'])
+
+    def test_sweep_settles_in_batches_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            close_expired_auctions.delay()
+        self.assertEqual(Settlement.objects.count(), 2)
+        unsold = Settlement.objects.get(auction_id=self.unsold.pk)
+        self.assertEqual((unsold.buyer, unsold.price, unsold.payout), (None, Decimal('0.00'), Decimal('0.00')))
+        self.assertFalse(Invoice.objects.filter(settlement=unsold).exists())
+        self.assertEqual(Notification.objects.get(auction_id=self.unsold.pk).kind, Notification.UNSOLD)
+        self.assertEqual(len(mail.outbox), 3)
+
+        # Redelivered, retried and swept again: nothing is settled or sent twice.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(close_auction.delay(self.sold.pk, self.ends_at.isoformat()).get(),
+                             "Closed 0 expired auctions, awarded 0 winners.")
+            self.assertEqual(settle_auctions.delay([self.sold.pk]).get(), "Settled 0 auctions.")
+            self.assertEqual(settle_auctions.delay().get(), "Settled 0 auctions.")
+            self.assertEqual(deliver_notifications.delay().get(), "Delivered 0 notifications.")
+        self.assertEqual((Settlement.objects.count(), Invoice.objects.count(), Notification.objects.count()), (2, 1, 3))
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_batches_take_constant_queries(self):
+        Auction.objects.settle()
+        more = [Auction(owner=self.owner, title=f'Extra {n}', starting_price=1, highest_bid=1, ends_at=self.ends_at,
+                        is_closed=True) for n in range(10)]
+        Auction.objects.bulk_create(more)
+        with self.assertNumQueries(6):  # lock and read the batch, three inserts, inside a savepoint pair
+            self.assertEqual(settle_closed(batch_size=5, max_batches=1), 5)
+        self.assertEqual(settle_closed(batch_size=5), 7)
+        self.assertEqual(settle_closed(), 0)
+
+    def test_failed_delivery_stays_queued(self):
+        Auction.objects.settle()
+        settle_closed()
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError):
+            with self.assertRaises(OSError):
+                deliver_pending()
+        self.assertEqual(Notification.objects.filter(sent_at__isnull=True).count(), 3)
+        self.assertEqual(deliver_pending(), 3)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_requests_never_settle(self):
+        with mock.patch.object(settle_auctions, 'apply_async') as settle, \
+                mock.patch.object(close_auction, 'apply_async') as close, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.client.force_login(self.owner)
+            for name in ('auction-detail', 'auction-summary', 'auction-bids'):
+                self.assertEqual(self.client.get(reverse(name, args=[self.sold.pk])).status_code, status.HTTP_200_OK)
+            self.client.get(reverse('auction-list'))
+            self.client.force_login(self.rival)
+            response = self.client.post(reverse('bid-list'), {'auction': self.sold.pk, 'amount': '500'})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        settle.assert_not_called()
+        close.assert_not_called()
+        self.assertFalse(Auction.objects.filter(winner__isnull=False).exists())
+        self.assertFalse(Settlement.objects.exists())
+
+
+class BidAggregateTests(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='ownerpass')
+        self.bidders = [User.objects.create_user(username=f'bidder{i}', password='bidderpass') for i in range(3)]
+
+    def create_auctions(self, count):
+        for i in range(count):
+            auction = Auction.objects.create(
+                owner=self.owner,
+                title=f'Auction {i}',
+                starting_price=100.00,
+                ends_at=timezone.now() + timedelta(days=1),
+            )
+            for step, bidder in enumerate(self.bidders, start=1):
+                place_bid(auction.pk, bidder, 100 + step * 10)
+
+    def test_bid_updates_aggregates(self):
+        self.create_auctions(1)
+        auction = Auction.objects.get()
+        self.assertEqual(auction.bid_count, 3)
+        self.assertEqual(auction.highest_bid, 130)
+        self.assertEqual(auction.top_bidder, self.bidders[2])
+
+    def test_auction_serializer_query_count_is_constant(self):
+        self.create_auctions(2)
+        with self.assertNumQueries(2):
+            small = AuctionSerializer(Auction.objects.for_detail(), many=True).data
+        self.create_auctions(8)
+        with self.assertNumQueries(2):
+            large = AuctionSerializer(Auction.objects.for_detail(), many=True).data
+        self.assertEqual((len(small), len(large)), (2, 10))
+        self.assertEqual(large[0]['highest_bid'], '130.00')
+
+    def test_summary_serializer_query_count_is_constant(self):
+        self.create_auctions(10)
+        Auction.objects.update(ends_at=timezone.now() - timedelta(minutes=1))
+        with self.assertNumQueries(1):
+            data = AuctionSummarySerializer(Auction.objects.for_summary(), many=True).data
+        self.assertEqual(len(data), 10)
+        self.assertEqual(data[0]['total_bids'], 3)
+        self.assertEqual(data[0]['winner'], 'bidder2')
+
+
+class PaginationTests(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='ownerpass')
+        self.bidder = User.objects.create_user(username='bidder', password='bidderpass')
+        now = timezone.now()
+        self.auctions = [
+            Auction.objects.create(
+                owner=self.owner,
+                title=f'Auction {i}',
+                starting_price=100.00,
+                ends_at=now + timedelta(days=1, minutes=i),
+            )
+            for i in range(5)
+        ]
+        for amount in (110, 120, 130):
+            place_bid(self.auctions[0].pk, self.bidder, amount)
+
+    def test_auction_list_is_paginated_and_compact(self):
+        response = self.client.get(reverse('auction-list'), {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([a['id'] for a in response.data['results']], [a.id for a in self.auctions[:2]])
+        self.assertNotIn('bids', response.data['results'][0])
+        self.assertEqual(response.data['results'][0]['bid_count'], 3)
+
+        place_bid(self.auctions[1].pk, self.bidder, 150)
+        response = self.client.get(response.data['next'])
+        self.assertEqual([a['id'] for a in response.data['results']], [a.id for a in self.auctions[2:4]])
+
+    def test_auction_bids_action_is_paginated(self):
+        self.client.force_login(self.owner)
+        url = reverse('auction-bids', args=[self.auctions[0].id])
+        response = self.client.get(url, {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([b['amount'] for b in response.data['results']], ['130.00', '120.00'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([b['amount'] for b in response.data['results']], ['110.00'])
+        self.assertIsNone(response.data['next'])
+
+    def test_bid_list_is_paginated(self):
+        response = self.client.get(reverse('bid-list'), {'page_size': 2})
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+
+class PlaceBidTests(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='ownerpass')
+        self.bidder = User.objects.create_user(username='bidder', password='bidderpass')
+        self.auction = Auction.objects.create(
+            owner=self.owner,
+            title='Test Auction',
+            starting_price=100.00,
+            ends_at=timezone.now() + timedelta(days=1),
+        )
+
+    def test_bid_endpoint_uses_update_and_insert_only(self):
+        self.client.force_login(self.bidder)
+        # session + user lookup, UPDATE + INSERT + proxy lookup inside a savepoint pair; no session save
+        with self.assertNumQueries(7):
+            response = self.client.post(reverse('bid-list'), {'auction': self.auction.id, 'amount': 150})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['user'], 'bidder')
+
+    def test_rejections(self):
+        self.client.force_login(self.bidder)
+        response = self.client.post(reverse('bid-list'), {'auction': self.auction.id, 'amount': 50})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(reverse('bid-list'), {'auction': 0, 'amount': 150})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.force_login(self.owner)
+        response = self.client.post(reverse('bid-list'), {'auction': self.auction.id, 'amount': 150})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Bid.objects.exists())
+
+    def test_auction_update_keeps_bid_aggregates(self):
+        stale = Auction.objects.get(pk=self.auction.pk)
+        place_bid(self.auction.pk, self.bidder, 150)
+        stale.title = 'Renamed'
+        stale.save()
+        self.auction.refresh_from_db()
+        self.assertEqual((self.auction.title, self.auction.highest_bid, self.auction.bid_count), ('Renamed', 150, 1))
+
+    def test_auction_update_keeps_settlement(self):
+        place_bid(self.auction.pk, self.bidder, 150)
+        Auction.objects.filter(pk=self.auction.pk).update(ends_at=timezone.now() - timedelta(minutes=1))
+        stale = Auction.objects.get(pk=self.auction.pk)
+        Auction.objects.settle()
+        stale.title = 'Renamed'
+        stale.save()
+        self.auction.refresh_from_db()
+        self.assertEqual((self.auction.title, self.auction.is_closed, self.auction.winner), ('Renamed', True, self.bidder))
+
+
+class ConcurrentBidTests(TransactionTestCase):
+    def test_concurrent_bids_never_lose_updates(self):
+        owner = User.objects.create_user(username='owner', password='ownerpass')
+        bidders = [User.objects.create_user(username=f'bidder{i}', password='bidderpass') for i in range(4)]
+        auction = Auction.objects.create(
+            owner=owner,
+            title='Hot Auction',
+            starting_price=1,
+            ends_at=timezone.now() + timedelta(days=1),
+        )
+        stats = run_concurrent_bids(place_bid, auction.pk, bidders, bids_per_thread=25)
+        auction.refresh_from_db()
+        self.assertGreater(stats['accepted'], 0)
+        self.assertEqual(auction.bid_count, Bid.objects.count())
+        self.assertEqual(auction.bid_count, stats['accepted'])
+        self.assertEqual(auction.highest_bid, Bid.objects.order_by('-amount').first().amount)
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    databases = '__all__'
+    client_class = APIClient
+
+    @classmethod
+    def setUpClass(cls):
+        # Replicas are only configured on demand; a second connection to the test database stands in for one.
+        connections.settings['replica1'] = {**connections['default'].settings_dict, 'TEST': {'MIRROR': 'default'}}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica1'].close()
+        del connections['replica1']
+        del connections.settings['replica1']
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='owner', password='ownerpass')
+        self.bidder = User.objects.create_user(username='bidder', password='bidderpass')
+        self.auction = Auction.objects.create(owner=self.owner, title='Replicated', starting_price=10,
+                                              ends_at=timezone.now() + timedelta(days=1))
+
+    def tearDown(self):
+        unavailable.clear()
+
+    def get(self, user, name):
+        """Queries per alias for a GET of ``name`` as ``user``."""
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {issue_tokens(user)['access']}")
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica1']) as replica:
+            self.assertEqual(self.client.get(reverse(name)).status_code, status.HTTP_200_OK)
+        return [q['sql'] for q in primary.captured_queries], [q['sql'] for q in replica.captured_queries]
+
+    def test_reads_go_to_the_replica_and_writes_to_the_primary(self):
+        primary, replica = self.get(self.owner, 'auction-summary-list')
+        self.assertTrue(replica)
+        self.assertTrue(all('auctions_auction' in sql for sql in replica))
+        self.assertFalse(any('auctions_auction' in sql for sql in primary))
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {issue_tokens(self.bidder)['access']}")
+        with CaptureQueriesContext(connections['replica1']) as replica:
+            response = self.client.post(reverse('bid-list'), {'auction': self.auction.pk, 'amount': 20})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(replica), 0)
+
+    def test_bidder_reads_own_bids_from_the_primary(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {issue_tokens(self.bidder)['access']}")
+        self.client.post(reverse('bid-list'), {'auction': self.auction.pk, 'amount': 20})
+        _, replica = self.get(self.bidder, 'bid-my-bids')
+        self.assertEqual(replica, [])
+        # Other users are not pinned.
+        _, replica = self.get(self.owner, 'bid-my-bids')
+        self.assertTrue(replica)
+        # Nor is the bidder once the replicas have caught up.
+        cache.clear()
+        _, replica = self.get(self.bidder, 'bid-my-bids')
+        self.assertTrue(replica)
+
+    def test_writes_outside_a_request_do_not_pin(self):
+        self.assertFalse(pinned.get())
+        Auction.objects.filter(pk=self.auction.pk).update(title='Renamed')
+        self.assertFalse(pinned.get())
+        self.assertEqual(ReplicaRouter().db_for_read(Auction), 'replica1')
+
+    def test_unreachable_replica_is_skipped(self):
+        replica = connections['replica1']
+        token = pinned.set(False)
+        try:
+            with mock.patch.object(replica, 'connection', None), \
+                    mock.patch.object(replica, 'ensure_connection', side_effect=OperationalError):
+                self.assertEqual(ReplicaRouter().db_for_read(Auction), 'default')
+                self.assertIn('replica1', unavailable)
+            # Not retried until REPLICA_RETRY_SECONDS have passed.
+            self.assertEqual(ReplicaRouter().db_for_read(Auction), 'default')
+        finally:
+            pinned.reset(token)
+
+
+class AuctionStreamTests(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='ownerpass')
+        self.bidder = User.objects.create_user(username='bidder', password='bidderpass')
+        self.auction = Auction.objects.create(
+            owner=self.owner,
+            title='Test Auction',
+            starting_price=100.00,
+            ends_at=timezone.now() + timedelta(days=1),
+        )
+        self.layer = get_channel_layer()
+        self.channel = async_to_sync(self.layer.new_channel)()
+        async_to_sync(self.layer.group_add)(auction_group(self.auction.pk), self.channel)
+
+    def tearDown(self):
+        async_to_sync(self.layer.flush)()
+
+    def test_accepted_bid_is_published(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            place_bid(self.auction.pk, self.bidder, 150)
+        message = async_to_sync(self.layer.receive)(self.channel)
+        self.assertEqual(message['event']['type'], 'bid')
+        self.assertEqual(message['event']['amount'], '150.00')
+        self.assertEqual(message['event']['user'], 'bidder')
+
+    def test_bidder_names_are_fetched_once(self):
+        others = User.objects.bulk_create([User(username=f'proxy-{i}') for i in range(3)])
+        bids = [Bid(auction_id=self.auction.pk, user_id=user.pk, amount=110 + i, created_at=timezone.now())
+                for i, user in enumerate([self.bidder, *others])]
+        with self.assertNumQueries(1):
+            publish_bids(sender=Bid, bids=bids)
+        users = [async_to_sync(self.layer.receive)(self.channel)['event']['user'] for _ in bids]
+        self.assertEqual(users, ['bidder', 'proxy-0', 'proxy-1', 'proxy-2'])
+
+    def test_close_is_published(self):
+        place_bid(self.auction.pk, self.bidder, 150)
+        Auction.objects.update(ends_at=timezone.now() - timedelta(minutes=1))
+        with self.captureOnCommitCallbacks(execute=True):
+            Auction.objects.settle()
+        message = async_to_sync(self.layer.receive)(self.channel)
+        self.assertEqual(message['event'], {
+            'type': 'closed', 'auction': self.auction.pk, 'winner': 'bidder', 'highest_bid': '150.00',
+        })
+
+    def test_consumer_forwards_group_events(self):
+        async def scenario():
+            communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f'/ws/auctions/{self.auction.pk}/')
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            event = {'type': 'bid', 'auction': self.auction.pk, 'amount': '150.00'}
+            await self.layer.group_send(auction_group(self.auction.pk), {'type': 'auction.event', 'event': event})
+            self.assertEqual(await communicator.receive_json_from(), event)
+            await communicator.disconnect()
+
+        async_to_sync(scenario)()
+
+
+class CloseSchedulingTests(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='ownerpass')
+        self.bidder = User.objects.create_user(username='bidder', password='bidderpass')
+
+    def create_auction(self, ends_in):
+        return Auction.objects.create(
+            owner=self.owner,
+            title='Test Auction',
+            starting_price=100.00,
+            ends_at=timezone.now() + ends_in,
+        )
+
+    def test_auction_ending_soon_gets_close_task(self):
+        with mock.patch.object(close_auction, 'apply_async') as apply_async, \
+                self.captureOnCommitCallbacks(execute=True):
+            auction = self.create_auction(timedelta(minutes=10))
+        apply_async.assert_called_once_with((auction.pk, auction.ends_at.isoformat()), eta=auction.ends_at)
+        auction.refresh_from_db()
+        self.assertEqual(auction.close_scheduled_for, auction.ends_at)
+
+    def test_far_auction_is_scheduled_by_sweep_once(self):
+        with mock.patch.object(close_auction, 'apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.create_auction(timedelta(days=2))
+            apply_async.assert_not_called()
+
+            Auction.objects.update(ends_at=timezone.now() + timedelta(minutes=5))
+            self.assertEqual(schedule_upcoming_closes(), "Scheduled 1 auction closes.")
+            self.assertEqual(schedule_upcoming_closes(), "Scheduled 0 auction closes.")
+        self.assertEqual(apply_async.call_count, 1)
+
+    def test_broker_outage_leaves_auction_to_the_sweep(self):
+        self.client.force_login(self.owner)
+        data = {'title': 'Test Auction', 'starting_price': '100.00',
+                'ends_at': (timezone.now() + timedelta(minutes=10)).isoformat()}
+        with self.assertLogs('auctions.tasks', 'ERROR'), \
+                mock.patch.object(close_auction, 'apply_async', side_effect=BrokerError('broker down')), \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('auction-list'), data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIsNone(Auction.objects.get().close_scheduled_for)
+
+        with mock.patch.object(close_auction, 'apply_async') as apply_async:
+            self.assertEqual(schedule_upcoming_closes(), "Scheduled 1 auction closes.")
+        apply_async.assert_called_once()
+
+    def test_stale_close_task_is_ignored(self):
+        auction = self.create_auction(timedelta(minutes=10))
+        stale_ends_at = timezone.now() - timedelta(minutes=1)
+        result = close_auction.apply(args=(auction.pk, stale_ends_at.isoformat())).get()
+        self.assertEqual(result, "Closed 0 expired auctions, awarded 0 winners.")
+        auction.refresh_from_db()
+        self.assertFalse(auction.is_closed)
+
+    def test_close_task_records_winner(self):
+        auction = self.create_auction(timedelta(minutes=10))
+        place_bid(auction.pk, self.bidder, 150)
+        ends_at = timezone.now() - timedelta(seconds=1)
+        Auction.objects.update(ends_at=ends_at)
+        result = close_auction.apply(args=(auction.pk, ends_at.isoformat())).get()
+        self.assertEqual(result, "Closed 1 expired auctions, awarded 1 winners.")
+        auction.refresh_from_db()
+        self.assertEqual((auction.is_closed, auction.winner), (True, self.bidder))
+
+    def test_sweep_works_in_chunks(self):
+        for _ in range(5):
+            self.create_auction(timedelta(minutes=10))
+        Auction.objects.update(ends_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(close_expired_auctions(chunk_size=2, max_chunks=2), "Closed 4 expired auctions, awarded 0 winners.")
+        self.assertEqual(close_expired_auctions(chunk_size=2), "Closed 1 expired auctions, awarded 0 winners.")
+
+
+@skipUnless(connection.vendor in ('sqlite', 'postgresql'), "EXPLAIN output is only checked on SQLite and PostgreSQL.")
+class IndexUsageTests(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='ownerpass')
+        self.bidder = User.objects.create_user(username='bidder', password='bidderpass')
+        self.auction = Auction.objects.create(
+            owner=self.owner,
+            title='Test Auction',
+            starting_price=100.00,
+            ends_at=timezone.now() + timedelta(days=1),
+        )
+        place_bid(self.auction.pk, self.bidder, 150)
+        if connection.vendor == 'postgresql':
+            # A handful of rows is always cheaper to scan; ask the planner what it would do at scale.
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+
+    def test_auction_indexes(self):
+        now = timezone.now()
+        self.assertUsesIndex(Auction.objects.order_by('ends_at', 'id'), 'auction_ends_at_id_idx')
+        self.assertUsesIndex(Auction.objects.filter(owner=self.owner).order_by('ends_at', 'id'), 'auction_owner_ends_at_idx')
+        self.assertUsesIndex(Auction.objects.expired(now).filter(is_closed=False).values('pk'), 'auction_open_ends_at_idx')
+        self.assertUsesIndex(
+            Auction.objects.expired(now).filter(is_closed=True, winner__isnull=True, bid_count__gt=0).values('pk'),
+            'auction_unawarded_idx',
+        )
+        self.assertUsesIndex(Auction.objects.with_status('open', now).values('pk'), 'auction_open_ends_at_idx')
+        self.assertUsesIndex(Auction.objects.filter(highest_bid__gte=100).values('pk'), 'auction_highest_bid_idx')
+
+    def test_bid_indexes(self):
+        self.assertUsesIndex(
+            Bid.objects.filter(auction=self.auction).order_by('-amount', 'created_at', 'pk')[:1],
+            'bid_auction_amount_idx',
+        )
+        self.assertUsesIndex(self.auction.bids.order_by('-created_at', '-id'), 'bid_auction_created_at_idx')
+        self.assertUsesIndex(Bid.objects.filter(user=self.bidder).order_by('-created_at', '-id'), 'bid_user_created_at_idx')
+
+
+class AuctionCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='owner', password='ownerpass')
+        self.bidder = User.objects.create_user(username='bidder', password='bidderpass')
+        self.auction = Auction.objects.create(
+            owner=self.owner,
+            title='Test Auction',
+            starting_price=100.00,
+            ends_at=timezone.now() + timedelta(days=1),
+        )
+        self.client.force_login(self.owner)
+        self.url = reverse('auction-detail', args=[self.auction.id])
+
+    def test_detail_is_served_from_cache(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(2):  # session + user lookup; no session save, no auction queries
+            second = self.client.get(self.url)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(auction_cache.stats(), {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+    def test_unchanged_auction_returns_304(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_bid_and_update_bump_version(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            place_bid(self.auction.pk, self.bidder, 150)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['highest_bid'], '150.00')
+
+        summary_url = reverse('auction-summary', args=[self.auction.id])
+        self.assertEqual(self.client.get(summary_url).data['total_bids'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.auction.title = 'Renamed'
+            self.auction.save()
+        self.assertEqual(self.client.get(summary_url).data['title'], 'Renamed')
+
+    def test_cached_detail_still_checks_permissions(self):
+        self.client.get(self.url)
+        self.client.force_login(self.bidder)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class AuctionFilterTests(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='ownerpass')
+        self.other = User.objects.create_user(username='other', password='otherpass')
+        self.bidder = User.objects.create_user(username='bidder', password='bidderpass')
+        now = timezone.now()
+        self.soon = Auction.objects.create(owner=self.owner, title='Vintage camera', starting_price=50,
+                                           ends_at=now + timedelta(minutes=20))
+        self.later = Auction.objects.create(owner=self.other, title='Mountain bike', starting_price=300,
+                                            ends_at=now + timedelta(days=3))
+        self.ended = Auction.objects.create(owner=self.owner, title='Old camera lens', starting_price=80,
+                                            ends_at=now + timedelta(days=1))
+        place_bid(self.later.pk, self.bidder, 400)
+        Auction.objects.filter(pk=self.ended.pk).update(ends_at=now - timedelta(hours=1))
+
+    def ids(self, **params):
+        response = self.client.get(reverse('auction-list'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return {auction['id'] for auction in response.data['results']}
+
+    def test_status(self):
+        self.assertEqual(self.ids(status='open'), {self.soon.id, self.later.id})
+        self.assertEqual(self.ids(status='closed'), {self.ended.id})
+        response = self.client.get(reverse('auction-list'), {'status': 'bogus'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_status_is_annotated_once(self):
+        results = self.client.get(reverse('auction-list')).data['results']
+        self.assertEqual({a['id']: a['status'] for a in results},
+                         {self.soon.id: 'open', self.later.id: 'open', self.ended.id: 'closed'})
+        self.assertEqual(Auction.objects.annotate_status().get(pk=self.ended.pk).status, 'closed')
+
+    def test_owner_price_window_and_search(self):
+        self.assertEqual(self.ids(owner=self.other.id), {self.later.id})
+        self.assertEqual(self.ids(min_price=100), {self.later.id})
+        self.assertEqual(self.ids(max_price=100), {self.soon.id, self.ended.id})
+        self.assertEqual(self.ids(ending_within=60), {self.soon.id})
+        self.assertEqual(self.ids(search='camera'), {self.soon.id, self.ended.id})
+        self.assertEqual(self.ids(search='camera', status='open'), {self.soon.id})
+
+    def test_invalid_numbers(self):
+        for params in ({'min_price': 'abc'}, {'max_price': 'NaN'}, {'ending_within': '-5'}, {'owner': 'x'}):
+            response = self.client.get(reverse('auction-list'), params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+
+class TokenAuthTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='bidder', password='bidderpass')
+        response = self.client.post(reverse('login'), {'username': 'bidder', 'password': 'bidderpass'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.tokens = response.data
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.tokens['access']}")
+
+    def test_login_issues_tokens_without_a_session(self):
+        self.assertIn('refresh', self.tokens)
+        self.assertNotIn('sessionid', self.client.cookies)
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
+
+    def test_authenticated_read_is_one_query_and_no_password_hash(self):
+        self.client.get(reverse('my-profile'))  # warms the revocation cache
+        with mock.patch('django.contrib.auth.hashers.check_password') as check_password, \
+                self.assertNumQueries(1):  # user lookup only
+            response = self.client.get(reverse('my-profile'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['username'], 'bidder')
+        check_password.assert_not_called()
+
+    def test_refresh_issues_a_working_access_token(self):
+        response = self.client.post(reverse('token-refresh'), {'refresh': self.tokens['refresh']})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.assertEqual(self.client.get(reverse('my-profile')).status_code, status.HTTP_200_OK)
+
+    def test_logout_revokes_access_and_refresh_tokens(self):
+        response = self.client.post(reverse('logout'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # 403 rather than 401: session authentication comes first and sends no WWW-Authenticate.
+        self.assertEqual(self.client.get(reverse('my-profile')).status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.post(reverse('token-refresh'), {'refresh': self.tokens['refresh']})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # Another process without the cached flag falls back to the blacklist table.
+        cache.clear()
+        self.assertEqual(self.client.get(reverse('my-profile')).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class BulkBidTests(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='ownerpass')
+        self.bidder = User.objects.create_user(username='bidder', password='bidderpass')
+        self.auctions = [
+            Auction.objects.create(owner=self.owner, title=f'Auction {i}', starting_price=100,
+                                   ends_at=timezone.now() + timedelta(days=1))
+            for i in range(3)
+        ]
+        self.url = reverse('bid-bulk')
+        self.client.force_login(self.bidder)
+
+    def post(self, bids):
+        return self.client.post(self.url, {'bids': bids}, format='json')
+
+    def test_per_item_results_in_submission_order(self):
+        first, second, _ = self.auctions
+        response = self.post([
+            {'auction': first.pk, 'amount': '110'},
+            {'auction': first.pk, 'amount': '105'},  # below the bid just before it
+            {'auction': second.pk, 'amount': '120'},
+            {'auction': 0, 'amount': '120'},
+            {'auction': second.pk, 'amount': '-1'},
+            {'auction': first.pk, 'amount': '130'},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['accepted'], response.data['rejected']), (3, 3))
+        self.assertEqual([result['status'] for result in response.data['results']],
+                         ['accepted', 'rejected', 'accepted', 'rejected', 'rejected', 'accepted'])
+        self.assertIn('110', response.data['results'][1]['errors']['non_field_errors'][0])
+        self.assertEqual(response.data['results'][3]['errors'], {'auction': ["Auction not found."]})
+        self.assertIn('amount', response.data['results'][4]['errors'])
+        self.assertEqual([result.get('amount') for result in response.data['results']],
+                         ['110.00', '105.00', '120.00', '120.00', None, '130.00'])
+
+        first.refresh_from_db()
+        self.assertEqual((first.highest_bid, first.bid_count, first.top_bidder), (Decimal('130.00'), 2, self.bidder))
+        self.assertEqual(Bid.objects.count(), 3)
+
+    def test_rules_match_single_bids(self):
+        own = Auction.objects.create(owner=self.bidder, title='Own', starting_price=100,
+                                     ends_at=timezone.now() + timedelta(days=1))
+        ended = self.auctions[2]
+        Auction.objects.filter(pk=ended.pk).update(is_closed=True)
+        results = self.post([{'auction': own.pk, 'amount': '200'}, {'auction': ended.pk, 'amount': '200'}]).data['results']
+        self.assertEqual(results[0]['errors'], {'non_field_errors': ["You cannot bid on your own auction."]})
+        self.assertEqual(results[1]['errors'], {'non_field_errors': ["Bidding is no longer allowed. The auction has ended."]})
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        def batch(per_auction):
+            return [{'auction': auction.pk, 'amount': str(200 + step)}
+                    for step in range(per_auction) for auction in self.auctions]
+
+        # session + user, then SELECT ... FOR UPDATE, proxies, one UPDATE and one INSERT inside a savepoint pair
+        with self.assertNumQueries(8):
+            self.assertEqual(self.post(batch(2)).data['accepted'], 6)
+        Bid.objects.all().delete()
+        Auction.objects.update(highest_bid=100)
+        with self.assertNumQueries(8):
+            self.assertEqual(self.post(batch(50)).data['accepted'], 150)
+
+    def test_concurrent_change_fails_the_batch(self):
+        auction = self.auctions[0]
+
+        def outbid(*args, **kwargs):
+            Auction.objects.filter(pk=auction.pk).update(highest_bid=500)
+            return apply_batch(*args, **kwargs)
+
+        with mock.patch('auctions.bidding.apply_batch', side_effect=outbid):
+            response = self.post([{'auction': auction.pk, 'amount': '200'}])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(Bid.objects.exists())
+
+    def test_batch_shape_is_validated(self):
+        self.assertEqual(self.post([]).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.post([{}] * 501).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ProxyBidTests(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='ownerpass')
+        self.alice = User.objects.create_user(username='alice', password='alicepass')
+        self.bob = User.objects.create_user(username='bob', password='bobpass')
+        self.auction = Auction.objects.create(owner=self.owner, title='Test Auction', starting_price=100,
+                                              ends_at=timezone.now() + timedelta(days=1))
+
+    def visible_bids(self):
+        return list(self.auction.bids.order_by('pk').values_list('user__username', 'amount'))
+
+    def test_resolution_is_a_single_pass(self):
+        def proxy(user_id, max_amount):
+            return ProxyBid(user_id=user_id, max_amount=Decimal(max_amount))
+
+        self.assertEqual(resolve_proxies(Decimal(100), None, []), [])
+        self.assertEqual(resolve_proxies(Decimal(100), None, [proxy(1, 150)]), [(1, Decimal(101))])
+        # Already leading and unchallenged: nothing to do.
+        self.assertEqual(resolve_proxies(Decimal(101), 1, [proxy(1, 150)]), [])
+        # Runner-up shows its maximum, leader tops it by one increment.
+        self.assertEqual(resolve_proxies(Decimal(100), None, [proxy(1, 150), proxy(2, 120)]),
+                         [(2, Decimal(120)), (1, Decimal(121))])
+        # Never above the leader's own maximum; on a tie the earlier proxy wins at its maximum.
+        self.assertEqual(resolve_proxies(Decimal(100), None, [proxy(1, 150), proxy(2, 149.5)]),
+                         [(2, Decimal(149.5)), (1, Decimal(150))])
+        self.assertEqual(resolve_proxies(Decimal(100), None, [proxy(1, 150), proxy(2, 150)]), [(1, Decimal(150))])
+        # Exhausted proxies take no part.
+        self.assertEqual(resolve_proxies(Decimal(200), 3, [proxy(1, 150), proxy(2, 120)]), [])
+
+    def test_proxy_bids_one_increment_over_the_current_price(self):
+        self.client.force_login(self.alice)
+        response = self.client.post(reverse('proxy-bid-list'), {'auction': self.auction.pk, 'max_amount': '500'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(response.data['leading'])
+        self.assertEqual(self.visible_bids(), [('alice', Decimal('101.00'))])
+
+    def test_competing_proxies_leave_two_visible_bids(self):
+        set_proxy_bid(self.auction.pk, self.alice, 300)
+        proxy, bids, leader_id = set_proxy_bid(self.auction.pk, self.bob, 250)
+        self.assertEqual(leader_id, self.alice.pk)
+        self.assertEqual([(bid.user_id, bid.amount) for bid in bids],
+                         [(self.bob.pk, Decimal('250.00')), (self.alice.pk, Decimal('251.00'))])
+        self.auction.refresh_from_db()
+        self.assertEqual((self.auction.highest_bid, self.auction.top_bidder, self.auction.bid_count),
+                         (Decimal('251.00'), self.alice, 3))
+
+    def test_manual_bids_are_answered_by_proxies(self):
+        set_proxy_bid(self.auction.pk, self.alice, 300)
+        bid = place_bid(self.auction.pk, self.bob, 200)
+        self.assertEqual(bid.amount, Decimal('200.00'))
+        self.assertEqual(self.visible_bids()[-2:], [('bob', Decimal('200.00')), ('alice', Decimal('201.00'))])
+
+        place_bid(self.auction.pk, self.bob, 400)
+        self.auction.refresh_from_db()
+        self.assertEqual((self.auction.highest_bid, self.auction.top_bidder), (Decimal('400.00'), self.bob))
+
+    def test_bulk_bids_are_answered_in_order(self):
+        set_proxy_bid(self.auction.pk, self.alice, 300)
+        self.client.force_login(self.bob)
+        response = self.client.post(reverse('bid-bulk'), {'bids': [
+            {'auction': self.auction.pk, 'amount': '150'},
+            {'auction': self.auction.pk, 'amount': '160'},  # proxy already at 151
+        ]}, format='json')
+        self.assertEqual([result['status'] for result in response.data['results']], ['accepted', 'accepted'])
+        self.assertEqual(self.visible_bids()[-2:], [('bob', Decimal('160.00')), ('alice', Decimal('161.00'))])
+        self.auction.refresh_from_db()
+        self.assertEqual((self.auction.highest_bid, self.auction.bid_count), (Decimal('161.00'), 5))
+
+    def test_hundreds_of_proxies_resolve_in_constant_queries(self):
+        bidders = User.objects.bulk_create([User(username=f'proxy-{i}') for i in range(300)])
+        ProxyBid.objects.bulk_create([
+            ProxyBid(auction=self.auction, user=bidder, max_amount=Decimal(200 + i)) for i, bidder in enumerate(bidders)
+        ])
+        # lock + read, proxy SELECT + INSERT, strongest proxies, UPDATE, INSERT, in a savepoint pair
+        with self.assertNumQueries(8):
+            set_proxy_bid(self.auction.pk, self.alice, 1000)
+        self.assertEqual(self.visible_bids(), [('proxy-299', Decimal('499.00')), ('alice', Decimal('500.00'))])
+
+    def test_proxies_follow_bidding_rules(self):
+        with self.assertRaises(DRFValidationError):
+            set_proxy_bid(self.auction.pk, self.owner, 500)
+        with self.assertRaises(DRFValidationError):
+            set_proxy_bid(self.auction.pk, self.alice, 100)
+        self.client.force_login(self.alice)
+        response = self.client.post(reverse('proxy-bid-list'), {'auction': 0, 'max_amount': '500'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_maximum_is_private_and_can_be_withdrawn(self):
+        proxy, _, _ = set_proxy_bid(self.auction.pk, self.alice, 300)
+        self.client.force_login(self.bob)
+        self.assertEqual(self.client.get(reverse('proxy-bid-list')).data, [])
+        self.assertEqual(self.client.delete(reverse('proxy-bid-detail', args=[proxy.pk])).status_code,
+                         status.HTTP_404_NOT_FOUND)
+        self.client.force_login(self.alice)
+        self.assertEqual(self.client.get(reverse('proxy-bid-list')).data[0]['max_amount'], '300.00')
+        self.assertEqual(self.client.delete(reverse('proxy-bid-detail', args=[proxy.pk])).status_code,
+                         status.HTTP_204_NO_CONTENT)
+        place_bid(self.auction.pk, self.bob, 200)
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.top_bidder, self.bob)
+
+
+class AuctionStatsTests(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='ownerpass')
+        self.alice = User.objects.create_user(username='alice', password='alicepass')
+        self.bob = User.objects.create_user(username='bob', password='bobpass')
+        now = timezone.now()
+        self.quiet, self.busy, self.ended = Auction.objects.bulk_create([
+            Auction(owner=self.owner, title=title, starting_price=100, highest_bid=100, ends_at=now + timedelta(days=1))
+            for title in ('Quiet', 'Busy', 'Ended')
+        ])
+        for user, amount in ((self.alice, 110), (self.bob, 120), (self.alice, 130)):
+            place_bid(self.busy.pk, user, amount)
+        place_bid(self.ended.pk, self.bob, 150)
+        Auction.objects.filter(pk=self.ended.pk).update(ends_at=now - timedelta(minutes=1))
+
+    def rows(self, name, **params):
+        response = self.client.get(reverse(name), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(row['title'], row['total_bids'], row['highest_bid'], row['winner'])
+                for row in response.data['results']]
+
+    def test_summary_list_and_leaderboard(self):
+        expected = {('Quiet', 0, '100.00', None), ('Busy', 3, '130.00', None), ('Ended', 1, '150.00', 'bob')}
+        for snapshot in (False, True):
+            with self.subTest(snapshot=snapshot), self.settings(AUCTION_STATS_SNAPSHOT=snapshot):
+                self.assertEqual(set(self.rows('auction-summary-list')), expected)
+                self.assertEqual([row[0] for row in self.rows('auction-leaderboard')], ['Busy', 'Ended', 'Quiet'])
+                self.assertEqual(self.rows('auction-leaderboard', status='open', page_size=1),
+                                 [('Busy', 3, '130.00', None)])
+
+    def test_one_query_per_page(self):
+        for snapshot in (False, True):
+            with self.subTest(snapshot=snapshot), self.settings(AUCTION_STATS_SNAPSHOT=snapshot), \
+                    self.assertNumQueries(1):
+                self.client.get(reverse('auction-leaderboard'))
+
+    def test_leaderboard_pages_through_ties(self):
+        for snapshot in (False, True):
+            with self.subTest(snapshot=snapshot), self.settings(AUCTION_STATS_SNAPSHOT=snapshot):
+                seen, url = [], reverse('auction-leaderboard') + '?page_size=1'
+                while url:
+                    response = self.client.get(url)
+                    seen += [row['title'] for row in response.data['results']]
+                    url = response.data['next']
+                self.assertEqual(seen, ['Busy', 'Ended', 'Quiet'])
+
+
+class BidFeedTests(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='ownerpass')
+        self.alice = User.objects.create_user(username='alice', password='alicepass')
+        self.bob = User.objects.create_user(username='bob', password='bobpass')
+        self.first, self.second = (
+            Auction.objects.create(owner=self.owner, title=title, starting_price=100,
+                                   ends_at=timezone.now() + timedelta(days=1))
+            for title in ('First', 'Second')
+        )
+        place_bid(self.first.pk, self.alice, 110)
+        place_bid(self.second.pk, self.alice, 120)
+        self.client.force_authenticate(self.alice)
+
+    def feed(self, **params):
+        response = self.client.get(reverse('bid-feed'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_feed_flags_the_auctions_being_led(self):
+        place_bid(self.second.pk, self.bob, 130)
+        with self.assertNumQueries(1):
+            data = self.feed()
+        self.assertEqual([(row['auction_title'], row['amount'], row['winning']) for row in data['results']],
+                         [('First', '110.00', True), ('Second', '120.00', False)])
+        self.assertIsNone(data['next'])
+        self.assertNotIn('auctions', data)
+
+    def test_since_returns_only_new_activity(self):
+        cursor = self.feed()['cursor']
+        data = self.feed(since=cursor)
+        self.assertEqual((data['results'], data['auctions'], data['cursor']), ([], [], cursor))
+
+        place_bid(self.first.pk, self.bob, 150)  # alice is outbid without bidding herself
+        place_bid(self.second.pk, self.alice, 125)
+        with self.assertNumQueries(2):
+            data = self.feed(since=cursor)
+        self.assertEqual([(row['amount'], row['winning']) for row in data['results']], [('125.00', True)])
+        self.assertEqual(sorted((row['title'], row['winning']) for row in data['auctions']),
+                         [('First', False), ('Second', True)])
+        self.assertEqual(self.feed(since=data['cursor'])['results'], [])
+
+    def test_pages_forward_and_rejects_bad_cursors(self):
+        seen, params = [], {'page_size': 1}
+        while True:
+            data = self.feed(**params)
+            seen += [row['amount'] for row in data['results']]
+            if not data['next']:
+                break
+            params['since'] = data['cursor']
+        self.assertEqual(seen, ['110.00', '120.00'])
+        self.assertEqual(self.client.get(reverse('bid-feed'), {'since': 'nonsense'}).status_code,
+                         status.HTTP_404_NOT_FOUND)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(reverse('bid-feed')).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class MetricsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='bidder', password='bidderpass')
+        self.auction = Auction.objects.create(owner=self.user, title='Test Auction', starting_price=100,
+                                              ends_at=timezone.now() + timedelta(days=1))
+
+    def sample(self, line_start):
+        body = self.client.get('/metrics').content.decode()
+        values = [float(line.rsplit(' ', 1)[1]) for line in body.splitlines() if line.startswith(line_start)]
+        return values[0] if values else 0
+
+    def test_request_sql_and_serializer_metrics(self):
+        count = 'http_request_duration_seconds_count{route="auction-list",method="GET",status="200"}'
+        before = self.sample(count)
+        serialized = self.sample('serializer_seconds_count{serializer="BidFeedSerializer"}')
+        queries = self.sample('http_request_db_queries_sum{route="bid-feed"}')
+        self.client.get(reverse('auction-list'))
+        self.client.force_login(self.user)
+        self.client.get(reverse('bid-feed'))
+        self.assertEqual(self.sample(count), before + 1)
+        self.assertEqual(self.sample('serializer_seconds_count{serializer="BidFeedSerializer"}'), serialized + 1)
+        # session, user, feed page
+        self.assertEqual(self.sample('http_request_db_queries_sum{route="bid-feed"}'), queries + 3)
+
+    def test_cache_and_task_metrics(self):
+        self.client.force_login(self.user)
+        for _ in range(2):
+            self.client.get(reverse('auction-detail', args=[self.auction.pk]))
+        self.assertEqual(self.sample('auction_cache_requests_total{result="hits"}'), 1)
+        self.assertEqual(self.sample('auction_cache_requests_total{result="misses"}'), 1)
+
+        close_expired_auctions.apply()
+        self.assertEqual(self.sample('celery_task_duration_seconds_count{task="auctions.tasks.close_expired_auctions"}'), 1)
+
+    def test_token_and_slow_request_profiles(self):
+        with self.settings(METRICS_TOKEN='secret'):
+            self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_403_FORBIDDEN)
+            response = self.client.get('/metrics', headers={'Authorization': 'Bearer secret'})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with tempfile.TemporaryDirectory() as directory, \
+                self.settings(SLOW_REQUEST_PROFILE_MS=0, SLOW_REQUEST_PROFILE_DIR=directory):
+            self.client.get(reverse('auction-list'))
+            dumps = os.listdir(directory)
+            self.assertEqual(len(dumps), 1)
+            self.assertIn('GET-auction-list', dumps[0])
+            pstats.Stats(os.path.join(directory, dumps[0]))
+
+            # A request arriving while another is profiled is served without a profiler.
+            with profiling:
+                self.assertEqual(self.client.get(reverse('auction-list')).status_code, status.HTTP_200_OK)
+            self.assertEqual(len(os.listdir(directory)), 1)
+
+
+class AsyncReadTests(APITestCase):
+    """The read routes are async views; they must answer exactly like the viewsets they front."""
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='owner', password='ownerpass')
+        self.bidder = User.objects.create_user(username='bidder', password='bidderpass')
+        self.auction = Auction.objects.create(owner=self.owner, title='Test Auction', starting_price=100,
+                                              ends_at=timezone.now() + timedelta(days=1))
+        self.bid = place_bid(self.auction.pk, self.bidder, 150)
+
+    def test_reads_are_async_and_writes_are_not(self):
+        list_view = resolve(reverse('auction-list')).func
+        self.assertTrue(asyncio.iscoroutinefunction(list_view))
+        self.client.force_login(self.owner)
+        response = self.client.post(reverse('auction-list'), {
+            'title': 'Another', 'starting_price': '10', 'ends_at': (timezone.now() + timedelta(days=1)).isoformat(),
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_payloads_match_the_viewsets(self):
+        self.client.force_login(self.owner)
+        factory = APIRequestFactory()
+        for name, args in (('auction-list', []), ('auction-detail', [self.auction.pk]),
+                           ('auction-summary', [self.auction.pk]), ('auction-bids', [self.auction.pk]),
+                           ('bid-list', [])):
+            url = reverse(name, args=args)
+            request = factory.get(url)
+            force_authenticate(request, self.owner)
+            expected = router_views[name](request, **({'pk': str(args[0])} if args else {}))
+            expected.render()
+            self.assertEqual(self.client.get(url).json(), json.loads(expected.content), name)
+
+    async def test_async_client(self):
+        client = AsyncClient()
+        response = await client.get(reverse('auction-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['results'][0]['id'], self.auction.pk)
+
+        # Detail stays owner-only and cached; the ETag still short-circuits to a 304.
+        self.assertEqual((await client.get(reverse('auction-detail', args=[self.auction.pk]))).status_code,
+                         status.HTTP_403_FORBIDDEN)
+        await client.aforce_login(self.owner)
+        response = await client.get(reverse('auction-detail', args=[self.auction.pk]))
+        self.assertEqual(response.json()['highest_bid'], '150.00')
+        response = await client.get(reverse('auction-detail', args=[self.auction.pk]),
+                                    headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual((await client.get(reverse('auction-detail', args=[0]))).status_code,
+                         status.HTTP_404_NOT_FOUND)
+        self.assertEqual((await client.get(reverse('auction-list'), {'min_price': 'x'})).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+    async def test_bearer_tokens_and_revocation(self):
+        tokens = await sync_to_async(issue_tokens)(self.bidder)
+        client, auth = AsyncClient(), {'Authorization': f"Bearer {tokens['access']}"}
+        response = await client.get(reverse('bid-detail', args=[self.bid.pk]), headers=auth)
+        self.assertEqual(response.json()['id'], self.bid.pk)
+        response = await client.get(reverse('bid-list'), {'mine': 'true'}, headers=auth)
+        self.assertEqual([bid['id'] for bid in response.json()['results']], [self.bid.pk])
+
+        self.assertEqual((await client.post(reverse('logout'), headers=auth)).status_code, status.HTTP_200_OK)
+        self.assertEqual((await client.get(reverse('bid-list'), headers=auth)).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ArchiveTests(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='ownerpass')
+        self.bidder = User.objects.create_user(username='bidder', password='bidderpass')
+        self.old, self.recent = (self.settled(title, days) for title, days in (('Old', 40), ('Recent', 5)))
+        self.login(self.owner)
+
+    def login(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {issue_tokens(user)['access']}")
+
+    def settled(self, title, days_ago):
+        auction = Auction.objects.create(owner=self.owner, title=title, starting_price=100,
+                                         ends_at=timezone.now() + timedelta(days=1))
+        place_bid(auction.pk, self.bidder, 110)
+        place_bid(auction.pk, self.bidder, 120)
+        Auction.objects.filter(pk=auction.pk).update(ends_at=timezone.now() - timedelta(days=days_ago))
+        Auction.objects.filter(pk=auction.pk).settle()
+        settle_closed([auction.pk])
+        return auction
+
+    def payloads(self, auction_id):
+        responses = [self.client.get(reverse(name, args=[auction_id]))
+                     for name in ('auction-detail', 'auction-summary', 'auction-bids')]
+        self.assertEqual({response.status_code for response in responses}, {status.HTTP_200_OK})
+        return [response.data for response in responses]
+
+    def test_moves_only_settled_auctions_past_the_cutoff(self):
+        unawarded = self.settled('Unawarded', 60)
+        Auction.objects.filter(pk=unawarded.pk).update(winner=None)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(archive_closed(older_than_days=30), (1, 2))
+
+        self.assertEqual(set(Auction.objects.values_list('title', flat=True)), {'Recent', 'Unawarded'})
+        archived = ArchivedAuction.objects.get()
+        self.assertEqual((archived.pk, archived.title, archived.highest_bid, archived.bid_count, archived.winner),
+                         (self.old.pk, 'Old', Decimal('120.00'), 2, self.bidder))
+        self.assertEqual(set(ArchivedBid.objects.values_list('auction', flat=True)), {self.old.pk})
+        self.assertFalse(Bid.objects.filter(auction=self.old.pk).exists())
+        self.assertEqual(archive_closed(older_than_days=30), (0, 0))
+
+    def test_keeps_unsettled_auctions(self):
+        unsettled = self.settled('Unsettled', 60)
+        Settlement.objects.filter(auction_id=unsettled.pk).delete()
+        archive_closed(older_than_days=30)
+        self.assertTrue(Auction.objects.filter(pk=unsettled.pk).exists())
+        self.assertTrue(Settlement.objects.filter(auction_id=self.old.pk).exists())
+
+    def test_resumes_batch_by_batch(self):
+        extra = [self.settled(f'Old {n}', 40 + n) for n in range(3)]
+        self.assertEqual(archive_closed(older_than_days=30, batch_size=1, max_batches=2), (2, 4))
+        # Oldest first: the two longest-closed auctions went in the first run.
+        self.assertEqual(set(ArchivedAuction.objects.values_list('pk', flat=True)), {extra[1].pk, extra[2].pk})
+        self.assertEqual(archive_closed(older_than_days=30, batch_size=1), (2, 4))
+        self.assertEqual(Auction.objects.get().pk, self.recent.pk)
+
+    def test_archived_auctions_read_as_before(self):
+        before = self.payloads(self.old.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            archive_closed(older_than_days=30)
+        self.assertEqual(self.payloads(self.old.pk), before)
+        # The browsable API goes through AuctionViewSet.get_object rather than the async views.
+        response = self.client.get(reverse('auction-detail', args=[self.old.pk]), {'format': 'api'})
+        self.assertEqual(response.data, before[0])
+        self.assertEqual(async_to_sync(AsyncClient().get)(
+            reverse('auction-summary', args=[self.old.pk]), headers={'Accept': 'application/json'},
+        ).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.login(self.bidder)
+        self.assertEqual(self.client.get(reverse('auction-detail', args=[self.old.pk])).status_code,
+                         status.HTTP_403_FORBIDDEN)
+        self.login(self.owner)
+        response = self.client.patch(reverse('auction-detail', args=[self.old.pk]), {'title': 'New'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ExportTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='adminpass')
+        self.owner = User.objects.create_user(username='owner', password='ownerpass')
+        self.bidder = User.objects.create_user(username='bidder', password='bidderpass')
+        self.live, self.ended = (
+            Auction.objects.create(owner=self.owner, title=title, starting_price=100,
+                                   ends_at=timezone.now() + timedelta(days=1))
+            for title in ('Live', 'Ended, "quoted"')
+        )
+        place_bid(self.live.pk, self.bidder, 110)
+        place_bid(self.ended.pk, self.bidder, 120)
+        Auction.objects.filter(pk=self.ended.pk).update(ends_at=timezone.now() - timedelta(days=2))
+        self.client.force_authenticate(self.admin)
+
+    def export(self, dataset, **params):
+        response = self.client.get(reverse('export', args=[dataset]), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_ndjson_filtered_by_status(self):
+        with self.assertNumQueries(1):
+            response, body = self.export('auctions', format='ndjson', status='closed')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([(row['id'], row['highest_bid'], row['bid_count'], row['status']) for row in rows],
+                         [(self.ended.pk, '120.00', 1, 'closed')])
+
+        _, body = self.export('bids', format='ndjson', status='open')
+        self.assertEqual([json.loads(line)['auction_id'] for line in body.splitlines()], [self.live.pk])
+
+    def test_csv_filtered_by_date(self):
+        response, body = self.export('auctions', format='csv', until=timezone.now().date().isoformat())
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="auctions.csv"')
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual([(row['title'], row['status']) for row in rows], [('Ended, "quoted"', 'closed')])
+
+        _, body = self.export('bids', format='csv', since=(timezone.now() + timedelta(minutes=1)).isoformat())
+        self.assertEqual(body.splitlines(), ['id,auction_id,user_id,amount,created_at'])
+
+    def test_csv_neutralizes_formulas(self):
+        Auction.objects.filter(pk=self.live.pk).update(title='=HYPERLINK("http://evil.example","x")')
+        Auction.objects.filter(pk=self.ended.pk).update(title='-2+3')
+        _, body = self.export('auctions', format='csv')
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual([row['title'] for row in rows], ["'-2+3", '\'=HYPERLINK("http://evil.example","x")'])
+
+        _, body = self.export('auctions', format='ndjson')
+        self.assertEqual(json.loads(body.splitlines()[0])['title'], '-2+3')
+
+    def test_rejects_bad_filters_and_non_admins(self):
+        for params in ({'status': 'pending'}, {'since': 'yesterday'}):
+            response = self.client.get(reverse('export', args=['auctions']), {'format': 'ndjson', **params})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(reverse('export', args=['users'])).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.client.force_authenticate(self.owner)
+        self.assertEqual(self.client.get(reverse('export', args=['bids'])).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_streams_an_async_iterator_under_asgi(self):
+        authorization = f"Bearer {issue_tokens(self.admin)['access']}"
+
+        async def export():
+            response = await AsyncClient().get(reverse('export', args=['bids']), {'format': 'csv'},
+                                               headers={'Authorization': authorization})
+            self.assertTrue(response.is_async)
+            return b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+        self.assertEqual(async_to_sync(export)(), self.export('bids', format='csv')[1])
+
+    def test_command_matches_the_endpoint(self):
+        out = io.StringIO()
+        call_command('export', 'bids', '--format=csv', '--chunk-size=1', stdout=out)
+        self.assertEqual(out.getvalue(), self.export('bids', format='csv')[1])
+
+
+def throttle_rates(**rates):
+    return override_settings(REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {scope.replace('_', '-'): rate for scope, rate in rates.items()},
+    })
+
+
+class BidThrottleTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='owner', password='ownerpass')
+        self.alice = User.objects.create_user(username='alice', password='alicepass')
+        self.bob = User.objects.create_user(username='bob', password='bobpass')
+        self.hot, self.other = (
+            Auction.objects.create(owner=self.owner, title=title, starting_price=100,
+                                   ends_at=timezone.now() + timedelta(days=1))
+            for title in ('Hot', 'Other')
+        )
+        self.amount = 100
+        self.now = 1000.0
+        patcher = mock.patch.object(TokenBucketThrottle, 'timer', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def bid(self, user, auction):
+        self.amount += 1
+        self.client.force_authenticate(user)
+        return self.client.post(reverse('bid-list'), {'auction': auction.pk, 'amount': self.amount})
+
+    @throttle_rates(bid_user='3/m', bid_auction=None)
+    def test_user_bucket_bursts_then_refills(self):
+        self.assertEqual([self.bid(self.alice, self.hot).status_code for _ in range(3)], [201] * 3)
+        with self.assertNumQueries(0):
+            response = self.bid(self.alice, self.other)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '20')
+        self.assertEqual(self.bid(self.bob, self.hot).status_code, status.HTTP_201_CREATED)
+
+        self.now += 20  # one token back
+        self.assertEqual([self.bid(self.alice, self.hot).status_code for _ in range(2)], [201, 429])
+
+    @throttle_rates(bid_user=None, bid_auction='2/s')
+    def test_auction_bucket_is_shared_by_every_bidder(self):
+        self.assertEqual([self.bid(user, self.hot).status_code for user in (self.alice, self.bob, self.alice)],
+                         [201, 201, 429])
+        self.assertEqual(self.bid(self.bob, self.other).status_code, status.HTTP_201_CREATED)
+        response = self.client.post(reverse('proxy-bid-list'), {'auction': self.hot.pk, 'max_amount': 500})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @throttle_rates(bid_user='1/m', bid_auction='1/m')
+    def test_reads_are_not_throttled(self):
+        self.assertEqual(self.bid(self.alice, self.hot).status_code, status.HTTP_201_CREATED)
+        for _ in range(3):
+            self.assertEqual(self.client.get(reverse('bid-my-bids')).status_code, status.HTTP_200_OK)
+
+
+@override_settings(AUCTION_SOFT_CLOSE_SECONDS=60)
+class SoftCloseTests(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='ownerpass')
+        self.bidder = User.objects.create_user(username='bidder', password='bidderpass')
+        self.now = timezone.now()
+        self.auction = Auction.objects.create(owner=self.owner, title='Closing', starting_price=100,
+                                              ends_at=self.now + timedelta(seconds=30))
+
+    def test_late_bid_extends_and_requeues_the_close(self):
+        with mock.patch.object(close_auction, 'apply_async') as apply_async, \
+                self.captureOnCommitCallbacks(execute=True):
+            place_bid(self.auction.pk, self.bidder, 110, now=self.now)
+        ends_at = self.now + timedelta(seconds=60)
+        apply_async.assert_called_once_with((self.auction.pk, ends_at.isoformat()), eta=ends_at)
+        self.auction.refresh_from_db()
+        self.assertEqual((self.auction.ends_at, self.auction.close_scheduled_for), (ends_at, ends_at))
+
+        # The task queued for the original end finds nothing to close.
+        self.assertEqual(close_auction.apply(args=(self.auction.pk, (self.now - timedelta(seconds=1)).isoformat())).get(),
+                         "Closed 0 expired auctions, awarded 0 winners.")
+
+    def test_only_bids_inside_the_window_extend(self):
+        place_bid(self.auction.pk, self.bidder, 110, now=self.now - timedelta(minutes=5))
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.ends_at, self.now + timedelta(seconds=30))
+
+        # A later bid never pulls the end back in.
+        place_bid(self.auction.pk, self.bidder, 120, now=self.now + timedelta(seconds=20))
+        place_bid(self.auction.pk, self.bidder, 130, now=self.now + timedelta(seconds=10))
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.ends_at, self.now + timedelta(seconds=80))
+
+    def test_bulk_and_proxy_bids_extend_too(self):
+        place_bids(self.bidder, [(0, self.auction.pk, 110)], now=self.now)
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.ends_at, self.now + timedelta(seconds=60))
+        rival = User.objects.create_user(username='rival', password='rivalpass')
+        set_proxy_bid(self.auction.pk, rival, 200, now=self.now + timedelta(seconds=30))
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.ends_at, self.now + timedelta(seconds=90))
+
+
+class RoleProfileTests(TestCase):
+    def test_api_role_loads_only_the_api(self):
+        probe = subprocess.run(
+            [sys.executable, '-c',
+             'from django_REST_API_auction_house.wsgi import application\n'
+             'import sys; from django.urls import resolve, Resolver404\n'
+             'resolve("/api/auctions/")\n'
+             'try:\n    resolve("/admin/")\nexcept Resolver404:\n    print("no admin")\n'
+             'print(sorted(m for m in ("channels", "drf_yasg", "django_celery_beat") if m in sys.modules))'],
+            env={**os.environ, 'DJANGO_ROLE': 'api', 'DJANGO_SETTINGS_MODULE': 'django_REST_API_auction_house.settings'},
+            capture_output=True, text=True, check=True, cwd=settings.BASE_DIR,
+        )
+        self.assertEqual(probe.stdout.split('\n')[:2], ['no admin', '[]'])
+
+    def test_worker_role_loads_beat_but_neither_channels_nor_docs(self):
+        probe = subprocess.run(
+            [sys.executable, '-c',
+             'import django; django.setup()\n'
+             'from django_REST_API_auction_house.celery import app; app.loader.import_default_modules()\n'
+             'import sys; assert "auctions.tasks.close_auction" in app.tasks\n'
+             'from django.apps import apps; assert apps.is_installed("django_celery_beat")\n'
+             'print(sorted(m for m in ("channels", "drf_yasg") if m in sys.modules))'],
+            env={**os.environ, 'DJANGO_ROLE': 'worker',
+                 'DJANGO_SETTINGS_MODULE': 'django_REST_API_auction_house.settings'},
+            capture_output=True, text=True, check=True, cwd=settings.BASE_DIR,
+        )
+        self.assertEqual(probe.stdout.strip(), '[]')
+
+    def test_unknown_role_is_rejected(self):
+        probe = subprocess.run(
+            [sys.executable, '-c', 'import django_REST_API_auction_house.settings'],
+            env={**os.environ, 'DJANGO_ROLE': 'bogus'}, capture_output=True, text=True, cwd=settings.BASE_DIR,
+        )
+        self.assertIn('DJANGO_ROLE must be one of', probe.stderr)
+
+    def test_schema_is_generated_once(self):
+        CachedSchemaGenerator.schemas.clear()
+        with mock.patch.object(OpenAPISchemaGenerator, 'get_schema', autospec=True,
+                               side_effect=OpenAPISchemaGenerator.get_schema) as generate:
+            first = self.client.get('/?format=openapi')
+            second = self.client.get('/?format=openapi')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(generate.call_count, 1)
+        schema = json.loads(first.content)
+        self.assertEqual(schema['basePath'], '/api')
+        self.assertIn('/auctions/', schema['paths'])
+
+
+class RowSerializerTests(TestCase):
+    """The row serializers and the JSON renderer must not change a byte of the responses."""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='ownerpass')
+        self.bidder = User.objects.create_user(username='bidder', password='bidderpass')
+        now = timezone.now().replace(microsecond=123456)
+        self.open = Auction.objects.create(owner=self.owner, title='Open \u2028 żółw', starting_price=Decimal('10.5'),
+                                           ends_at=now + timedelta(days=1))
+        self.closed = Auction.objects.create(owner=self.owner, title='Closed', starting_price=5,
+                                             ends_at=now + timedelta(days=1))
+        Bid.objects.create(auction=self.open, user=self.bidder, amount=Decimal('11.25'))
+        Bid.objects.create(auction=self.closed, user=self.bidder, amount=7)
+        refresh_bid_aggregates()
+        Auction.objects.filter(pk=self.closed.pk).update(ends_at=now - timedelta(hours=1), winner=self.bidder)
+
+    def assertSameData(self, queryset, model_serializer, row_serializer):
+        expected = model_serializer(queryset.order_by('pk'), many=True).data
+        actual = row_serializer(row_serializer.rows(queryset.order_by('pk')), many=True).data
+        self.assertEqual(json.dumps(actual), json.dumps(expected))
+
+    def test_rows_render_like_the_model_serializers(self):
+        self.assertSameData(Auction.objects.for_list(), AuctionListSerializer, AuctionListRowSerializer)
+        self.assertSameData(Auction.objects.for_stats(), AuctionStatsSerializer, AuctionStatsRowSerializer)
+        with override_settings(AUCTION_STATS_SNAPSHOT=not settings.AUCTION_STATS_SNAPSHOT):
+            self.assertSameData(Auction.objects.for_stats(), AuctionStatsSerializer, AuctionStatsRowSerializer)
+        self.assertSameData(Bid.objects.select_related('user'), BidSerializer, BidRowSerializer)
+
+    @skipUnless(renderers.orjson, "orjson is not installed")
+    def test_orjson_renders_like_drf(self):
+        data = {'results': AuctionSerializer(Auction.objects.for_detail(), many=True).data, 1: [Decimal('1.50'),
+                timezone.now(), None, True, 'line\u2029separator']}
+        fast = renderers.FastJSONRenderer().render(data)
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual(fast, renderers.FastJSONRenderer().render(data))
+
+
+class AuctionSearchTests(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='ownerpass')
+        now = timezone.now()
+
+        def auction(title, price, description='', ends_at=now + timedelta(days=1)):
+            return Auction.objects.create(owner=self.owner, title=title, description=description,
+                                          starting_price=price, ends_at=ends_at)
+
+        self.camera = auction('Vintage camera', 50)
+        self.bag = auction('Camera bag', 20, 'Fits any lens')
+        self.bike = auction('Mountain bike', 400, 'Comes with a camera mount')
+        self.lens = auction('Old camera lens', 80, ends_at=now - timedelta(hours=1))
+        for title in ('Desk lamp', 'Garden chair', 'Kettle', 'Wool scarf'):
+            auction(title, 10)
+
+    def search(self, **params):
+        response = self.client.get(reverse('auction-search'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return response.data
+
+    def ids(self, **params):
+        return [auction['id'] for auction in self.search(**params)['results']]
+
+    def test_title_matches_rank_first(self):
+        ids = self.ids(q='camera')
+        self.assertEqual(set(ids), {self.camera.id, self.bag.id, self.bike.id, self.lens.id})
+        self.assertEqual(ids[-1], self.bike.id)
+        results = self.search(q='camera')['results']
+        self.assertEqual([row['rank'] for row in results], sorted((row['rank'] for row in results), reverse=True))
+
+    def test_every_word_matches_and_the_last_may_be_a_prefix(self):
+        self.assertEqual(set(self.ids(q='cam')), {self.camera.id, self.bag.id, self.bike.id, self.lens.id})
+        self.assertEqual(self.ids(q='camera mou'), [self.bike.id])
+        self.assertEqual(set(self.ids(q='LENS')), {self.bag.id, self.lens.id})
+        self.assertEqual(self.ids(q='camera kettle'), [])
+
+    def test_index_follows_writes(self):
+        kettle = Auction.objects.get(title='Kettle')
+        kettle.title = 'Camera kettle'
+        kettle.save()
+        self.assertIn(kettle.id, self.ids(q='camera'))
+        Auction.objects.filter(pk=kettle.pk).update(title='Teapot')
+        self.assertNotIn(kettle.id, self.ids(q='camera'))
+        self.assertEqual(self.ids(q='teapot'), [kettle.id])
+        self.camera.delete()
+        self.assertNotIn(self.camera.id, self.ids(q='camera'))
+        # Bids only touch the aggregate columns, which are not indexed.
+        place_bid(self.bag.pk, User.objects.create_user(username='bidder', password='bidderpass'), 25)
+        self.assertIn(self.bag.id, self.ids(q='camera'))
+
+    def test_facets_leave_out_their_own_filter(self):
+        data = self.search(q='camera', status='open', max_price=100)
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(set(self.ids(q='camera', status='open', max_price=100)), {self.camera.id, self.bag.id})
+        # Status counts keep the price filter; price counts keep the status filter.
+        self.assertEqual(data['facets']['status'], {'open': 2, 'closed': 1})
+        self.assertEqual({bucket['from']: bucket['count'] for bucket in data['facets']['price'] if bucket['count']},
+                         {'10': 1, '50': 1, '100': 1})
+
+    def test_pages(self):
+        data = self.search(q='camera', page_size=3)
+        self.assertEqual((data['count'], len(data['results']), data['previous']), (4, 3, None))
+        second = self.client.get(data['next']).data
+        self.assertEqual((len(second['results']), second['next']), (1, None))
+        self.assertNotIn('page=', second['previous'])
+        self.assertEqual(set(self.ids(q='camera', page_size=3)) | {row['id'] for row in second['results']},
+                         {self.camera.id, self.bag.id, self.bike.id, self.lens.id})
+        for params in ({'page': 3, 'page_size': 3}, {'page': 'x'}, {'page': 51}):
+            response = self.client.get(reverse('auction-search'), {'q': 'camera', **params})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, params)
+
+    def test_invalid_parameters(self):
+        for params in ({}, {'q': ' '}, {'q': 'camera', 'status': 'bogus'}, {'q': 'camera', 'min_price': 'abc'}):
+            response = self.client.get(reverse('auction-search'), params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+        self.assertEqual(self.search(q='!!!')['count'], 0)
+
+    def test_one_query_for_facets_and_one_for_the_page(self):
+        with self.assertNumQueries(2):
+            self.search(q='camera', status='open', min_price=10)
+
+
+class RouteBudgetTests(APITestCase):
+    """Drives every API route through the benchmark harness and fails on budget regressions."""
+
+    def test_routes_stay_within_budget(self):
+        cache.clear()
+        results = run_api_routes(users=10, auctions=60, bids_per_auction=5, repeat=3)
+        self.assertEqual(check_budgets(results), [])
+
+    def test_list_queries_do_not_grow_with_data(self):
+        cache.clear()
+        small = {row['route']: row['queries'] for row in run_api_routes(users=5, auctions=20, bids_per_auction=2, repeat=2)}
+        Bid.objects.all().delete()
+        Auction.objects.all().delete()
+        User.objects.all().delete()
+        large = {row['route']: row['queries'] for row in run_api_routes(users=5, auctions=120, bids_per_auction=8, repeat=2)}
+        for route in ('auction-list', 'auction-list-filtered', 'auction-bids', 'bid-list', 'bid-my-bids',
+                      'auction-summary-list', 'auction-leaderboard', 'auction-search', 'bid-feed', 'bid-feed-since'):
+            self.assertEqual(small[route], large[route], route)
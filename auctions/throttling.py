@@ -0,0 +1,77 @@
+"""
+Token-bucket throttles for placing bids.
+
+A rate of ``N/period`` (DRF's format) is a bucket of ``N`` tokens refilled
+continuously at ``N`` per period: a client can burst ``N`` bids, then keeps
+the sustained rate. The bucket is stored as a single timestamp in the shared
+cache, the time at which it will be full again (GCRA), so a check is one
+cache read and one write whatever the rate -- unlike DRF's
+``SimpleRateThrottle``, which stores and scans the timestamp of every
+request in the window. As with DRF's throttles the read and the write are
+not atomic, so concurrent requests can get a few tokens more than the rate.
+
+Rates live in ``REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']`` and are read on
+every check; ``None`` turns a throttle off.
+"""
+from math import ceil
+
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+
+    def get_rate(self):
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def allow_request(self, request, view):
+        self.rate = self.get_rate()
+        if self.rate is None:
+            return True
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        # The bucket is stored as the time it will be full again; a request
+        # pushes that one token's worth (interval) later, and may not push it
+        # more than the whole bucket (duration) past now.
+        interval = self.duration / self.num_requests
+        now = self.timer()
+        full_at = max(self.cache.get(self.key, now), now) + interval
+        self.retry_after = full_at - self.duration - now
+        if self.retry_after > 0:
+            return False
+        # Once full, the bucket needs no entry at all.
+        self.cache.set(self.key, full_at, timeout=ceil(full_at - now))
+        return True
+
+    def wait(self):
+        return self.retry_after
+
+
+class UserBidThrottle(TokenBucketThrottle):
+    """Bids per user, across every auction."""
+    scope = 'bid-user'
+
+    def get_cache_key(self, request, view):
+        ident = request.user.pk if request.user.is_authenticated else self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class AuctionBidThrottle(TokenBucketThrottle):
+    """
+    Bids per auction, from everyone, so a swarm of clients cannot flood one
+    auction's row near ``ends_at``. Only requests naming a single
+    ``auction``; a bulk batch is one transaction and only counts per user.
+    """
+    scope = 'bid-auction'
+
+    def get_cache_key(self, request, view):
+        auction_id = request.data.get('auction') if hasattr(request.data, 'get') else None
+        try:
+            auction_id = int(auction_id)
+        except (TypeError, ValueError):
+            return None  # Left to the serializer to reject.
+        return self.cache_format % {'scope': self.scope, 'ident': auction_id}
@@ -3,17 +3,41 @@
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import AuctionViewSet, BidViewSet, RegisterView, current_user_view, LoginView, LogoutView, MyProfileView
+from . import async_views
+from .async_views import async_reads
+from .views import AuctionViewSet, BidViewSet, ProxyBidViewSet, RegisterView, current_user_view, LoginView, LogoutView, MyProfileView, \
+    CacheStatsView, ExportView, TokenRefreshView
 
 router = DefaultRouter()
 router.register(r'auctions', AuctionViewSet, basename='auction')
 router.register(r'bids', BidViewSet, basename='bid')
+router.register(r'proxy-bids', ProxyBidViewSet, basename='proxy-bid')
+router_views = {pattern.name: pattern.callback for pattern in router.urls}
+
+
+def read_route(route, name, handler):
+    """Reads on ``route`` are served by the async ``handler``, other methods by the router's view of that name."""
+    return path(route, async_reads(handler, router_views[name]), name=name)
+
+
+async_read_urlpatterns = [
+    read_route('auctions/', 'auction-list', async_views.auction_list),
+    read_route('auctions/<int:pk>/', 'auction-detail', async_views.auction_detail),
+    read_route('auctions/<int:pk>/summary/', 'auction-summary', async_views.auction_summary),
+    read_route('auctions/<int:pk>/bids/', 'auction-bids', async_views.auction_bids),
+    read_route('bids/', 'bid-list', async_views.bid_list),
+    read_route('bids/<int:pk>/', 'bid-detail', async_views.bid_detail),
+]
 
 urlpatterns = [
     path('logout/', LogoutView.as_view(), name='logout'),
     path('login/', LoginView.as_view(), name='login'),
+    path('token/refresh/', TokenRefreshView.as_view(), name='token-refresh'),
+    *async_read_urlpatterns,
     path('', include(router.urls)),
     path('register/', RegisterView.as_view(), name='register'),
     path('me/', MyProfileView.as_view(), name='my-profile'),
+    path('cache-stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('export/<slug:dataset>/', ExportView.as_view(), name='export'),
     path('api-auth/', include('rest_framework.urls')),  # for session login/logout UI
 ]
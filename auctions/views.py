@@ -1,53 +1,165 @@
 # auctions/views.py
-from django.utils import timezone
-from rest_framework import viewsets, permissions, status
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, StreamingHttpResponse
+from django.utils.http import parse_etags
+from rest_framework import mixins, viewsets, permissions, status
 from rest_framework.exceptions import PermissionDenied, ValidationError
-from . import serializers
-from .models import Auction, Bid
+from . import cache as auction_cache
+from .authentication import SESSION_CLAIM, issue_tokens, revoke
+from .bidding import place_bid, place_bids, set_proxy_bid
+from .export import CSVRenderer, NDJSONRenderer, astream, export_rows, stream
+from .filters import AuctionFilterBackend
+from .models import ArchivedAuction, Auction, Bid, ProxyBid
+from .pagination import AuctionCursorPagination, BidCursorPagination, LeaderboardCursorPagination, SearchPagination, \
+    SyncPagination
 from .permissions import AuctionOwnerPermission, BidOwnerPermission
+from .routers import use_primary
+from .search import search_auctions
 from .serializers import AuctionSerializer, BidSerializer, AuctionSummarySerializer, LoginSerializer, ProfileSerializer, \
-    RegisterSerializer
+    RegisterSerializer, AuctionListSerializer, BidPlacementSerializer, TokenRefreshSerializer, \
+    BulkBidSerializer, ProxyBidSerializer, AuctionStatsSerializer, BidFeedSerializer, FeedAuctionSerializer, \
+    AuctionListRowSerializer, AuctionSearchRowSerializer, AuctionStatsRowSerializer, BidRowSerializer, \
+    decimal_string
+from .throttling import AuctionBidThrottle, UserBidThrottle
 from rest_framework import generics
 from django.contrib.auth.models import User
 from rest_framework.permissions import AllowAny
 from rest_framework.decorators import api_view, permission_classes, action
-from rest_framework.permissions import IsAuthenticated
-from django.contrib.auth import authenticate, login
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import update_last_login
+from rest_framework_simplejwt.views import TokenRefreshView as BaseTokenRefreshView
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from drf_yasg.utils import swagger_auto_schema
+from django.apps import apps
 from django.contrib.auth import logout
 
+
+def swagger_auto_schema(**overrides):
+    """drf_yasg's ``swagger_auto_schema`` in the roles that serve the docs; a no-op elsewhere."""
+    def decorator(view_method):
+        if not apps.is_installed('drf_yasg'):
+            return view_method
+        from drf_yasg.utils import swagger_auto_schema as document
+        return document(**overrides)(view_method)
+    return decorator
+
+
 class AuctionViewSet(viewsets.ModelViewSet):
-    queryset = Auction.objects.all()
+    queryset = Auction.objects.for_detail()
     serializer_class = AuctionSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, AuctionOwnerPermission]
+    pagination_class = AuctionCursorPagination
+    filter_backends = [AuctionFilterBackend]
+    ARCHIVED_READS = ('retrieve', 'summary', 'bids')
+    # List pages are rendered from .values() rows; get_serializer_class() still describes them.
+    ROW_SERIALIZERS = {
+        'list': AuctionListRowSerializer,
+        'my_auctions': AuctionListRowSerializer,
+        'summary_list': AuctionStatsRowSerializer,
+        'leaderboard': AuctionStatsRowSerializer,
+    }
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
-    def get_queryset(self):
-        queryset = super().get_queryset()
-        params = self.request.query_params
+    def get_serializer_class(self):
+        if self.action in ('list', 'my_auctions', 'search'):
+            return AuctionListSerializer
+        if self.action == 'bids':
+            return BidSerializer
+        if self.action == 'summary':
+            return AuctionSummarySerializer
+        if self.action in ('summary_list', 'leaderboard'):
+            return AuctionStatsSerializer
+        return super().get_serializer_class()
 
-        for auction in queryset:
-            auction.close_if_expired()
+    def get_queryset(self):
+        if self.action in ('list', 'my_auctions', 'bids'):
+            return Auction.objects.for_list()
+        if self.action == 'summary':
+            return Auction.objects.for_summary()
+        if self.action in ('summary_list', 'leaderboard'):
+            return Auction.objects.for_stats()
+        return super().get_queryset()
 
-        # Filter by 'mine=true'
-        if params.get('mine') == 'true' and self.request.user.is_authenticated:
-            queryset = queryset.filter(owner=self.request.user)
+    def list(self, request, *args, **kwargs):
+        return self.paginated_rows(self.filter_queryset(self.get_queryset()))
 
-        # Filter by auction status
-        status = params.get('status')
-        now = timezone.now()
+    def paginated_rows(self, queryset):
+        row_serializer = self.ROW_SERIALIZERS[self.action]
+        page = self.paginate_queryset(row_serializer.rows(queryset))
+        return self.get_paginated_response(row_serializer(page, many=True).data)
 
-        if status == 'open':
-            queryset = queryset.filter(end_date__gt=now)
-        elif status == 'closed':
-            queryset = queryset.filter(end_date__lte=now)
+    def get_archived_queryset(self):
+        if self.action == 'summary':
+            return ArchivedAuction.objects.for_summary()
+        if self.action == 'retrieve':
+            return ArchivedAuction.objects.for_detail()
+        return ArchivedAuction.objects.all()
 
-        return queryset
+    def get_object(self):
+        """Reads of an auction that has been archived are served from the archive; writes still get a 404."""
+        try:
+            return super().get_object()
+        except Http404:
+            if self.action not in self.ARCHIVED_READS:
+                raise
+        instance = generics.get_object_or_404(self.get_archived_queryset(), pk=self.kwargs['pk'])
+        self.check_object_permissions(self.request, instance)
+        return instance
+
+    def cached_response(self, kind):
+        """
+        Serve the serialized auction from the versioned cache, answering 304
+        when the client already holds the current version.
+        """
+        auction_id = self.kwargs['pk']
+        version = auction_cache.get_version(auction_id)
+        entry = auction_cache.get_payload(auction_id, kind, version)
+        if entry is None:
+            # Cached under the current version until the next write, so never from a lagging replica.
+            with use_primary():
+                instance = self.get_object()
+                entry = {'owner': instance.owner_id, 'data': self.get_serializer(instance).data}
+            auction_cache.set_payload(auction_id, kind, version, entry)
+        else:
+            self.check_object_permissions(self.request, Auction(pk=auction_id, owner_id=entry['owner']))
+
+        etag = auction_cache.etag(auction_id, kind, version)
+        if_none_match = parse_etags(self.request.headers.get('If-None-Match', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        return Response(entry['data'], headers={'ETag': etag})
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response('detail')
+
+    @action(detail=True, methods=['get'])
+    def summary(self, request, pk=None):
+        return self.cached_response('summary')
+
+    @action(detail=False, methods=['get'], url_path='summary', url_name='summary-list')
+    def summary_list(self, request):
+        """Bid totals and winners for every auction, one aggregate query per page."""
+        return self.list(request)
+
+    @action(detail=False, methods=['get'], pagination_class=LeaderboardCursorPagination)
+    def leaderboard(self, request):
+        """Auctions by bid activity, most bids first; takes the same filters as the list."""
+        return self.list(request)
+
+    @action(detail=False, methods=['get'], pagination_class=SearchPagination)
+    def search(self, request):
+        """
+        Full-text search of titles and descriptions (``q``), best matches
+        first, narrowed by ``status``, ``min_price`` and ``max_price``. The
+        ``facets`` count the matches per status and per price range.
+        """
+        results, count, facets = search_auctions(request.query_params)
+        page = self.paginator.paginate_queryset(AuctionSearchRowSerializer.rows(results), request, count=count)
+        return self.paginator.get_paginated_response(AuctionSearchRowSerializer(page, many=True).data, facets=facets)
 
     def perform_update(self, serializer):
         if self.get_object().owner != self.request.user:
@@ -64,28 +176,27 @@ class AuctionViewSet(viewsets.ModelViewSet):
         if not request.user.is_authenticated:
             raise PermissionDenied("You must be logged in to view your auctions.")
 
-        auctions = Auction.objects.filter(owner=request.user)
-        serializer = self.get_serializer(auctions, many=True)
-        return Response(serializer.data)
+        return self.paginated_rows(self.filter_queryset(self.get_queryset()).filter(owner=request.user))
+
+    @action(detail=True, methods=['get'])
+    def bids(self, request, pk=None):
+        auction = self.get_object()
+        paginator = BidCursorPagination()
+        page = paginator.paginate_queryset(BidRowSerializer.rows(auction.bids.all()), request, view=self)
+        return paginator.get_paginated_response(BidRowSerializer(page, many=True).data)
 
 class BidViewSet(viewsets.ModelViewSet):
     queryset = Bid.objects.all()
     serializer_class = BidSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, BidOwnerPermission]
+    pagination_class = BidCursorPagination
     http_method_names = ['get', 'post']
+    BID_THROTTLES = [UserBidThrottle, AuctionBidThrottle]
 
-    def perform_create(self, serializer):
-        auction = serializer.validated_data['auction']
-
-        # Zakaz licytowania własnych aukcji
-        if auction.owner == self.request.user:
-            raise serializers.ValidationError("You cannot bid on your own auction.")
-
-        # Zakaz licytowania poniżej aktualnej najwyższej ceny
-        if serializer.validated_data['amount'] <= auction.highest_bid:
-            raise serializers.ValidationError("The bid must be higher than the current highest bid.")
-
-        serializer.save(user=self.request.user)
+    def get_throttles(self):
+        if self.action in ('create', 'bulk'):
+            return [throttle() for throttle in self.BID_THROTTLES]
+        return super().get_throttles()
 
     def update(self, request, *args, **kwargs):
         return Response({'detail': 'Updating bids is not allowed.'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
@@ -99,19 +210,46 @@ class BidViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         if self.request.query_params.get('mine'):
-            return Bid.objects.filter(user=self.request.user)
-        return super().get_queryset()
+            return Bid.objects.filter(user=self.request.user).select_related('user')
+        return super().get_queryset().select_related('user')
 
-    def create(self, request, *args, **kwargs):
-        # Fetch the auction to which the bid is being placed
-        auction = Auction.objects.get(id=request.data['auction'])
+    def list(self, request, *args, **kwargs):
+        return self.paginated_rows(self.filter_queryset(self.get_queryset()))
 
-        # Check if the auction has ended
-        if auction.ends_at < timezone.now():
-            return Response({"detail": "Bidding is no longer allowed. The auction has ended."}, status=status.HTTP_400_BAD_REQUEST)
+    def paginated_rows(self, queryset):
+        page = self.paginate_queryset(BidRowSerializer.rows(queryset))
+        return self.get_paginated_response(BidRowSerializer(page, many=True).data)
 
-        # Proceed with the normal bid creation
-        return super().create(request, *args, **kwargs)
+    @swagger_auto_schema(request_body=BidPlacementSerializer, responses={201: BidSerializer})
+    def create(self, request, *args, **kwargs):
+        placement = BidPlacementSerializer(data=request.data)
+        placement.is_valid(raise_exception=True)
+        bid = place_bid(placement.validated_data['auction'], request.user, placement.validated_data['amount'])
+
+        serializer = self.get_serializer(bid)
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+    @swagger_auto_schema(request_body=BulkBidSerializer, responses={200: 'Per-item results'})
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        batch = BulkBidSerializer(data=request.data)
+        batch.is_valid(raise_exception=True)
+
+        results, items = [], []
+        for index, data in enumerate(batch.validated_data['bids']):
+            placement = BidPlacementSerializer(data=data)
+            if placement.is_valid():
+                items.append((index, placement.validated_data['auction'], placement.validated_data['amount']))
+            else:
+                results.append({'index': index, 'status': 'rejected', 'errors': placement.errors})
+        if items:
+            results += [{**result, 'amount': decimal_string(result['amount'])}
+                        for result in place_bids(request.user, items)]
+        results.sort(key=lambda result: result['index'])
+
+        accepted = sum(result['status'] == 'accepted' for result in results)
+        return Response({'accepted': accepted, 'rejected': len(results) - accepted, 'results': results})
 
     @action(detail=False, methods=['get'], url_path='my-bids')
     def my_bids(self, request):
@@ -119,9 +257,80 @@ class BidViewSet(viewsets.ModelViewSet):
             raise PermissionDenied("You must be logged in to view your bids.")
 
 
-        bids = Bid.objects.filter(user=request.user)
-        serializer = self.get_serializer(bids, many=True)
-        return Response(serializer.data)
+        return self.paginated_rows(Bid.objects.filter(user=request.user))
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated], pagination_class=SyncPagination,
+            serializer_class=BidFeedSerializer)
+    def feed(self, request):
+        """
+        The caller's bids, oldest first, each with a ``winning`` flag. With
+        ``since=<cursor>`` only newer bids are returned, plus ``auctions``: the
+        current state of every auction the caller has bid on that took a bid
+        after the cursor, so being outbid reaches the client too.
+        """
+        page = self.paginate_queryset(Bid.objects.for_feed(request.user))
+        extra = {}
+        if self.paginator.since is not None:
+            auctions = Auction.objects.bid_on_since(request.user, self.paginator.since[0])
+            extra['auctions'] = FeedAuctionSerializer(auctions, many=True).data
+        return self.paginator.get_paginated_response(self.get_serializer(page, many=True).data, **extra)
+
+class ProxyBidViewSet(mixins.ListModelMixin, mixins.CreateModelMixin, mixins.DestroyModelMixin,
+                      viewsets.GenericViewSet):
+    """
+    The current user's proxy bids. POST sets (or replaces) the maximum for an
+    auction and lets the proxies respond at once; DELETE withdraws it. Bids
+    already placed on the user's behalf stay.
+    """
+    serializer_class = ProxyBidSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = None
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return ProxyBid.objects.none()
+        return ProxyBid.objects.filter(user=self.request.user).order_by('-placed_at')
+
+    def get_throttles(self):
+        # Setting a maximum bids at once, so it draws on the same buckets.
+        if self.action == 'create':
+            return [throttle() for throttle in BidViewSet.BID_THROTTLES]
+        return super().get_throttles()
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        proxy, bids, leader_id = set_proxy_bid(
+            serializer.validated_data['auction_id'], request.user, serializer.validated_data['max_amount'],
+        )
+        data = {**self.get_serializer(proxy).data, 'leading': leader_id == request.user.pk}
+        return Response(data, status=status.HTTP_201_CREATED)
+
+class CacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(auction_cache.stats())
+
+class ExportView(APIView):
+    """
+    Stream a whole dataset (``auctions``, ``bids``, ``archived-auctions``,
+    ``archived-bids``) as NDJSON or CSV, filtered by ``status`` and a
+    ``since``/``until`` date range. For operators; see ``auctions.export``.
+    """
+    permission_classes = [IsAdminUser]
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+
+    def get(self, request, dataset):
+        queryset, columns = export_rows(dataset, request.query_params)
+        renderer = request.accepted_renderer
+        if isinstance(request._request, ASGIRequest):
+            content = astream(queryset, columns, renderer.format)
+        else:
+            content = stream(queryset, columns, renderer.format)
+        response = StreamingHttpResponse(content, content_type=f'{renderer.media_type}; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{dataset}.{renderer.format}"'
+        return response
 
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
@@ -147,7 +356,7 @@ class LoginView(APIView):
 
     @swagger_auto_schema(
         request_body=LoginSerializer,
-        responses={200: 'Successfully logged in', 400: 'Invalid credentials'}
+        responses={200: 'Access and refresh tokens', 400: 'Invalid credentials'}
     )
     def post(self, request):
         username = request.data.get('username')
@@ -159,15 +368,19 @@ class LoginView(APIView):
         if not username or not password:
             return Response({"detail": "Username and password are required."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Sprawdzenie poprawności danych logowania
+        # Sprawdzenie poprawności danych logowania; hasło jest haszowane tylko tutaj,
+        # kolejne żądania uwierzytelnia token
         user = authenticate(username=username, password=password)
 
         if user is not None:
-            login(request, user)
-            return Response({"detail": "Successfully logged in."}, status=status.HTTP_200_OK)
+            update_last_login(None, user)
+            return Response({"detail": "Successfully logged in.", **issue_tokens(user)}, status=status.HTTP_200_OK)
         else:
             return Response({"detail": "Invalid credentials."}, status=status.HTTP_401_UNAUTHORIZED)
 
+class TokenRefreshView(BaseTokenRefreshView):
+    serializer_class = TokenRefreshSerializer
+
 class LogoutView(APIView):
     permission_classes = [IsAuthenticated]  # Tylko zalogowani użytkownicy mogą się wylogować
 
@@ -175,7 +388,11 @@ class LogoutView(APIView):
         if not request.user.is_authenticated:
             return Response({"detail": "User is not logged in."}, status=status.HTTP_400_BAD_REQUEST)
 
-        logout(request)  # Wyczyść sesję
+        if request.auth is not None:
+            # Unieważnij token odświeżania i wszystkie wydane z niego tokeny dostępu
+            revoke(request.auth[SESSION_CLAIM])
+        else:
+            logout(request)  # Wyczyść sesję
         return Response({"detail": "Successfully logged out."}, status=status.HTTP_200_OK)
 
 class MyProfileView(generics.RetrieveUpdateDestroyAPIView):
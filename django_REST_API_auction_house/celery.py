@@ -11,8 +11,27 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
 
 app.conf.beat_schedule = {
+    # Each auction is closed by its own ETA'd task; these only queue the tasks
+    # for auctions entering the 30-minute horizon and catch up on missed ones.
+    'schedule-auction-closes-every-5-minutes': {
+        'task': 'auctions.tasks.schedule_upcoming_closes',
+        'schedule': crontab(minute='*/5'),  # every 5 minutes
+    },
     'close-expired-auctions-every-5-minutes': {
         'task': 'auctions.tasks.close_expired_auctions',
         'schedule': crontab(minute='*/5'),  # every 5 minutes
     },
+    # Settlement is queued by the close tasks; these catch up on runs that were lost.
+    'settle-closed-auctions-every-5-minutes': {
+        'task': 'auctions.tasks.settle_auctions',
+        'schedule': crontab(minute='*/5'),  # every 5 minutes
+    },
+    'deliver-notifications-every-5-minutes': {
+        'task': 'auctions.tasks.deliver_notifications',
+        'schedule': crontab(minute='*/5'),  # every 5 minutes
+    },
+    'archive-closed-auctions-nightly': {
+        'task': 'auctions.tasks.archive_closed_auctions',
+        'schedule': crontab(hour=3, minute=30),  # every night at 03:30
+    },
 }
\ No newline at end of file
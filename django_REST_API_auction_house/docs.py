@@ -0,0 +1,56 @@
+"""
+Swagger UI and ReDoc, served by the docs role (and the all-in-one profile).
+
+The schema views are built on the first docs request and the schema itself,
+which only changes with the code, is generated once per process and base URL
+rather than on every request.
+"""
+from functools import lru_cache
+
+from django.urls import include, path
+from drf_yasg import openapi
+from drf_yasg.generators import OpenAPISchemaGenerator
+from drf_yasg.views import get_schema_view
+from rest_framework.permissions import AllowAny
+
+
+class CachedSchemaGenerator(OpenAPISchemaGenerator):
+    schemas = {}
+
+    def get_schema(self, request=None, public=False):
+        if not public:
+            # Private schemas depend on the user's permissions.
+            return super().get_schema(request, public)
+        key = (self.version, request.build_absolute_uri('/') if request is not None else None)
+        if key not in self.schemas:
+            self.schemas[key] = super().get_schema(request, public)
+        return self.schemas[key]
+
+
+@lru_cache(maxsize=None)
+def schema_view(renderer):
+    view = get_schema_view(
+        openapi.Info(
+            title="Auction API",
+            default_version='v1',
+            description="Public auction API",
+        ),
+        public=True,
+        permission_classes=[AllowAny],
+        # The docs role does not serve the API, so the API's routes are given explicitly.
+        patterns=[path('api/', include('auctions.urls'))],
+        generator_class=CachedSchemaGenerator,
+    )
+    return view.with_ui(renderer, cache_timeout=0)
+
+
+def lazy_schema_view(renderer):
+    def view(request, *args, **kwargs):
+        return schema_view(renderer)(request, *args, **kwargs)
+    return view
+
+
+urlpatterns = [
+    path('', lazy_schema_view('swagger'), name='schema-swagger-ui'),
+    path('redoc/', lazy_schema_view('redoc'), name='schema-redoc'),
+]
@@ -10,8 +10,13 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+from datetime import timedelta
+from decimal import Decimal
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -29,30 +34,60 @@ ALLOWED_HOSTS = []
 
 # Application definition
 
-INSTALLED_APPS = [
-    'django.contrib.admin',
-    'django.contrib.auth',
-    'django.contrib.contenttypes',
-    'django.contrib.sessions',
-    'django.contrib.messages',
-    'django.contrib.staticfiles',
-    'rest_framework',
-    'rest_framework_simplejwt.token_blacklist',
-    'drf_yasg',
-    'channels',
-    'auctions',
-    'django_celery_beat'
-]
+# Rola procesu (DJANGO_ROLE): każda ładuje tylko potrzebne aplikacje i adresy URL (urls.py).
+# "all" (domyślna) ładuje wszystko: development, testy, panel admina.
+ROLES = ('all', 'api', 'websocket', 'worker', 'docs')
+ROLE = os.environ.get('DJANGO_ROLE', 'all')
+if ROLE not in ROLES:
+    raise ImproperlyConfigured(f"DJANGO_ROLE must be one of: {', '.join(ROLES)}.")
+
+if ROLE == 'all':
+    INSTALLED_APPS = [
+        'django.contrib.admin',
+        'django.contrib.auth',
+        'django.contrib.contenttypes',
+        'django.contrib.sessions',
+        'django.contrib.messages',
+        'django.contrib.staticfiles',
+        'rest_framework',
+        'rest_framework_simplejwt.token_blacklist',
+        'drf_yasg',
+        'channels',
+        'auctions',
+        'django_celery_beat'
+    ]
+else:
+    INSTALLED_APPS = [
+        'django.contrib.auth',
+        'django.contrib.contenttypes',
+        'django.contrib.sessions',
+        'rest_framework',
+        'rest_framework_simplejwt.token_blacklist',
+        'auctions',
+        *{
+            'api': [],
+            'websocket': ['channels'],
+            # Beat z DatabaseScheduler (celery -B / celery beat) czyta harmonogram z tabel django_celery_beat
+            'worker': ['django_celery_beat'],
+            # Swagger UI i ReDoc potrzebują szablonów i plików statycznych drf_yasg
+            'docs': ['django.contrib.staticfiles', 'drf_yasg'],
+        }[ROLE],
+    ]
 
 MIDDLEWARE = [
+    # Pierwszy, żeby mierzyć czas całego żądania
+    'auctions.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'auctions.routers.ReplicaPinningMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
+if 'django.contrib.messages' not in INSTALLED_APPS:
+    MIDDLEWARE.remove('django.contrib.messages.middleware.MessageMiddleware')
 
 ROOT_URLCONF = 'django_REST_API_auction_house.urls'
 
@@ -73,6 +108,49 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'django_REST_API_auction_house.wsgi.application'
+ASGI_APPLICATION = 'django_REST_API_auction_house.asgi.application'
+
+# Kanały WebSocket: Redis na produkcji, w pamięci lokalnie i w testach
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {'hosts': [REDIS_URL]},
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        },
+    }
+
+# Cache: Redis na produkcji, locmem lokalnie i w testach
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+AUCTION_CACHE_TIMEOUT = 5 * 60
+# Podsumowania i ranking aukcji z kolumn aktualizowanych przy każdej ofercie zamiast agregacji tabeli ofert
+AUCTION_STATS_SNAPSHOT = os.environ.get('AUCTION_STATS_SNAPSHOT') == '1'
+# Po ilu dniach od zamknięcia aukcje i ich oferty trafiają do tabel archiwum
+AUCTION_ARCHIVE_AFTER_DAYS = int(os.environ.get('AUCTION_ARCHIVE_AFTER_DAYS', 30))
+# Ochrona przed "snipingiem": oferta w ostatnich N sekundach przedłuża aukcję do N sekund od oferty (0 wyłącza)
+AUCTION_SOFT_CLOSE_SECONDS = int(os.environ.get('AUCTION_SOFT_CLOSE_SECONDS', 0))
+# Prowizja serwisu od ceny sprzedaży, potrącana z wypłaty dla sprzedającego przy rozliczeniu aukcji
+AUCTION_COMMISSION_RATE = Decimal(os.environ.get('AUCTION_COMMISSION_RATE', '0.05'))
+# Powiadomienia o rozliczeniu wysyłane są e-mailem; domyślnie wypisywane na konsolę workera
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
 
 
 # Database
@@ -82,8 +160,20 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Połączenia trwałe, sprawdzane przed ponownym użyciem w kolejnym żądaniu
+        'CONN_MAX_AGE': int(os.environ.get('CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
+# Repliki tylko do odczytu (auctions/routers.py): DATABASE_REPLICAS to nazwy baz (dla SQLite ścieżki plików)
+# rozdzielone przecinkami, każda jako alias replica1, replica2, ... Domyślnie brak replik: wszystko idzie
+# do bazy głównej. W testach repliki wskazują na bazę testową.
+DATABASE_REPLICAS = [name.strip() for name in os.environ.get('DATABASE_REPLICAS', '').split(',') if name.strip()]
+for number, name in enumerate(DATABASE_REPLICAS, 1):
+    DATABASES[f'replica{number}'] = {**DATABASES['default'], 'NAME': name, 'TEST': {'MIRROR': 'default'}}
+DATABASE_ROUTERS = ['auctions.routers.ReplicaRouter']
+# Tyle sekund po złożeniu oferty odczyty użytkownika idą do bazy głównej (opóźnienie replikacji)
+DATABASE_REPLICA_LAG = float(os.environ.get('DATABASE_REPLICA_LAG', 5))
 
 
 # Password validation
@@ -128,13 +218,25 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
+    # JWT dla API (bez zapisu sesji i haszowania hasła na żądanie), sesja dla przeglądarkowego API.
+    # Sesja jest pierwsza, więc brak uwierzytelnienia nadal daje 403.
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.BasicAuthentication',
+        'auctions.authentication.CachedBlacklistJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [ 'rest_framework.permissions.IsAuthenticated',
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
           ],
+    # orjson, jeśli jest zainstalowany (auctions/renderers.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'auctions.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    # Limity składania ofert (token bucket w cache, patrz auctions/throttling.py); None wyłącza limit
+    'DEFAULT_THROTTLE_RATES': {
+        'bid-user': os.environ.get('BID_RATE_USER', '10/s'),
+        'bid-auction': os.environ.get('BID_RATE_AUCTION', '50/s'),
+    },
 }
 CELERY_BROKER_URL = 'redis://localhost:6379/0'  # assuming Redis is running locally
 CELERY_ACCEPT_CONTENT = ['json']
@@ -142,13 +244,46 @@ CELERY_TASK_SERIALIZER = 'json'
 LOGIN_URL = '/api/login/'
 SWAGGER_SETTINGS = {
     'USE_SESSION_AUTH': False,
+    'SECURITY_DEFINITIONS': {
+        'Bearer': {'type': 'apiKey', 'name': 'Authorization', 'in': 'header'},
+    },
+}
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),
+    'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    # Bez rotacji: token odświeżania identyfikuje logowanie (claim "sid" tokenów dostępu)
+    'ROTATE_REFRESH_TOKENS': False,
+    'AUTH_HEADER_TYPES': ('Bearer',),
 }
 # Sesja wygasa po 2 godzinach
 SESSION_COOKIE_AGE = 2 * 60 * 60
 SESSION_ENGINE = 'django.contrib.sessions.backends.db'
 SESSION_COOKIE_NAME = 'sessionid'
-SESSION_SAVE_EVERY_REQUEST = True
+SESSION_SAVE_EVERY_REQUEST = False  # zapis tylko przy zmianie sesji
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False
 SESSION_COOKIE_DOMAIN = None
 CELERY_TIMEZONE = 'Europe/Warsaw'
-CELERY_ENABLE_UTC = True
\ No newline at end of file
+CELERY_TASK_ALWAYS_EAGER = os.environ.get('CELERY_TASK_ALWAYS_EAGER') == '1'
+# W trybie eager błędy zadań trafiają do wywołującego zamiast do wyniku zadania
+CELERY_TASK_EAGER_PROPAGATES = CELERY_TASK_ALWAYS_EAGER
+CELERY_ENABLE_UTC = True
+
+# Metryki (/metrics); token wymagany tylko, gdy ustawiony
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+# Profilowanie cProfile wolnych żądań: próg w ms, zrzuty .prof do katalogu
+SLOW_REQUEST_PROFILE_MS = int(os.environ['SLOW_REQUEST_PROFILE_MS']) if os.environ.get('SLOW_REQUEST_PROFILE_MS') else None
+SLOW_REQUEST_PROFILE_DIR = os.environ.get('SLOW_REQUEST_PROFILE_DIR', BASE_DIR / 'profiles')
+
+# Sentry: tylko gdy podano DSN
+SENTRY_DSN = os.environ.get('SENTRY_DSN')
+if SENTRY_DSN:
+    import sentry_sdk
+    from sentry_sdk.integrations.celery import CeleryIntegration
+    from sentry_sdk.integrations.django import DjangoIntegration
+
+    sentry_sdk.init(
+        dsn=SENTRY_DSN,
+        integrations=[DjangoIntegration(), CeleryIntegration()],
+        traces_sample_rate=float(os.environ.get('SENTRY_TRACES_SAMPLE_RATE', '0')),
+        send_default_pii=False,
+    )
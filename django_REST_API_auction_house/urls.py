@@ -1,24 +1,21 @@
 # auction_api/urls.py
-from django.contrib import admin
+from django.conf import settings
 from django.urls import path, include
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-from rest_framework.permissions import AllowAny
 
+from auctions.metrics import metrics_view
 
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Auction API",
-        default_version='v1',
-        description="Public auction API",
-    ),
-    public=True,
-    permission_classes=[AllowAny],
-)
-
+# URL profiles: a process only imports the views of its role (settings.ROLE).
 urlpatterns = [
-    path('admin/', admin.site.urls),
-    path('api/', include('auctions.urls')),
-    path('', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    path('metrics', metrics_view, name='metrics'),
 ]
+
+if settings.ROLE in ('all', 'api'):
+    urlpatterns.append(path('api/', include('auctions.urls')))
+
+if settings.ROLE in ('all', 'docs'):
+    urlpatterns.append(path('', include('django_REST_API_auction_house.docs')))
+
+if settings.ROLE == 'all':
+    from django.contrib import admin
+
+    urlpatterns.insert(0, path('admin/', admin.site.urls))